@@ -0,0 +1,265 @@
+"""Server-side summaries for the distribution charts.
+
+The box, violin and histogram charts only need a handful of numbers per group, so they are
+computed here with vectorized pandas/NumPy and the figures draw the summaries instead of
+shipping every row to the browser.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _group_codes(series):
+    """Returns integer codes and the group labels for a (categorical or plain) column."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), list(series.cat.categories)
+    codes, labels = pd.factorize(series, sort=True)
+    return codes, list(labels)
+
+
+def category_counts(df, columns):
+    """Row counts for every observed combination of `columns` (the bars of a count histogram)."""
+    return df.groupby(columns, observed=True).size().reset_index(name='Count')
+
+
+def bin_counts(df, value, bins, by=None, weights=None):
+    """Counts of `value` per bin edge interval, optionally per group of `by`.
+
+    Returns (edges, counts, labels) where counts has one row per group (a single row when
+    `by` is None). Values outside the edges are dropped. With `weights`, that column holds
+    the number of rows each row of `df` stands for (e.g. pre-counted distinct values).
+    """
+    values = df[value].to_numpy(dtype=float)
+    edges = np.asarray(bins, dtype=float)
+    nbins = len(edges) - 1
+    idx = np.searchsorted(edges, values, side='right') - 1
+    # The last edge is inclusive, as in np.histogram
+    idx[values == edges[-1]] = nbins - 1
+    if by is None:
+        codes, labels = np.zeros(len(values), dtype=np.int64), [None]
+    else:
+        codes, labels = _group_codes(df[by])
+    keep = (idx >= 0) & (idx < nbins) & (codes >= 0)
+    flat = codes[keep].astype(np.int64) * nbins + idx[keep]
+    weight = None if weights is None else df[weights].to_numpy()[keep]
+    counts = np.bincount(flat, weight, minlength=len(labels) * nbins).reshape(len(labels), nbins)
+    if weight is not None:
+        counts = counts.astype(np.int64)
+    return edges, counts, labels
+
+
+def box_stats(df, group, value):
+    """Quartiles, Tukey whiskers, mean and outliers of `value` per `group`.
+
+    Whiskers follow Plotly's default: the most extreme values within 1.5 IQR of the box.
+    Outliers are returned as unique values with their counts, so the payload is bounded by
+    the number of distinct outlying values rather than the row count.
+    """
+    grouped = df.groupby(group, observed=True)[value]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    stats['mean'] = grouped.mean()
+    stats['count'] = grouped.size()
+
+    iqr = stats['q3'] - stats['q1']
+    lower = (stats['q1'] - 1.5 * iqr).reindex(df[group]).to_numpy()
+    upper = (stats['q3'] + 1.5 * iqr).reindex(df[group]).to_numpy()
+    values = df[value].to_numpy()
+    inside = (values >= lower) & (values <= upper)
+
+    in_range = df.loc[inside, [group, value]].groupby(group, observed=True)[value]
+    stats['lowerfence'] = in_range.min()
+    stats['upperfence'] = in_range.max()
+
+    outliers = (df.loc[~inside, [group, value]]
+                .groupby([group, value], observed=True).size()
+                .rename('count').reset_index())
+    return stats, outliers
+
+
+def silverman_bandwidth(std, iqr, n):
+    """Silverman's rule of thumb (Plotly's violin default), vectorized over groups."""
+    spread = np.minimum(np.asarray(std, dtype=float), np.asarray(iqr, dtype=float) / 1.349)
+    bandwidth = 1.059 * spread * np.power(np.maximum(np.asarray(n, dtype=float), 1), -0.2)
+    # Empty or constant groups still get a usable kernel
+    return np.where(bandwidth > 0, bandwidth, 1.0)
+
+
+def smooth_counts(centers, counts, bandwidth, lo, hi, points=200):
+    """Gaussian KDE per group from binned counts (one row of `counts` per group).
+
+    Returns (grid, densities); the grid spans [lo, hi] padded by two of the widest bandwidths.
+    """
+    counts = np.asarray(counts, dtype=float)
+    n = np.maximum(counts.sum(axis=1), 1)
+    pad = 2 * np.nanmax(bandwidth)
+    grid = np.linspace(lo - pad, hi + pad, points)
+    # (groups, points, bins) kernel weights, summed over bins
+    z = (grid[None, :, None] - centers[None, None, :]) / bandwidth[:, None, None]
+    kernel = np.exp(-0.5 * z ** 2) / np.sqrt(2 * np.pi)
+    densities = np.einsum('gpb,gb->gp', kernel, counts) / (n * bandwidth)[:, None]
+    return grid, densities
+
+
+def kde_curves(df, group, value, points=200, bins=512):
+    """Gaussian kernel density curves of `value` per `group`, evaluated on a shared grid.
+
+    Values are first binned into `bins` fine bins (one pass over the data), then each
+    group's bin counts are smoothed with its own Silverman bandwidth, the same rule Plotly
+    uses for violins. Returns (grid, densities, labels) with one density row per group.
+    """
+    values = df[value].to_numpy(dtype=float)
+    grouped = df.groupby(group, observed=False)[value]
+    quartiles = grouped.quantile([0.25, 0.75]).unstack()
+    bandwidth = silverman_bandwidth(grouped.std().to_numpy(),
+                                    (quartiles[0.75] - quartiles[0.25]).to_numpy(),
+                                    grouped.size().to_numpy())
+
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    edges = np.linspace(lo, hi, bins + 1) if hi > lo else np.array([lo - 0.5, hi + 0.5])
+    _, counts, labels = bin_counts(df, value, edges, by=group)
+    centers = (edges[:-1] + edges[1:]) / 2
+    grid, densities = smooth_counts(centers, counts, bandwidth, lo, hi, points)
+    return grid, densities, labels
+
+
+# --- Summaries from histogram buckets (used when only bin counts are available) ---
+
+def quantiles_from_counts(edges, counts, qs):
+    """Quantiles per group from bucket counts, interpolating linearly inside each bucket.
+
+    `counts` has one row per group; returns an array shaped (groups, len(qs)).
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=float))
+    cdf = np.cumsum(counts, axis=1)
+    total = cdf[:, -1:]
+    result = np.full((len(counts), len(qs)), np.nan)
+    for g in range(len(counts)):
+        if total[g, 0] == 0:
+            continue
+        # Cumulative share at each edge: 0 at the first edge, then after every bucket
+        shares = np.concatenate([[0.0], cdf[g] / total[g, 0]])
+        result[g] = np.interp(qs, shares, edges)
+    return result
+
+
+def box_stats_from_counts(edges, counts, labels, means, group, value):
+    """box_stats()-style output from bucket counts and exact per-group means.
+
+    Whiskers end at the outermost non-empty bucket inside 1.5 IQR, and every non-empty bucket
+    fully outside the fences is reported as one outlier at its center, with its count.
+    """
+    counts = np.atleast_2d(np.asarray(counts))
+    q1, median, q3 = quantiles_from_counts(edges, counts, [0.25, 0.5, 0.75]).T
+    iqr = q3 - q1
+    lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    left, right, centers = edges[:-1], edges[1:], (edges[:-1] + edges[1:]) / 2
+
+    rows, outlier_rows = [], []
+    for g, label in enumerate(labels):
+        filled = counts[g] > 0
+        if not filled.any():
+            continue
+        inside = filled & (right > lower[g]) & (left <= upper[g])
+        lowerfence = max(lower[g], left[inside].min()) if inside.any() else q1[g]
+        upperfence = min(upper[g], right[inside].max()) if inside.any() else q3[g]
+        rows.append((label, q1[g], median[g], q3[g], means[g], counts[g].sum(), lowerfence, upperfence))
+        for b in np.flatnonzero(filled & ~inside):
+            outlier_rows.append((label, centers[b], counts[g, b]))
+
+    stats = pd.DataFrame(rows, columns=[group, 'q1', 'median', 'q3', 'mean', 'count',
+                                        'lowerfence', 'upperfence']).set_index(group)
+    outliers = pd.DataFrame(outlier_rows, columns=[group, value, 'count'])
+    return stats, outliers
+
+
+# --- Exact summaries from per-value counts (used when rows are aggregated in partitions) ---
+
+def value_counts(df, columns):
+    """Rows per distinct combination of `columns`, as a frame with a 'weight' column."""
+    return df.groupby(columns, observed=True).size().reset_index(name='weight')
+
+
+def quantiles_from_value_counts(values, weights, qs):
+    """Quantiles of sorted distinct `values` seen `weights` times, interpolated like pandas."""
+    cumulative = np.cumsum(weights)
+    position = (cumulative[-1] - 1) * np.asarray(qs, dtype=float)
+    below = np.floor(position)
+    # The value at 0-based rank r is the first one whose cumulative count exceeds r
+    low = values[np.searchsorted(cumulative, below, side='right')]
+    high = values[np.searchsorted(cumulative, np.minimum(below + 1, cumulative[-1] - 1), side='right')]
+    return low + (position - below) * (high - low)
+
+
+def box_stats_from_value_counts(weights, group, value):
+    """box_stats() output from value_counts(df, [group, value]); exact, same dtypes and order."""
+    rows, outliers = [], []
+    for label, part in weights.sort_values([group, value]).groupby(group, observed=True):
+        values, counts = part[value].to_numpy(), part['weight'].to_numpy()
+        q1, median, q3 = quantiles_from_value_counts(values, counts, [0.25, 0.5, 0.75])
+        inside = (values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))
+        rows.append((label, q1, median, q3, (values * counts).sum() / counts.sum(), counts.sum(),
+                     values[inside].min(), values[inside].max()))
+        outliers.append(part.loc[~inside, [group, value, 'weight']])
+    stats = pd.DataFrame(rows, columns=[group, 'q1', 'median', 'q3', 'mean', 'count',
+                                        'lowerfence', 'upperfence'])
+    stats[group] = stats[group].astype(weights[group].dtype)
+    outliers = pd.concat(outliers, ignore_index=True).rename(columns={'weight': 'count'})
+    return stats.set_index(group), outliers
+
+
+def kde_curves_from_value_counts(weights, group, value, points=200, bins=512):
+    """kde_curves() output from value_counts(df, [group, value]), every category included."""
+    std, iqr, n = [], [], []
+    for _, part in weights.sort_values(value).groupby(group, observed=False):
+        values, counts = part[value].to_numpy(dtype=float), part['weight'].to_numpy()
+        total = counts.sum()
+        if total:
+            mean = (values * counts).sum() / total
+            q1, q3 = quantiles_from_value_counts(values, counts, [0.25, 0.75])
+        std.append(np.sqrt((counts * (values - mean) ** 2).sum() / (total - 1)) if total > 1 else np.nan)
+        iqr.append(q3 - q1 if total else np.nan)
+        n.append(total)
+    bandwidth = silverman_bandwidth(std, iqr, n)
+    lo, hi = float(weights[value].min()), float(weights[value].max())
+    edges = np.linspace(lo, hi, bins + 1) if hi > lo else np.array([lo - 0.5, hi + 0.5])
+    _, counts, labels = bin_counts(weights, value, edges, by=group, weights='weight')
+    centers = (edges[:-1] + edges[1:]) / 2
+    grid, densities = smooth_counts(centers, counts, bandwidth, lo, hi, points)
+    return grid, densities, labels
+
+
+def density_grid_from_value_counts(weights, x, y, bins=(50, 40)):
+    """density_grid() output from value_counts(df, [x, y])."""
+    counts, x_edges, y_edges = np.histogram2d(
+        weights[x].to_numpy(dtype=float), weights[y].to_numpy(dtype=float), bins=bins,
+        weights=weights['weight'].to_numpy(dtype=float)
+    )
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+
+def density_grid(df, x, y, bins=(50, 40)):
+    """2D bin counts of `x` against `y` (the cells of a density heatmap).
+
+    Returns (x_centers, y_centers, counts) with counts shaped (len(y_centers), len(x_centers)),
+    the orientation Plotly heatmaps expect.
+    """
+    counts, x_edges, y_edges = np.histogram2d(
+        df[x].to_numpy(dtype=float), df[y].to_numpy(dtype=float), bins=bins
+    )
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+
+def stratified_sample(df, by, n, seed=0):
+    """About `n` rows sampled proportionally from every group of `by` (at least one per group)."""
+    if len(df) <= n:
+        return df
+    fraction = n / len(df)
+    sizes = df.groupby(by, observed=True).size()
+    take = np.maximum(np.round(sizes * fraction), 1).astype(int)
+    rng = np.random.default_rng(seed)
+    # Shuffle once, then keep the first `take` rows of each group
+    shuffled = df.iloc[rng.permutation(len(df))]
+    rank = shuffled.groupby(by, observed=True).cumcount().to_numpy()
+    limit = take.reindex(shuffled[by]).to_numpy()
+    return shuffled[rank < limit]
+
@@ -0,0 +1 @@
+"""Performance measurements for the dashboard (run from the repository root with `python -m`)."""
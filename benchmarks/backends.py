@@ -0,0 +1,140 @@
+"""pandas vs DuckDB chart-query benchmark, with the crossover size per query.
+
+For each row count the dataset is written (replicated bundled CSV, or synthetic with
+--synthetic), loaded once, and every chart query is timed on both backends, unfiltered and
+with a one-season filter. Results are checked to be equal before they are timed.
+
+    python -m benchmarks.backends [--sizes 10000,100000,1000000,10000000] [--repeat 3]
+                                  [--synthetic] [--out bench_backends.json]
+
+The crossover of a query is the smallest measured size from which DuckDB is faster at every
+larger size as well. Filtered pandas timings exclude the bitmap subset, which a page computes
+once per rerun for all its charts; DuckDB applies the filter inside every query.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.pages import DEFAULT_SIZES, scaled_csv, synthetic_csv
+
+AMOUNT = 'Purchase Amount (USD)'
+PREVIOUS = 'Previous Purchases'
+QUERIES = {
+    'discount_means': lambda s: s.means('Discount Applied', AMOUNT),
+    'frequency_gender_counts': lambda s: s.counts(['Frequency of Purchases', 'Gender']),
+    'category_frequency_counts': lambda s: s.counts(['Category', 'Frequency of Purchases']),
+    'age_box_stats': lambda s: s.box_stats('Age Group', AMOUNT),
+    'season_kde_curves': lambda s: s.kde_curves('Season', AMOUNT),
+    'subscription_fits': lambda s: s.fits(PREVIOUS, AMOUNT, 'Subscription Status'),
+    'density_grid': lambda s: s.density_grid(PREVIOUS, AMOUNT),
+}
+SELECTIONS = {'all': {}, 'winter': {'Season': ['Winter']}}
+
+
+def same(a, b):
+    """Whether two query results are equal (floating point up to rounding)."""
+    if isinstance(a, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(a, b, check_exact=False)
+            return True
+        except AssertionError:
+            return False
+    if isinstance(a, (tuple, list)):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if dataclasses.is_dataclass(a):
+        return same(dataclasses.astuple(a), dataclasses.astuple(b))
+    if isinstance(a, np.ndarray):
+        return a.shape == np.shape(b) and np.allclose(a, b, equal_nan=True)
+    return bool(np.isclose(a, b)) if isinstance(a, (float, np.floating)) else a == b
+
+
+def _best(query, source, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = query(source)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def benchmark(sizes, data_dir, repeat=3, synthetic=False):
+    """Times every query on both backends at every size; returns the result rows."""
+    from bitmaps import BitmapIndex
+    from data import FILTER_COLUMNS, content_version, read_dataset
+    from duckdb_source import DuckDBSource, parquet_copy
+    from sources import FrameSource
+
+    rows = []
+    for size in sizes:
+        csv = synthetic_csv(size, data_dir) if synthetic else scaled_csv(size, data_dir)
+        df = read_dataset(csv)
+        index = BitmapIndex(df, FILTER_COLUMNS)
+        path = parquet_copy(df, content_version(df), data_dir)
+        for selection_name, selection in SELECTIONS.items():
+            mask = index.mask(selection)
+            pandas_source = FrameSource(df) if mask is None else FrameSource(df).subset(mask, selection)
+            duckdb_source = DuckDBSource(path, df.dtypes.to_dict(), selection)
+            for name, query in QUERIES.items():
+                pandas_s, expected = _best(query, pandas_source, repeat)
+                duckdb_s, actual = _best(query, duckdb_source, repeat)
+                rows.append({'rows': size, 'selection': selection_name, 'query': name,
+                             'pandas_s': pandas_s, 'duckdb_s': duckdb_s, 'match': same(expected, actual)})
+                print(f"{size:>10,}  {selection_name:<7} {name:<26} pandas {pandas_s * 1000:8.1f} ms  "
+                      f"duckdb {duckdb_s * 1000:8.1f} ms  {'ok' if rows[-1]['match'] else 'MISMATCH'}",
+                      flush=True)
+    return rows
+
+
+def crossovers(rows):
+    """{(selection, query): smallest size from which DuckDB stays faster, or None}."""
+    result = {}
+    for key in sorted({(r['selection'], r['query']) for r in rows}):
+        series = sorted((r['rows'], r['duckdb_s'] < r['pandas_s']) for r in rows
+                        if (r['selection'], r['query']) == key)
+        crossover = None
+        for size, faster in reversed(series):
+            if not faster:
+                break
+            crossover = size
+        result[key] = crossover
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per query (best is kept)')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='use generator.py output instead of replicating the bundled CSV')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'shopping_bench'),
+                        help='where the CSVs and Parquet copies are written (reused between runs)')
+    parser.add_argument('--out', default='bench_backends.json', help='results file (JSON)')
+    args = parser.parse_args()
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    rows = benchmark(sizes, args.data_dir, args.repeat, args.synthetic)
+    summary = crossovers(rows)
+    print("\nCrossover (DuckDB faster from this size on):")
+    for (selection, query), size in summary.items():
+        print(f"  {selection:<7} {query:<26} {f'{size:,} rows' if size else 'not reached'}")
+    Path(args.out).write_text(json.dumps({
+        'results': rows,
+        'crossovers': [{'selection': s, 'query': q, 'rows': size} for (s, q), size in summary.items()],
+    }, indent=2), encoding='utf-8')
+    print(f"Results written to {args.out}")
+    if not all(r['match'] for r in rows):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
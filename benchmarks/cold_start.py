@@ -0,0 +1,125 @@
+"""Cold-start report: import time per page and time to first chart.
+
+Every measurement runs in a fresh interpreter so nothing is warm:
+  * imports:  executes only the page's top-level import statements (after Streamlit itself
+              is imported, since every process pays for that anyway);
+  * render:   runs the whole page headlessly with Streamlit's AppTest and records when the
+              first st.plotly_chart call happens and when the script finishes.
+
+    python -m benchmarks.cold_start [--repeat 3] [--json cold_start.json]
+"""
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = ['home.py', 'shopping_behaviour.py', 'seasonality_discount.py', 'loyalty_preferences.py']
+# Modules worth knowing about when they show up at startup
+HEAVY_MODULES = ['plotly.express', 'plotly.graph_objects', 'statsmodels', 'pyarrow', 'duckdb']
+
+
+def _heavy_loaded(baseline=()):
+    """Heavy modules imported so far, minus those already loaded by Streamlit itself."""
+    return [name for name in HEAVY_MODULES if name in sys.modules and name not in baseline]
+
+
+def measure_imports(page):
+    """Seconds spent executing the page's import block, plus the heavy modules it pulled in."""
+    import streamlit  # noqa: F401  (baseline, not attributed to the page)
+
+    baseline = _heavy_loaded()
+    sys.path.insert(0, str(ROOT))
+    tree = ast.parse((ROOT / page).read_text(encoding='utf-8'))
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    code = compile(ast.Module(body=imports, type_ignores=[]), page, 'exec')
+    start = time.perf_counter()
+    exec(code, {'__name__': '__page__'})
+    return {'import_s': time.perf_counter() - start, 'loaded_after_imports': _heavy_loaded(baseline)}
+
+
+def measure_render(page):
+    """Seconds from script start to the first chart and to the end of the first run."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    baseline = _heavy_loaded()
+    marks = {}
+    plotly_chart = st.plotly_chart
+
+    def timed_plotly_chart(*args, **kwargs):
+        marks.setdefault('first_chart', time.perf_counter())
+        return plotly_chart(*args, **kwargs)
+
+    st.plotly_chart = timed_plotly_chart
+    app = AppTest.from_file(str(ROOT / page), default_timeout=600)
+    start = time.perf_counter()
+    app.run()
+    end = time.perf_counter()
+    first_chart = marks.get('first_chart')
+    return {
+        'first_chart_s': first_chart - start if first_chart else None,
+        'run_s': end - start,
+        'charts': len(app.get('plotly_chart')),
+        'errors': [str(e.value) for e in list(app.exception) + list(app.error)],
+        'loaded_after_run': _heavy_loaded(baseline),
+    }
+
+
+def _child(mode, page):
+    """Runs one measurement in a fresh interpreter and returns its JSON result."""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--child', mode, page],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cold_start_report(pages=PAGES, repeat=3):
+    """Median cold import and render timings per page."""
+    report = {}
+    for page in pages:
+        imports = [_child('imports', page) for _ in range(repeat)]
+        renders = [_child('render', page) for _ in range(repeat)]
+        first_charts = [r['first_chart_s'] for r in renders if r['first_chart_s'] is not None]
+        report[page] = {
+            'import_s': statistics.median(r['import_s'] for r in imports),
+            'first_chart_s': statistics.median(first_charts) if first_charts else None,
+            'run_s': statistics.median(r['run_s'] for r in renders),
+            'charts': renders[-1]['charts'],
+            'errors': renders[-1]['errors'],
+            'loaded_after_imports': imports[-1]['loaded_after_imports'],
+            'loaded_after_run': renders[-1]['loaded_after_run'],
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='fresh processes per measurement (median)')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PAGE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, page = args.child
+        result = measure_imports(page) if mode == 'imports' else measure_render(page)
+        print(json.dumps(result))
+        return
+
+    report = cold_start_report(repeat=args.repeat)
+    print(f"{'Page':<28}{'Imports (s)':>12}{'1st chart (s)':>15}{'Run (s)':>10}  Loaded by imports / by run")
+    for page, row in report.items():
+        first_chart = f"{row['first_chart_s']:.3f}" if row['first_chart_s'] is not None else '-'
+        print(f"{page:<28}{row['import_s']:>12.3f}{first_chart:>15}{row['run_s']:>10.3f}  "
+              f"{', '.join(row['loaded_after_imports']) or '-'} / {', '.join(row['loaded_after_run']) or '-'}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Scaling benchmark of the partitioned aggregation engine across 1..N worker processes.
+
+Every chart query the three pages draw (see benchmarks.backends.QUERIES) is timed on the
+plain pandas path and on engine.ParallelSource with 1, 2, ... N workers, unfiltered and with
+a one-season filter. Engine results are checked against pandas before they are timed.
+
+    python -m benchmarks.engine [--sizes 1000000,10000000] [--workers 1,2,4,8] [--repeat 3]
+                                [--synthetic] [--out bench_engine.json]
+
+Worker pools are started (forked) before timing, as they are once per data version in the
+app. Speedups are relative to the engine with one worker, which runs the same partitions
+serially in the calling thread.
+"""
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from benchmarks.backends import QUERIES, SELECTIONS, _best, same
+from benchmarks.pages import scaled_csv, synthetic_csv
+
+
+def default_workers():
+    """1, 2, 4, ... up to the number of cores (always including it)."""
+    cores = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 < cores:
+        workers.append(workers[-1] * 2)
+    return workers + ([cores] if cores > 1 else [])
+
+
+def benchmark(sizes, workers, data_dir, repeat=3, synthetic=False):
+    """Times every query on pandas and on the engine at every worker count; returns the rows."""
+    from bitmaps import BitmapIndex
+    from data import FILTER_COLUMNS, content_version, read_dataset
+    from engine import Engine, ParallelSource
+    from sources import FrameSource
+
+    rows = []
+    for size in sizes:
+        csv = synthetic_csv(size, data_dir) if synthetic else scaled_csv(size, data_dir)
+        df = read_dataset(csv)
+        index = BitmapIndex(df, FILTER_COLUMNS)
+        version = content_version(df)
+        for count in workers:
+            engine = Engine(df, version, workers=count)
+            # Start the pool up front (a no-op for the serial engine)
+            engine.map(len, None)
+            for selection_name, selection in SELECTIONS.items():
+                mask = index.mask(selection)
+                pandas_source = FrameSource(df) if mask is None else FrameSource(df).subset(mask, selection)
+                engine_source = ParallelSource(engine, mask)
+                for name, query in QUERIES.items():
+                    pandas_s, expected = _best(query, pandas_source, repeat)
+                    engine_s, actual = _best(query, engine_source, repeat)
+                    rows.append({'rows': size, 'workers': count, 'partitions': len(engine.partitions),
+                                 'selection': selection_name, 'query': name, 'pandas_s': pandas_s,
+                                 'engine_s': engine_s, 'match': same(expected, actual)})
+                    print(f"{size:>10,}  {count:>2} workers  {selection_name:<7} {name:<26} "
+                          f"pandas {pandas_s * 1000:8.1f} ms  engine {engine_s * 1000:8.1f} ms  "
+                          f"{'ok' if rows[-1]['match'] else 'MISMATCH'}", flush=True)
+            engine.close()
+    return rows
+
+
+def speedups(rows):
+    """{(rows, workers): (total engine seconds, speedup over one worker, speedup over pandas)}."""
+    totals = {}
+    for r in rows:
+        engine_s, pandas_s = totals.get((r['rows'], r['workers']), (0.0, 0.0))
+        totals[(r['rows'], r['workers'])] = (engine_s + r['engine_s'], pandas_s + r['pandas_s'])
+    return {(size, count): (engine_s, totals[(size, min(c for s, c in totals if s == size))][0] / engine_s,
+                            pandas_s / engine_s)
+            for (size, count), (engine_s, pandas_s) in sorted(totals.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000000,10000000', help='comma-separated row counts')
+    parser.add_argument('--workers', default=','.join(map(str, default_workers())),
+                        help='comma-separated worker counts')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per query (best is kept)')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='use generator.py output instead of replicating the bundled CSV')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'shopping_bench'),
+                        help='where the CSVs are written (reused between runs)')
+    parser.add_argument('--out', default='bench_engine.json', help='results file (JSON)')
+    args = parser.parse_args()
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    workers = [int(count) for count in args.workers.split(',')]
+    rows = benchmark(sizes, workers, args.data_dir, args.repeat, args.synthetic)
+    summary = speedups(rows)
+    print(f"\nAll queries, both selections ({os.cpu_count()} cores available):")
+    for (size, count), (engine_s, scaling, versus_pandas) in summary.items():
+        print(f"  {size:>10,} rows  {count:>2} workers  {engine_s * 1000:8.1f} ms  "
+              f"x{scaling:.2f} vs 1 worker  x{versus_pandas:.2f} vs pandas")
+    Path(args.out).write_text(json.dumps({
+        'cores': os.cpu_count(),
+        'results': rows,
+        'speedups': [{'rows': size, 'workers': count, 'engine_s': engine_s, 'vs_one_worker': scaling,
+                      'vs_pandas': versus_pandas}
+                     for (size, count), (engine_s, scaling, versus_pandas) in summary.items()],
+    }, indent=2), encoding='utf-8')
+    print(f"Results written to {args.out}")
+    if not all(r['match'] for r in rows):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
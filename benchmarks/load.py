@@ -0,0 +1,329 @@
+"""Concurrent-session load test of the whole app, against a real `streamlit run` server.
+
+Each concurrency level starts a fresh `streamlit run main.py` (headless, on a free local
+port) and connects that many simulated sessions to it, each over its own websocket like a
+browser tab. Sessions follow a scripted mix: every step switches to a page picked by weight,
+and now and then changes the Season filter. Every rerun is timed from the rerun request to
+the server's end-of-script message.
+
+    python -m benchmarks.load [--sessions 1,2,4,8,16] [--steps 20] [--rows N]
+                              [--mix demographics=0.4,seasonality=0.3,loyalty=0.3]
+                              [--filter-rate 0.3] [--think 0.5] [--p95-budget 1000]
+                              [--out bench_load.json]
+
+Sessions speak the browser's protocol: BackMsg rerun requests (page hash and widget values)
+over /_stcore/stream, answered by ForwardMsg deltas. That protocol is internal to Streamlit,
+so the benchmark is pinned to the version it was written against (STREAMLIT_VERSION); on any
+other version it warns, and the installed version is recorded with the results.
+
+Reported per level: p50/p95/p99 rerun latency (overall and per page), throughput in reruns
+per second, and memory per session (the growth of the server's PSS over the warmed-up server,
+divided by the number of sessions). Everything runs locally; memory is read from /proc
+(Linux only).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import ExitStack
+from importlib.metadata import version
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.pages import ROOT, scaled_csv, synthetic_csv
+from benchmarks.shared_memory import memory
+
+# Streamlit release (major.minor) whose browser protocol the sessions speak
+STREAMLIT_VERSION = '1.65'
+# URL paths of the analysis pages in main.py's navigation
+PAGES = {
+    'demographics': 'shopping_behaviour',
+    'seasonality': 'seasonality_discount',
+    'loyalty': 'loyalty_preferences',
+}
+SEASONS = ['Spring', 'Summer', 'Fall', 'Winter']
+PERCENTILES = [50, 95, 99]
+
+
+def parse_mix(text):
+    """{'demographics': 0.4, ...} from 'demographics=0.4,...', normalized to sum to 1."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in PAGES:
+            raise ValueError(f"Unknown page {name.strip()!r}; expected one of {sorted(PAGES)}")
+        mix[name.strip()] = float(weight or 1)
+    total = sum(mix.values())
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def check_streamlit():
+    """The installed Streamlit version, warning when it is not the one the protocol was written for."""
+    installed = version('streamlit')
+    if '.'.join(installed.split('.')[:2]) != STREAMLIT_VERSION:
+        print(f"Warning: written against Streamlit {STREAMLIT_VERSION}.x, found {installed}; "
+              "its browser protocol may have changed", file=sys.stderr)
+    return installed
+
+
+class Server:
+    """`streamlit run main.py` on a free local port, for one concurrency level."""
+
+    def __init__(self, env, timeout=120):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', str(ROOT / 'main.py'), '--server.headless', 'true',
+             '--server.address', '127.0.0.1', '--server.port', str(self.port),
+             '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+            cwd=ROOT, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + timeout
+        while not self._healthy():
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.stop()
+                self.log.seek(0)
+                raise RuntimeError(f"Streamlit server did not start:\n{self.log.read().decode(errors='replace')[-2000:]}")
+            time.sleep(0.2)
+
+    def _healthy(self):
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/_stcore/health', timeout=1) as response:
+                return response.status == 200
+        except OSError:
+            return False
+
+    @property
+    def url(self):
+        return f'ws://127.0.0.1:{self.port}/_stcore/stream'
+
+    def memory(self):
+        return memory(self.process.pid)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+
+class Client:
+    """One browser tab: a websocket session that requests reruns and reads each to its end."""
+
+    def __init__(self, url):
+        from websockets.sync.client import connect
+
+        self._exit = ExitStack()
+        # Figures can exceed the default 1 MiB frame limit
+        self.connection = self._exit.enter_context(connect(url, max_size=None))
+        self.pages = {}  # URL path -> page script hash, from the navigation message
+        self.widgets = {}  # label -> widget id of the multiselects last drawn
+        self.errors = []
+
+    def rerun(self, page=None, widgets=None):
+        """Reruns the script on `page` (a URL path) with `widgets` ({id: [labels]}); returns the seconds taken."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        request = BackMsg()
+        state = request.rerun_script
+        state.query_string = ''
+        if page is not None:
+            state.page_script_hash = self.pages[page]
+        for widget_id, labels in (widgets or {}).items():
+            widget = state.widget_states.widgets.add()
+            widget.id = widget_id
+            widget.string_array_value.data.extend(labels)
+        start = time.perf_counter()
+        self.connection.send(request.SerializeToString())
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(self.connection.recv())
+            kind = message.WhichOneof('type')
+            if kind == 'script_finished':
+                return time.perf_counter() - start
+            if kind == 'navigation':
+                self.pages = {page.url_pathname: page.page_script_hash for page in message.navigation.app_pages}
+            elif kind == 'delta' and message.delta.WhichOneof('type') == 'new_element':
+                self._read(message.delta.new_element)
+
+    def _read(self, element):
+        kind = element.WhichOneof('type')
+        if kind == 'multiselect':
+            self.widgets[element.multiselect.label] = element.multiselect.id
+        elif kind == 'exception':
+            self.errors.append(f"{element.exception.type}: {element.exception.message}")
+        elif kind == 'alert' and element.alert.format == element.alert.ERROR:
+            self.errors.append(element.alert.body)
+
+    def close(self):
+        self._exit.close()
+
+
+class Session(threading.Thread):
+    """One simulated analyst: opens the app, then follows the scripted mix for `steps` steps."""
+
+    def __init__(self, number, client, steps, mix, filter_rate, think, seed, start_barrier):
+        super().__init__(name=f'session-{number}', daemon=True)
+        self.client = client
+        self.steps = steps
+        self.mix = mix
+        self.filter_rate = filter_rate
+        self.think = think
+        self.rng = random.Random(seed * 1000 + number)
+        self.start_barrier = start_barrier
+        self.reruns = []  # (page, action, seconds)
+        self.errors = []
+
+    def _rerun(self, name, action, **kwargs):
+        self.reruns.append((name, action, self.client.rerun(**kwargs)))
+
+    def run(self):
+        self.start_barrier.wait()
+        try:
+            self._rerun('home', 'open')
+            pages, weights = list(self.mix), list(self.mix.values())
+            for _ in range(self.steps):
+                # Think time with jitter, so sessions do not rerun in lockstep
+                time.sleep(self.think * self.rng.uniform(0.5, 1.5))
+                page = self.rng.choices(pages, weights)[0]
+                self._rerun(page, 'navigate', page=PAGES[page])
+                if self.rng.random() < self.filter_rate:
+                    season = [] if self.rng.random() < 0.25 else [self.rng.choice(SEASONS)]
+                    self._rerun(page, 'filter', page=PAGES[page], widgets={self.client.widgets['Season']: season})
+        except Exception as e:
+            # A session that cannot go on (e.g. a page failed to draw its filters) is reported
+            self.errors.append(f"{type(e).__name__}: {e}")
+        self.errors += self.client.errors
+
+
+def _percentiles(seconds):
+    return {f'p{q}_ms': float(np.percentile(seconds, q)) * 1000 for q in PERCENTILES} if seconds else {}
+
+
+def run_level(server, sessions, steps, mix, filter_rate, think, seed, warmup=True):
+    """Runs `sessions` concurrent sessions against `server`; returns the measurements."""
+    if warmup:
+        # One session through every page first: dataset loaded, unfiltered charts cached
+        client = Client(server.url)
+        client.rerun()
+        for page in PAGES.values():
+            client.rerun(page=page)
+        client.close()
+    baseline = server.memory()
+
+    barrier = threading.Barrier(sessions + 1)
+    threads = [Session(number, Client(server.url), steps, mix, filter_rate, think, seed, barrier)
+               for number in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall_s = time.perf_counter() - start
+    # Every session (and its state) is still connected here
+    loaded = server.memory()
+    for thread in threads:
+        thread.client.close()
+
+    reruns = [rerun for thread in threads for rerun in thread.reruns]
+    seconds = [s for _, _, s in reruns]
+    return {
+        'sessions': sessions,
+        'reruns': len(reruns),
+        'wall_s': wall_s,
+        'throughput_per_s': len(reruns) / wall_s if wall_s else 0.0,
+        **_percentiles(seconds),
+        'pages': {page: {'reruns': sum(p == page for p, _, _ in reruns),
+                         **_percentiles([s for p, _, s in reruns if p == page])}
+                  for page in ['home'] + list(mix)},
+        'baseline_pss_mb': baseline['pss_mb'],
+        'loaded_pss_mb': loaded['pss_mb'],
+        'pss_per_session_mb': (loaded['pss_mb'] - baseline['pss_mb']) / sessions,
+        'rss_per_session_mb': (loaded['rss_mb'] - baseline['rss_mb']) / sessions,
+        'errors': sorted({error for thread in threads for error in thread.errors}),
+    }
+
+
+def benchmark(levels, csv, mix, args):
+    """Runs every concurrency level against a fresh server; returns their results."""
+    results = []
+    env = dict(os.environ)
+    if csv:
+        env['SHOPPING_DATA_PATH'] = str(csv)
+    for sessions in levels:
+        server = Server(env)
+        try:
+            result = run_level(server, sessions, args.steps, mix, args.filter_rate, args.think,
+                               args.seed, args.warmup)
+        finally:
+            server.stop()
+        results.append(result)
+        print(f"{sessions:>4} sessions  {result['reruns']:>5} reruns  "
+              f"p50 {result['p50_ms']:7.0f} ms  p95 {result['p95_ms']:7.0f} ms  p99 {result['p99_ms']:7.0f} ms  "
+              f"{result['throughput_per_s']:6.1f} reruns/s  {result['pss_per_session_mb']:6.1f} MB/session"
+              f"{'  ERRORS: ' + '; '.join(result['errors'][:3]) if result['errors'] else ''}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', default='1,2,4,8,16', help='comma-separated concurrency levels')
+    parser.add_argument('--steps', type=int, default=20, help='page switches per session')
+    parser.add_argument('--mix', default='demographics=0.4,seasonality=0.3,loyalty=0.3',
+                        help='relative weights of the pages the sessions switch to')
+    parser.add_argument('--filter-rate', type=float, default=0.3,
+                        help='probability that a step also changes the Season filter')
+    parser.add_argument('--think', type=float, default=0.5, help='mean seconds between a session\'s steps')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the scripted mix')
+    parser.add_argument('--no-warmup', dest='warmup', action='store_false',
+                        help='start from cold caches instead of after one pass over every page')
+    parser.add_argument('--rows', type=int, help='replicate the bundled CSV to this many rows')
+    parser.add_argument('--synthetic', action='store_true', help='with --rows, use generator.py output instead')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'shopping_bench'),
+                        help='where scaled CSVs are written (reused between runs)')
+    parser.add_argument('--p95-budget', type=float, default=1000,
+                        help='p95 rerun latency (ms) a level must stay within to count as served')
+    parser.add_argument('--out', default='bench_load.json', help='results file (JSON)')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    streamlit_version = check_streamlit()
+
+    csv = None
+    if args.rows:
+        Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+        csv = synthetic_csv(args.rows, args.data_dir) if args.synthetic else scaled_csv(args.rows, args.data_dir)
+    levels = [int(level) for level in args.sessions.split(',')]
+    results = benchmark(levels, csv, mix, args)
+    served = [r['sessions'] for r in results if r['p95_ms'] <= args.p95_budget and not r['errors']]
+    if served:
+        print(f"Up to {max(served)} concurrent sessions kept p95 within {args.p95_budget:.0f} ms")
+    else:
+        print(f"No level kept p95 within {args.p95_budget:.0f} ms")
+    Path(args.out).write_text(json.dumps({
+        'rows': args.rows, 'mix': mix, 'steps': args.steps, 'filter_rate': args.filter_rate,
+        'think_s': args.think, 'p95_budget_ms': args.p95_budget, 'cores': os.cpu_count(),
+        'streamlit': streamlit_version,
+        'max_sessions_within_budget': max(served) if served else 0, 'results': results,
+    }, indent=2), encoding='utf-8')
+    print(f"Results written to {args.out}")
+    if any(r['errors'] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Headless page-rendering benchmark at scaled data sizes.
+
+The bundled CSV is replicated to each requested row count, then every analysis page is run
+with Streamlit's AppTest in a fresh process against that file. Per chart we record the wall
+time since the previous chart (aggregation + figure construction + st.plotly_chart) and the
+size of the serialized figure; per page the dataset load time, run time and peak RSS.
+
+    python -m benchmarks.pages [--sizes 10000,100000,1000000,10000000]
+                               [--out bench_pages.json] [--baseline OLD.json] [--tolerance 0.2]
+
+With --baseline, any time, memory or payload metric that grew by more than the tolerance
+is reported as a regression and the command exits with status 1.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = ['shopping_behaviour.py', 'seasonality_discount.py', 'loyalty_preferences.py']
+DEFAULT_SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+# Small absolute differences are noise, whatever the relative change
+MIN_DELTA = {'s': 0.05, 'bytes': 1024, 'mb': 20}
+
+
+def synthetic_csv(rows, data_dir):
+    """Path of a `rows`-row synthetic dataset fitted on the bundled CSV, written once."""
+    from data import read_raw
+    from generator import fit_model, generate
+
+    path = Path(data_dir) / f'synthetic_{rows}.csv'
+    if not path.exists():
+        tmp = path.with_suffix('.tmp')
+        generate(fit_model(read_raw(ROOT / 'shopping_behaviour_cleaned.csv')), rows, tmp)
+        tmp.replace(path)
+    return path
+
+
+def scaled_csv(rows, data_dir):
+    """Path of the bundled CSV replicated (and truncated) to `rows` rows, written once."""
+    import pandas as pd
+
+    path = Path(data_dir) / f'shopping_{rows}.csv'
+    if not path.exists():
+        base = pd.read_csv(ROOT / 'shopping_behaviour_cleaned.csv')
+        repeats = -(-rows // len(base))
+        tmp = path.with_suffix('.tmp')
+        # Write in blocks so the largest sizes never need the whole frame in memory
+        block = pd.concat([base] * min(repeats, 256), ignore_index=True)
+        written = 0
+        with open(tmp, 'w', encoding='utf-8', newline='') as handle:
+            while written < rows:
+                part = block.iloc[:rows - written]
+                part.to_csv(handle, index=False, header=written == 0)
+                written += len(part)
+        tmp.replace(path)
+    return path
+
+
+def run_page(page):
+    """Runs one page in this process (child mode) and returns its measurements."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, str(ROOT))
+    import data
+    from instrumentation import peak_rss_mb
+
+    start = time.perf_counter()
+    data.get_dataset()
+    load_s = time.perf_counter() - start
+
+    charts = []
+    plotly_chart = st.plotly_chart
+
+    def timed_plotly_chart(figure, *args, **kwargs):
+        result = plotly_chart(figure, *args, **kwargs)
+        charts.append({'figure': figure, 'end': time.perf_counter()})
+        return result
+
+    st.plotly_chart = timed_plotly_chart
+    app = AppTest.from_file(str(ROOT / page), default_timeout=3600)
+    run_start = time.perf_counter()
+    app.run()
+    run_s = time.perf_counter() - run_start
+
+    previous = run_start
+    measured = []
+    for number, (chart, element) in enumerate(zip(charts, app.get('plotly_chart')), 1):
+        # Titles are read after the run, so building them is not timed as part of a chart
+        measured.append({
+            'chart': chart['figure'].layout.title.text or f'chart {number}',
+            'wall_s': chart['end'] - previous,
+            'figure_bytes': len(element.proto.spec.encode('utf-8')),
+        })
+        previous = chart['end']
+    return {
+        'load_s': load_s,
+        'run_s': run_s,
+        'peak_rss_mb': peak_rss_mb(),
+        'charts': measured,
+        'errors': [str(e.value) for e in list(app.exception) + list(app.error)],
+    }
+
+
+def benchmark(sizes, data_dir, pages=PAGES, synthetic=False):
+    """Runs every page at every size, each in a fresh process; returns the results."""
+    results = []
+    for rows in sizes:
+        csv = synthetic_csv(rows, data_dir) if synthetic else scaled_csv(rows, data_dir)
+        for page in pages:
+            env = dict(os.environ, SHOPPING_DATA_PATH=str(csv))
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.pages', '--child', page],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append({'rows': rows, 'page': page, **result})
+            print(f"{rows:>10,}  {page:<26} load {result['load_s']:7.2f}s  run {result['run_s']:7.2f}s  "
+                  f"RSS {result['peak_rss_mb']:7.0f} MB", flush=True)
+    return results
+
+
+def _metrics(results):
+    """Flattens results into {(rows, page, chart, metric): (value, unit)}."""
+    metrics = {}
+    for result in results:
+        key = (result['rows'], result['page'])
+        metrics[key + ('page', 'load_s')] = (result['load_s'], 's')
+        metrics[key + ('page', 'run_s')] = (result['run_s'], 's')
+        metrics[key + ('page', 'peak_rss_mb')] = (result['peak_rss_mb'], 'mb')
+        for chart in result['charts']:
+            metrics[key + (chart['chart'], 'wall_s')] = (chart['wall_s'], 's')
+            metrics[key + (chart['chart'], 'figure_bytes')] = (chart['figure_bytes'], 'bytes')
+    return metrics
+
+
+def compare(results, baseline, tolerance):
+    """Metrics that grew by more than `tolerance` relative to the baseline results."""
+    current, previous = _metrics(results), _metrics(baseline)
+    regressions = []
+    for key, (value, unit) in current.items():
+        if key not in previous:
+            continue
+        old = previous[key][0]
+        if value > old * (1 + tolerance) and value - old > MIN_DELTA[unit]:
+            rows, page, chart, metric = key
+            regressions.append({'rows': rows, 'page': page, 'chart': chart, 'metric': metric,
+                                'baseline': old, 'current': value, 'change': value / old - 1 if old else None})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated row counts')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'shopping_bench'),
+                        help='where the scaled CSVs are written (reused between runs)')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='use generator.py output instead of replicating the bundled CSV')
+    parser.add_argument('--out', default='bench_pages.json', help='results file (JSON)')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative growth')
+    parser.add_argument('--child', metavar='PAGE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_page(args.child)))
+        return
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = benchmark(sizes, args.data_dir, synthetic=args.synthetic)
+    Path(args.out).write_text(json.dumps({'results': results}, indent=2), encoding='utf-8')
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['rows']:,} {r['page']} / {r['chart']} / {r['metric']}: "
+                  f"{r['baseline']:.4g} -> {r['current']:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Per-process memory with and without the shared memory-mapped dataset.
+
+Starts N processes per mode, as several Streamlit servers on one node would. Each process
+loads the dataset and runs every chart query the pages draw (touching every column). Memory
+is measured while all of them are alive:
+  copy    every process parses and decodes its own copy (the default)
+  shared  every process maps the same Arrow file (SHOPPING_SHARED_DATASET_DIR)
+
+    python -m benchmarks.shared_memory [--rows 1000000] [--processes 4] [--synthetic]
+                                       [--out bench_shared_memory.json]
+
+RSS counts shared file pages in every process that touched them. PSS splits them between
+those processes, so the sum of PSS is what the node actually spends. Linux only, since it
+reads /proc/self/smaps_rollup.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.pages import ROOT, scaled_csv, synthetic_csv
+
+FIELDS = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Private_Clean': 'private_mb', 'Private_Dirty': 'private_mb'}
+
+
+def memory(pid='self'):
+    """{'rss_mb', 'pss_mb', 'private_mb'} of process `pid` (default: this one), from /proc/<pid>/smaps_rollup."""
+    result = dict.fromkeys(FIELDS.values(), 0.0)
+    with open(f'/proc/{pid}/smaps_rollup', encoding='ascii') as handle:
+        for line in handle:
+            name, _, rest = line.partition(':')
+            if name in FIELDS:
+                result[FIELDS[name]] += int(rest.split()[0]) / 1024
+    return result
+
+
+def child():
+    """One process: load, run the page queries, then report memory when the parent asks."""
+    from benchmarks.backends import QUERIES
+    from data import get_dataset
+    from sources import FrameSource
+
+    baseline = memory()
+    source = FrameSource(get_dataset())
+    for query in QUERIES.values():
+        query(source)
+    print('ready', flush=True)
+    sys.stdin.readline()
+    print(json.dumps({'baseline': baseline, 'loaded': memory()}), flush=True)
+
+
+def run_mode(mode, csv, processes, shared_dir):
+    """Memory of `processes` concurrent children in `mode`; returns their reports."""
+    env = {**os.environ, 'SHOPPING_DATA_PATH': str(csv), 'PYTHONPATH': str(ROOT)}
+    env.pop('SHOPPING_SHARED_DATASET_DIR', None)
+    if mode == 'shared':
+        env['SHOPPING_SHARED_DATASET_DIR'] = str(shared_dir)
+    children = [subprocess.Popen([sys.executable, '-m', 'benchmarks.shared_memory', '--child'],
+                                 cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                for _ in range(processes)]
+    for process in children:
+        if process.stdout.readline().strip() != 'ready':
+            raise RuntimeError(f"A {mode} child failed to load the dataset")
+    # Everyone is loaded and alive, so PSS splits the shared pages between all of them
+    reports = []
+    for process in children:
+        process.stdin.write('\n')
+        process.stdin.flush()
+        reports.append(json.loads(process.stdout.readline()))
+    for process in children:
+        process.wait()
+    return reports
+
+
+def main():
+    if '--child' in sys.argv:
+        return child()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='dataset size')
+    parser.add_argument('--processes', type=int, default=4, help='concurrent processes per mode')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='use generator.py output instead of replicating the bundled CSV')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'shopping_bench'),
+                        help='where the CSV and the shared Arrow file are written (reused between runs)')
+    parser.add_argument('--out', default='bench_shared_memory.json', help='results file (JSON)')
+    args = parser.parse_args()
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    csv = synthetic_csv(args.rows, args.data_dir) if args.synthetic else scaled_csv(args.rows, args.data_dir)
+    shared_dir = Path(args.data_dir) / 'shared'
+    # The first shared process writes the Arrow file; do that here so every child only maps it
+    run_mode('shared', csv, 1, shared_dir)
+
+    results = {}
+    for mode in ('copy', 'shared'):
+        reports = run_mode(mode, csv, args.processes, shared_dir)
+        results[mode] = reports
+        loaded = [report['loaded'] for report in reports]
+        print(f"{mode:<7} {args.processes} processes, {args.rows:,} rows: "
+              f"RSS {sum(m['rss_mb'] for m in loaded) / len(loaded):7.1f} MB/process  "
+              f"PSS {sum(m['pss_mb'] for m in loaded) / len(loaded):7.1f} MB/process  "
+              f"private {sum(m['private_mb'] for m in loaded) / len(loaded):7.1f} MB/process  "
+              f"total PSS {sum(m['pss_mb'] for m in loaded):7.1f} MB  "
+              f"(baseline RSS {reports[0]['baseline']['rss_mb']:.1f} MB)")
+    Path(args.out).write_text(json.dumps({'rows': args.rows, 'processes': args.processes, **results},
+                                         indent=2), encoding='utf-8')
+    print(f"Results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
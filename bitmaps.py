@@ -0,0 +1,68 @@
+"""Packed per-value bitmap indexes for the filterable columns.
+
+Each distinct value of a filter column gets one bit per row (np.packbits), built once when the
+dataset is loaded. A filter selection is then answered with vectorized OR/AND over the packed
+bytes instead of scanning the DataFrame columns again on every rerun.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _codes_and_values(series):
+    """Integer codes per row and the distinct values they refer to, in display order."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), list(series.cat.categories)
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy().astype(np.int8), [False, True]
+    codes, values = pd.factorize(series, sort=True)
+    return codes, list(values)
+
+
+class BitmapIndex:
+    """Per-value packed bitmaps for a fixed set of columns of one DataFrame."""
+
+    def __init__(self, df, columns):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for column in columns:
+            codes, values = _codes_and_values(df[column])
+            self.bitmaps[column] = {value: np.packbits(codes == i) for i, value in enumerate(values)}
+
+    def values(self, column):
+        """Distinct values of an indexed column."""
+        return list(self.bitmaps[column])
+
+    def bits(self, selection):
+        """Packed bitmap of the rows matching `selection`, or None when nothing is selected.
+
+        `selection` maps a column to the accepted values; values within a column are OR-ed,
+        columns are AND-ed, and columns with an empty list do not filter. Values the index does
+        not know (e.g. a stale selection after a refresh dropped a category) match no rows.
+        """
+        combined = None
+        for column, values in selection.items():
+            if not values:
+                continue
+            bitmaps = self.bitmaps[column]
+            none = np.zeros(-(-self.n_rows // 8), dtype=np.uint8)
+            column_bits = np.bitwise_or.reduce([bitmaps.get(value, none) for value in values])
+            combined = column_bits if combined is None else combined & column_bits
+        return combined
+
+    def mask(self, selection):
+        """Boolean row mask for `selection`, or None when nothing is selected."""
+        bits = self.bits(selection)
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count=self.n_rows).view(bool)
+
+    def count(self, selection):
+        """Number of rows matching `selection`, computed on the packed bits."""
+        bits = self.bits(selection)
+        if bits is None:
+            return self.n_rows
+        return int(np.unpackbits(bits, count=self.n_rows).sum())
+
+    @property
+    def nbytes(self):
+        return sum(bits.nbytes for bitmaps in self.bitmaps.values() for bits in bitmaps.values())
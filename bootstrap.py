@@ -0,0 +1,85 @@
+"""Bootstrap confidence intervals for per-group means and medians.
+
+Resampling a group's n rows with replacement only changes how often each distinct value is
+drawn, so a bootstrap replicate is a multinomial draw of n over the group's value counts.
+All groups are drawn at once as one (replicates, groups, distinct values) count matrix. The
+cost grows with the number of distinct values, not with the row count, and the counts come
+from any source's value_counts() query (see sources.FrameSource). Replicates are drawn in
+chunks that bound memory, each a single vectorised draw and matrix product with its own seed.
+On the parallel backend, several chunks are spread over the engine's worker pool, which is
+already running; otherwise they are drawn one after another in the calling thread, as
+starting processes for one query would cost more than the draws. Either way the results
+are the same.
+"""
+import numpy as np
+import pandas as pd
+
+import config
+from aggregations import quantiles_from_value_counts
+
+STATISTICS = ('mean', 'median')
+
+
+def _statistics(counts, values, n, statistic):
+    """`statistic` per replicate and group from (replicates, groups, values) counts."""
+    if statistic == 'mean':
+        return counts @ values / n
+    cumulative = counts.cumsum(axis=2)
+    # 0-based ranks of the two middle rows; the value at rank r is the first whose cumulative count exceeds r
+    low = (cumulative > ((n - 1) // 2)[:, None]).argmax(axis=2)
+    high = (cumulative > (n // 2)[:, None]).argmax(axis=2)
+    return (values[low] + values[high]) / 2
+
+
+def _resample(values, probabilities, n, statistic, replicates, seed):
+    """One chunk: `replicates` bootstrap values of `statistic` per group, shape (replicates, groups)."""
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(n, probabilities, size=(replicates, len(n)))
+    return _statistics(counts, values, n, statistic)
+
+
+def _chunks(replicates, cells):
+    """Replicates per chunk, keeping each chunk's count matrix under BOOTSTRAP_CHUNK_CELLS."""
+    size = max(1, min(replicates, config.BOOTSTRAP_CHUNK_CELLS // max(cells, 1)))
+    return [min(size, replicates - start) for start in range(0, replicates, size)]
+
+
+def group_intervals(weights, group, value, statistic='mean', replicates=None, confidence=None, seed=0,
+                    engine=None):
+    """Percentile bootstrap interval of `statistic` of `value` per `group`.
+
+    `weights` is value_counts() output for [group, value]. Returns a frame indexed by group
+    with the point estimate (column `statistic`) and the interval bounds ('low', 'high').
+    With an `engine` (engine.Engine), the chunks run on its worker pool.
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(f"Unknown statistic {statistic!r}; expected one of {STATISTICS}")
+    replicates = replicates or config.BOOTSTRAP_REPLICATES
+    confidence = confidence or config.BOOTSTRAP_CONFIDENCE
+
+    table = weights.pivot_table(index=group, columns=value, values='weight', aggfunc='sum',
+                                fill_value=0, observed=True).sort_index(axis=1)
+    values = table.columns.to_numpy(dtype=float)
+    counts = table.to_numpy(dtype=np.int64)
+    n = counts.sum(axis=1)
+    if statistic == 'mean':
+        estimate = counts @ values / n
+    else:
+        estimate = np.array([quantiles_from_value_counts(values, row, [0.5])[0] for row in counts])
+
+    probabilities = counts / n[:, None]
+    sizes = _chunks(replicates, counts.size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(values, probabilities, n, statistic, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if engine is not None and len(chunks) > 1:
+        draws = engine.starmap(_resample, chunks)
+    else:
+        draws = [_resample(*chunk) for chunk in chunks]
+    low, high = np.quantile(np.concatenate(draws), [(1 - confidence) / 2, (1 + confidence) / 2], axis=0)
+    return pd.DataFrame({statistic: estimate, 'low': low, 'high': high}, index=table.index)
+
+
+def intervals(source, group, value, statistic='mean', **kwargs):
+    """group_intervals() over a source's value counts (and its engine, for a ParallelSource)."""
+    kwargs.setdefault('engine', getattr(source, 'engine', None))
+    return group_intervals(source.value_counts([group, value]), group, value, statistic, **kwargs)
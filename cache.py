@@ -0,0 +1,134 @@
+"""Process-wide LRU caches of chart aggregates and finished figures, shared by every session.
+
+Entries are keyed by (chart, filter selection, dataset version), so a popular slice is
+computed once for all concurrent users and stale entries stop matching when the data changes.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+from charts import spec_figure
+from filters import selection_key
+from instrumentation import timed
+from sources import active_version
+
+
+def sizeof(value):
+    """Approximate memory footprint of a cached value in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class AggregateCache:
+    """Thread-safe LRU cache bounded by a byte budget, with hit/miss counters."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+        return False, None
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, calling `compute()` once on a miss.
+
+        Concurrent misses on the same key wait for the first computation instead of
+        repeating it. Values are shared between sessions and must not be mutated.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                found, value = self._lookup(key)
+                if found:
+                    return value
+                value = compute()
+                self._store(key, value)
+        finally:
+            # Also when compute() raises, so failing keys do not leave their lock behind
+            with self._lock:
+                self._key_locks.pop(key, None)
+        return value
+
+    def _store(self, key, value):
+        size = sizeof(value)
+        with self._lock:
+            self.misses += 1
+            if size > self.max_bytes:
+                # Larger than the whole budget: hand it back without caching
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Counters for diagnostics: entries, bytes used, hits, misses, evictions and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+aggregate_cache = AggregateCache(config.AGGREGATE_CACHE_BYTES)
+
+
+def cached_aggregate(chart, compute, selection=None):
+    """Aggregate `chart` for the current filter selection, computed once per data version."""
+    key = (chart, selection_key(selection), active_version())
+    with timed('aggregate'):
+        return aggregate_cache.get_or_compute(key, compute)
+
+
+figure_cache = AggregateCache(config.FIGURE_CACHE_BYTES)
+
+
+def cached_figure(chart, build, params=(), selection=None):
+    """Finished figure of `chart` for the current filter selection, built once per data version.
+
+    `build()` returns a Plotly figure; only its JSON is kept, so a hit skips both the figure
+    construction and its serialization. `params` must cover any other input the figure depends
+    on (e.g. widget values).
+    """
+    key = (chart, selection_key(selection), active_version(), tuple(params))
+    return spec_figure(figure_cache.get_or_compute(key, lambda: build().to_json()))
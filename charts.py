@@ -0,0 +1,153 @@
+"""Plotly figures drawn from the pre-aggregated summaries in aggregations.py."""
+import importlib
+import json
+
+import numpy as np
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    Plotly Express costs noticeable cold-start time, so pages and chart helpers refer to
+    `px`/`go` through these proxies and only pay for the import once a chart is built.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+
+_spec_figure_class = None
+
+
+def spec_figure(spec):
+    """Wraps a serialized figure (JSON) so `st.plotly_chart` can draw it as is.
+
+    `st.plotly_chart` passes its argument to plotly.tools.return_figure_from_figure_or_data
+    with validate_figure=True: a plain dict is rebuilt and validated as `go.Figure(**spec)`,
+    while a BaseFigure is only asked for `to_dict()`. This thin subclass hands back the
+    parsed spec, which took 0.2-0.3 ms per cached chart instead of 10-13 ms for the dict
+    (Streamlit 1.65, Plotly 7). tests/test_charts.py checks that Streamlit still draws it
+    unchanged, so an upgrade that changes this path fails there rather than in the pages.
+    """
+    global _spec_figure_class
+    if _spec_figure_class is None:
+        from plotly.basedatatypes import BaseFigure
+
+        class SpecFigure(BaseFigure):
+            def __init__(self, spec):
+                # BaseFigure.__init__ would validate; only the spec is needed
+                object.__setattr__(self, '_spec', spec)
+
+            @property
+            def layout(self):
+                # Validated on access only (e.g. for the title); drawing the figure never reads it
+                return go.Layout(json.loads(self._spec).get('layout', {}))
+
+            def to_dict(self):
+                return json.loads(self._spec)
+
+            def to_json(self, *args, **kwargs):
+                return self._spec
+
+        _spec_figure_class = SpecFigure
+    return _spec_figure_class(spec)
+
+
+def _colors(labels, sequence):
+    """Assigns colors from `sequence` to `labels` in order, cycling like Plotly Express."""
+    sequence = sequence or px.colors.qualitative.Plotly
+    return {label: sequence[i % len(sequence)] for i, label in enumerate(labels)}
+
+
+def _outlier_trace(values, x, color):
+    """Marker trace for the outlying values of one group."""
+    return go.Scatter(x=x, y=values, mode='markers', marker=dict(color=color, size=5),
+                      showlegend=False, hoverinfo='y')
+
+
+def box_figure(stats, outliers, group, value, title, order=None, color_sequence=None, median_ci=None):
+    """Box plot per group from box_stats() output: one precomputed box per group, no raw rows.
+
+    With `median_ci` (bootstrap.group_intervals() output for the median), each box is notched
+    over its median's interval. Plotly notches are symmetric, so the wider side is drawn.
+    """
+    labels = [label for label in (order or stats.index) if label in stats.index]
+    colors = _colors(labels, color_sequence)
+    fig = go.Figure()
+    for label in labels:
+        row = stats.loc[label]
+        notch = {}
+        if median_ci is not None and label in median_ci.index:
+            interval = median_ci.loc[label]
+            notch = dict(notched=True, notchspan=[max(row['median'] - interval['low'], interval['high'] - row['median'])])
+        fig.add_trace(go.Box(
+            name=str(label), x=[label], legendgroup=str(label),
+            q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+            lowerfence=[row['lowerfence']], upperfence=[row['upperfence']], mean=[row['mean']],
+            marker_color=colors[label], boxpoints=False, **notch,
+        ))
+        group_outliers = outliers.loc[outliers[group] == label, value]
+        if len(group_outliers):
+            fig.add_trace(_outlier_trace(group_outliers, [label] * len(group_outliers), colors[label]))
+    fig.update_layout(title=title, xaxis_title=group, yaxis_title=value, legend_title_text=group)
+    return fig
+
+
+def violin_figure(grid, densities, labels, stats, outliers, group, value, title,
+                  order=None, color_sequence=None, width=0.4):
+    """Violin plot per group from kde_curves() and box_stats() output.
+
+    Each violin is a filled outline of its density curve with the precomputed box drawn
+    inside it, on a numeric axis that is labelled with the group names.
+    """
+    order = [label for label in (order or labels) if label in stats.index]
+    colors = _colors(order, color_sequence)
+    scale = width / max(densities.max(), 1e-12)
+    fig = go.Figure()
+    for position, label in enumerate(order):
+        density = densities[labels.index(label)] * scale
+        # Only draw the curve where it is visible, like Plotly's 'soft' span
+        visible = density > density.max() * 1e-3
+        y, half = grid[visible], density[visible]
+        fig.add_trace(go.Scatter(
+            # float32 is plenty for drawing and halves the encoded outline
+            x=np.concatenate([position - half, position + half[::-1]]).astype(np.float32),
+            y=np.concatenate([y, y[::-1]]).astype(np.float32),
+            fill='toself', mode='lines', line=dict(color=colors[label], width=1),
+            name=str(label), legendgroup=str(label), hoverinfo='skip',
+        ))
+        row = stats.loc[label]
+        fig.add_trace(go.Box(
+            x=[position], q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+            lowerfence=[row['lowerfence']], upperfence=[row['upperfence']],
+            width=width / 4, marker_color=colors[label], fillcolor='white',
+            boxpoints=False, legendgroup=str(label), showlegend=False, name=str(label),
+        ))
+        group_outliers = outliers.loc[outliers[group] == label, value]
+        if len(group_outliers):
+            fig.add_trace(_outlier_trace(group_outliers, [position] * len(group_outliers), colors[label]))
+    fig.update_layout(
+        title=title, yaxis_title=value, legend_title_text=group,
+        xaxis=dict(title=group, tickmode='array', tickvals=list(range(len(order))), ticktext=order),
+    )
+    return fig
+
+
+def density_figure(x_centers, y_centers, counts, x, y, title, colorscale='Viridis'):
+    """Heatmap of binned point counts from density_grid(); empty cells are left transparent."""
+    z = np.where(counts > 0, counts, np.nan)
+    fig = go.Figure(go.Heatmap(
+        x=x_centers, y=y_centers, z=z, colorscale=colorscale,
+        colorbar=dict(title='Count'), hovertemplate=f'{x}: %{{x}}<br>{y}: %{{y}}<br>Count: %{{z}}<extra></extra>',
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
@@ -0,0 +1,89 @@
+"""Runtime settings for the dashboard, overridable through environment variables."""
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def _env_int(name, default):
+    """Integer setting from the environment, falling back to `default` when unset."""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+# --- Dataset Source ---
+# Optional local CSV path, checked before anything else (e.g. a mounted volume)
+DATA_PATH = os.environ.get('SHOPPING_DATA_PATH')
+# CSV shipped with the repository, used when DATA_PATH is unset or missing
+BUNDLED_DATA_PATH = BASE_DIR / 'shopping_behaviour_cleaned.csv'
+# Remote copy, only fetched when no local file is available
+DATA_URL = os.environ.get(
+    'SHOPPING_DATA_URL',
+    'https://raw.githubusercontent.com/izzatimahrup/SvAssignment/refs/heads/main/shopping_behaviour_cleaned.csv'
+)
+# When set, the decoded dataset is written once to an Arrow file in this directory and every
+# process memory-maps it read-only (zero-copy, shared through the OS page cache)
+SHARED_DATASET_DIR = os.environ.get('SHOPPING_SHARED_DATASET_DIR')
+# Seconds between background conditional GETs of DATA_URL (0 disables the refresher);
+# a changed file is parsed off the request path and swapped in as a new dataset version
+REFRESH_SECONDS = float(os.environ.get('SHOPPING_REFRESH_SECONDS', 0))
+# Timeout (seconds) of one refresh request
+REFRESH_TIMEOUT = float(os.environ.get('SHOPPING_REFRESH_TIMEOUT', 30))
+
+# --- Query Backend ---
+# Engine for row-level chart queries: 'pandas' (in memory), 'duckdb' (over a Parquet copy)
+# or 'parallel' (partitioned map-reduce over worker processes, see engine.py)
+BACKEND = os.environ.get('SHOPPING_BACKEND', 'pandas')
+# Where the DuckDB backend keeps its Parquet copy of the dataset (one file per data version)
+DUCKDB_PARQUET_DIR = Path(os.environ.get('SHOPPING_DUCKDB_PARQUET_DIR', BASE_DIR / 'duckdb'))
+# Worker processes of the parallel backend (1 runs every partition in the script thread)
+ENGINE_WORKERS = _env_int('SHOPPING_ENGINE_WORKERS', os.cpu_count() or 1)
+# Row-range partitions the parallel backend splits the dataset into (fixed, so results do
+# not depend on the worker count), and the smallest partition worth shipping to a worker
+ENGINE_PARTITIONS = _env_int('SHOPPING_ENGINE_PARTITIONS', 8)
+ENGINE_MIN_PARTITION_ROWS = _env_int('SHOPPING_ENGINE_MIN_PARTITION_ROWS', 100_000)
+
+# --- Scatter Plot ---
+# Above this many rows the Previous Purchases scatter is drawn as a binned density heatmap
+SCATTER_DENSITY_THRESHOLD = _env_int('SHOPPING_SCATTER_DENSITY_THRESHOLD', 200_000)
+# Number of raw points (stratified sample) that can be overlaid on the density heatmap
+SCATTER_SAMPLE_SIZE = _env_int('SHOPPING_SCATTER_SAMPLE_SIZE', 2_000)
+
+# --- Aggregate and Figure Caches ---
+# Memory budget of the process-wide cache of chart aggregates, shared by all sessions
+AGGREGATE_CACHE_BYTES = _env_int('SHOPPING_AGGREGATE_CACHE_BYTES', 256 * 1024 ** 2)
+# Memory budget of the process-wide cache of finished figures (serialized JSON)
+FIGURE_CACHE_BYTES = _env_int('SHOPPING_FIGURE_CACHE_BYTES', 64 * 1024 ** 2)
+
+# --- Bootstrap Confidence Intervals ---
+# Replicates per interval and their coverage, for the error bars and notches on mean/median charts
+BOOTSTRAP_REPLICATES = _env_int('SHOPPING_BOOTSTRAP_REPLICATES', 2000)
+BOOTSTRAP_CONFIDENCE = float(os.environ.get('SHOPPING_BOOTSTRAP_CONFIDENCE', 0.95))
+# Largest resampled count matrix (replicates x groups x distinct values) held at once; bigger
+# jobs are drawn in several chunks (spread over the engine's worker pool on the parallel backend)
+BOOTSTRAP_CHUNK_CELLS = _env_int('SHOPPING_BOOTSTRAP_CHUNK_CELLS', 4 * 1024 ** 2)
+
+# --- OLAP Cube ---
+# When set to an existing cube file (built with `python cube.py build`), pages answer from it
+CUBE_PATH = os.environ.get('SHOPPING_CUBE_PATH')
+# Width (USD) of the Purchase Amount histogram buckets stored in the cube
+CUBE_BIN_WIDTH = float(os.environ.get('SHOPPING_CUBE_BIN_WIDTH', 1.0))
+# Rank error bound of the Purchase Amount quantile sketches stored next to the cube, which
+# drive the box and violin summaries in cube mode (0 skips them: buckets are interpolated)
+SKETCH_EPSILON = float(os.environ.get('SHOPPING_SKETCH_EPSILON', 0.01))
+
+# --- Partitioned Store ---
+# When set to an existing store directory (built with `python partitions.py build`), pages read
+# only the partitions and columns each chart needs from it (the cube still takes precedence)
+PARTITIONED_PATH = os.environ.get('SHOPPING_PARTITIONED_PATH')
+
+# --- Streaming Ingestion ---
+# Rows per chunk when a CSV is streamed into the cube (`python cube.py build --stream`)
+INGEST_CHUNK_ROWS = _env_int('SHOPPING_INGEST_CHUNK_ROWS', 500_000)
+
+# --- Diagnostics ---
+# Set to 1 to show per-stage timings of the current rerun in a sidebar panel
+DIAGNOSTICS_PANEL = bool(_env_int('SHOPPING_DIAGNOSTICS', 0))
+# When set, cumulative stage-timing histograms are written here after every rerun:
+# JSON for a *.json path, Prometheus text otherwise (e.g. for a node exporter textfile collector)
+METRICS_PATH = os.environ.get('SHOPPING_METRICS_PATH')
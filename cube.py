@@ -0,0 +1,294 @@
+"""Precomputed OLAP cube over the dashboard dimensions.
+
+Every chart is a count, sum, mean or distribution over a few categorical dimensions, so the
+cube stores, per combination of dimension values and Purchase Amount bucket, the row count
+and the sums needed for means, variances and the Previous Purchases regression. Pages can
+answer from it without row-level data, and partial cubes (chunks, partitions) merge by
+re-aggregating their measures.
+
+Build it with:  python cube.py build [--source CSV] [--out shopping_cube.parquet] [--stream]
+                                     [--sketch-epsilon 0.01]
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+import sketches
+from aggregations import box_stats_from_counts, quantiles_from_counts, silverman_bandwidth, smooth_counts
+from data import FILTER_COLUMNS, decode
+from instrumentation import peak_rss_mb
+from regression import OLSStats
+
+DIMENSIONS = [
+    'Age Group', 'Gender', 'Category', 'Season',
+    'Discount Applied', 'Subscription Status', 'Frequency of Purchases',
+]
+AMOUNT = 'Purchase Amount (USD)'
+PREVIOUS = 'Previous Purchases'
+RATING = 'Review Rating'
+# Integer id of the Purchase Amount bucket: floor(amount / bin_width)
+BUCKET = 'Amount Bucket'
+KEYS = DIMENSIONS + [BUCKET]
+
+# Measure columns and how partial cubes combine them
+MEASURES = {
+    'count': 'sum',
+    'amount_sum': 'sum', 'amount_sumsq': 'sum',
+    'previous_sum': 'sum', 'previous_sumsq': 'sum', 'previous_amount_sum': 'sum',
+    'rating_sum': 'sum', 'rating_sumsq': 'sum',
+    'previous_min': 'min', 'previous_max': 'max',
+}
+# Prefix of the summed measures behind each row-level value column
+VALUE_PREFIXES = {AMOUNT: 'amount', PREVIOUS: 'previous', RATING: 'rating'}
+
+# Previous Purchases x Purchase Amount bucket histogram behind the loyalty scatter's heatmap.
+# Kept as a separate table keyed by the filter columns only: Previous Purchases as a cube key
+# would multiply every cell by its range
+SCATTER_DIMENSIONS = FILTER_COLUMNS
+SCATTER_KEYS = SCATTER_DIMENSIONS + [PREVIOUS, BUCKET]
+SCATTER_MEASURES = {'count': 'sum', 'amount_sum': 'sum'}
+
+DEFAULT_CUBE_PATH = config.BASE_DIR / 'shopping_cube.parquet'
+
+
+# --- Building ---
+
+def build_cube(df, bin_width=None):
+    """Aggregates a decoded frame (or one chunk of it) into cube cells."""
+    bin_width = bin_width or config.CUBE_BIN_WIDTH
+    amount = df[AMOUNT].to_numpy(dtype=float)
+    previous = df[PREVIOUS].to_numpy(dtype=float)
+    rating = df[RATING].to_numpy(dtype=float)
+    terms = pd.DataFrame({
+        **{dimension: df[dimension].to_numpy() for dimension in DIMENSIONS},
+        BUCKET: np.floor(amount / bin_width).astype(np.int64),
+        'count': np.ones(len(df), dtype=np.int64),
+        'amount_sum': amount, 'amount_sumsq': amount * amount,
+        'previous_sum': previous, 'previous_sumsq': previous * previous,
+        'previous_amount_sum': previous * amount,
+        'rating_sum': rating, 'rating_sumsq': rating * rating,
+        'previous_min': previous, 'previous_max': previous,
+    })
+    # Keep the dimension dtypes (ordered categoricals, bool flags) of the source frame
+    terms = terms.astype({dimension: df[dimension].dtype for dimension in DIMENSIONS})
+    return terms.groupby(KEYS, observed=True).agg(MEASURES).reset_index()
+
+
+def build_scatter(df, bin_width=None):
+    """Aggregates a decoded frame (or one chunk of it) into Previous Purchases x amount bucket cells."""
+    bin_width = bin_width or config.CUBE_BIN_WIDTH
+    amount = df[AMOUNT].to_numpy(dtype=float)
+    terms = pd.DataFrame({
+        **{dimension: df[dimension].to_numpy() for dimension in SCATTER_DIMENSIONS},
+        PREVIOUS: df[PREVIOUS].to_numpy(),
+        BUCKET: np.floor(amount / bin_width).astype(np.int64),
+        'count': np.ones(len(df), dtype=np.int64),
+        'amount_sum': amount,
+    })
+    terms = terms.astype({dimension: df[dimension].dtype for dimension in SCATTER_DIMENSIONS})
+    return terms.groupby(SCATTER_KEYS, observed=True).agg(SCATTER_MEASURES).reset_index()
+
+
+def merge_cubes(cubes, keys=KEYS, measures=MEASURES):
+    """Combines partial cubes (or scatter histograms, with their keys and measures) built with the same bin width."""
+    combined = pd.concat(list(cubes), ignore_index=True)
+    # Chunks may have seen different category sets; re-apply the shared dtypes
+    combined = decode(combined)
+    return combined.groupby(keys, observed=True).agg(measures).reset_index()
+
+
+# --- Storage ---
+
+def save_cube(cube, path, bin_width, source_version=None):
+    """Writes the cube to Parquet, with the bucket width and source version in the metadata."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'shopping_cube'] = json.dumps({
+        'bin_width': bin_width,
+        'source_version': source_version,
+        'rows': int(cube['count'].sum()),
+    }).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def load_cube(path):
+    """Reads a cube (or scatter histogram) file; returns (cube, metadata)."""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    metadata = json.loads(table.schema.metadata[b'shopping_cube'])
+    return table.to_pandas(), metadata
+
+
+def scatter_path(cube_path):
+    """Where the scatter histogram of a cube file lives: next to it, as <name>.scatter.parquet."""
+    return Path(cube_path).with_suffix('.scatter.parquet')
+
+
+# --- Queries ---
+
+def counts(cube, dims):
+    """Row counts per combination of `dims`."""
+    return cube.groupby(dims, observed=True)['count'].sum().reset_index(name='Count')
+
+
+def means(cube, dim, value):
+    """Mean of `value` per `dim`, from the stored sums."""
+    prefix = VALUE_PREFIXES[value]
+    sums = cube.groupby(dim, observed=True)[['count', f'{prefix}_sum']].sum()
+    return (sums[f'{prefix}_sum'] / sums['count']).rename(value).reset_index()
+
+
+def value_range(cube, value):
+    """(min, max) of a value with stored extremes (Previous Purchases)."""
+    prefix = VALUE_PREFIXES[value]
+    return cube[f'{prefix}_min'].min(), cube[f'{prefix}_max'].max()
+
+
+def histogram(cube, group, bin_width):
+    """Purchase Amount bucket counts per group: (edges, counts, labels)."""
+    table = cube.groupby([group, BUCKET], observed=True)['count'].sum().unstack(fill_value=0)
+    first, last = table.columns.min(), table.columns.max()
+    table = table.reindex(columns=range(first, last + 1), fill_value=0)
+    edges = np.arange(first, last + 2) * bin_width
+    return edges, table.to_numpy(), list(table.index)
+
+
+def _moments(cube, group, value):
+    """Per-group count, mean and standard deviation of `value` from the stored sums.
+
+    Returns (labels, n, mean, std), with the arrays in label order.
+    """
+    prefix = VALUE_PREFIXES[value]
+    sums = cube.groupby(group, observed=True)[['count', f'{prefix}_sum', f'{prefix}_sumsq']].sum()
+    n = sums['count'].to_numpy(dtype=float)
+    mean = sums[f'{prefix}_sum'].to_numpy() / n
+    variance = (sums[f'{prefix}_sumsq'].to_numpy() - n * mean ** 2) / np.maximum(n - 1, 1)
+    return list(sums.index), n, mean, np.sqrt(np.maximum(variance, 0))
+
+
+def box_stats(cube, group, value, bin_width, items=None):
+    """box_stats()-compatible summaries.
+
+    Quartiles, whiskers and outliers come from the quantile sketches when `items` (the sketch
+    items of the selected cells, see sketches.py) is given, otherwise they are interpolated
+    inside the buckets. Counts and means are exact either way.
+    """
+    if value != AMOUNT:
+        raise ValueError(f"The cube only stores a histogram of {AMOUNT!r}")
+    labels, _, mean, _ = _moments(cube, group, value)
+    if items is not None:
+        return sketches.box_stats(items, group, value, dict(zip(labels, mean)))
+    edges, bucket_counts, labels = histogram(cube, group, bin_width)
+    return box_stats_from_counts(edges, bucket_counts, labels, mean, group, value)
+
+
+def kde_curves(cube, group, value, bin_width, points=200, items=None):
+    """kde_curves()-compatible density curves, from the sketch items when given, else the buckets."""
+    if value != AMOUNT:
+        raise ValueError(f"The cube only stores a histogram of {AMOUNT!r}")
+    labels, n, _, std = _moments(cube, group, value)
+    if items is not None:
+        return sketches.kde_curves(items, group, value, dict(zip(labels, std)), points)
+    edges, bucket_counts, labels = histogram(cube, group, bin_width)
+    q1, q3 = quantiles_from_counts(edges, bucket_counts, [0.25, 0.75]).T
+    bandwidth = silverman_bandwidth(std, q3 - q1, n)
+    centers = (edges[:-1] + edges[1:]) / 2
+    filled = np.flatnonzero(bucket_counts.sum(axis=0))
+    grid, densities = smooth_counts(centers, bucket_counts, bandwidth,
+                                    edges[filled[0]], edges[filled[-1] + 1], points)
+    return grid, densities, labels
+
+
+def fits(cube, by):
+    """Previous Purchases -> Purchase Amount regression statistics per group of `by`."""
+    sums = cube.groupby(by, observed=True)[
+        ['count', 'previous_sum', 'amount_sum', 'previous_amount_sum', 'previous_sumsq', 'amount_sumsq']
+    ].sum()
+    return {
+        label: OLSStats(row['count'], row['previous_sum'], row['amount_sum'],
+                        row['previous_amount_sum'], row['previous_sumsq'], row['amount_sumsq'])
+        for label, row in sums.iterrows()
+    }
+
+
+def value_counts(cube, columns):
+    """value_counts()-compatible weights of dimensions and Purchase Amount.
+
+    Rows of a bucket stand in with the bucket's mean amount, so group means stay exact and
+    other statistics are off by less than a bucket width (exact for whole-dollar amounts
+    with the default width of 1).
+    """
+    unknown = set(columns) - set(DIMENSIONS) - {AMOUNT}
+    if unknown:
+        raise ValueError(f"The cube has no row values of {sorted(unknown)}")
+    if AMOUNT not in columns:
+        return cube.groupby(columns, observed=True)['count'].sum().reset_index(name='weight')
+    dims = [column for column in columns if column != AMOUNT]
+    sums = cube.groupby(dims + [BUCKET], observed=True)[['count', 'amount_sum']].sum()
+    sums = sums[sums['count'] > 0].reset_index()
+    sums[AMOUNT] = sums['amount_sum'] / sums['count']
+    return sums.groupby(columns, observed=True)['count'].sum().reset_index(name='weight')
+
+
+def scatter_weights(scatter):
+    """value_counts()-compatible weights of (Previous Purchases, Purchase Amount) from the scatter histogram."""
+    sums = scatter.groupby([PREVIOUS, BUCKET])[['count', 'amount_sum']].sum()
+    sums = sums[sums['count'] > 0].reset_index()
+    return pd.DataFrame({PREVIOUS: sums[PREVIOUS], AMOUNT: sums['amount_sum'] / sums['count'],
+                         'weight': sums['count']})
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from data import content_version, read_dataset
+
+    parser = argparse.ArgumentParser(description="Build the dashboard's OLAP cube.")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='materialize the cube from the dataset')
+    build.add_argument('--source', help='CSV to read (defaults to the configured dataset)')
+    build.add_argument('--out', default=config.CUBE_PATH or str(DEFAULT_CUBE_PATH))
+    build.add_argument('--bin-width', type=float, default=config.CUBE_BIN_WIDTH)
+    build.add_argument('--stream', action='store_true',
+                       help='read the CSV in chunks (for files larger than memory)')
+    build.add_argument('--chunksize', type=int, default=config.INGEST_CHUNK_ROWS,
+                       help='rows per chunk with --stream')
+    build.add_argument('--sketch-epsilon', type=float, default=config.SKETCH_EPSILON,
+                       help='rank error of the Purchase Amount sketches (0 skips them)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    epsilon = args.sketch_epsilon
+    k = sketches.k_for_epsilon(epsilon) if epsilon > 0 else None
+    cell_sketches = {} if k else None
+    if args.stream:
+        from ingest import stream_cube
+
+        cube, scatter, rows = stream_cube(args.source, args.chunksize, args.bin_width,
+                                          sketches=cell_sketches, sketch_k=k)
+        # Row-level data was never fully in memory, so version the cube by its own content
+        version = content_version(cube)
+    else:
+        df = read_dataset(args.source)
+        cube, scatter, rows = build_cube(df, args.bin_width), build_scatter(df, args.bin_width), len(df)
+        if k:
+            sketches.build_sketches(df, k, sketches=cell_sketches)
+        version = content_version(df)
+    save_cube(cube, args.out, args.bin_width, source_version=version)
+    save_cube(scatter, scatter_path(args.out), args.bin_width, source_version=version)
+    if k:
+        sketches.save_sketches(cell_sketches, sketches.sketch_path(args.out), k, source_version=version)
+    print(f"Cube: {rows:,} rows -> {len(cube):,} cells, written to {args.out} "
+          f"in {time.perf_counter() - start:.2f}s (peak RSS {peak_rss_mb():.0f} MB)")
+    print(f"Scatter histogram: {len(scatter):,} cells, written to {scatter_path(args.out)}")
+    if k:
+        print(f"Sketches: {len(cell_sketches):,} cells, k={k} (rank error <= {epsilon:g}), "
+              f"written to {sketches.sketch_path(args.out)}")
@@ -0,0 +1,315 @@
+"""Shared dataset loader used by every analysis page."""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+import config
+from bitmaps import BitmapIndex
+from instrumentation import timed
+
+# --- Category orders shared by every chart ---
+age_order = ['18–25', '26–35', '36–45', '46–55', '56–65', '65+']
+season_order = ["Winter", "Spring", "Summer", "Fall"]
+# 'Every 3 Months' and 'Bi-Weekly' also occur in the data, so they are slotted in by frequency
+frequency_order = ['Annually', 'Quarterly', 'Every 3 Months', 'Monthly', 'Fortnightly', 'Bi-Weekly', 'Weekly', 'Daily']
+
+# Ordered categorical columns and the order they reuse
+CATEGORY_ORDERS = {
+    'Age Group': age_order,
+    'Season': season_order,
+    'Frequency of Purchases': frequency_order,
+}
+# Unordered categorical columns (categories are taken from the data)
+CATEGORICAL_COLUMNS = ['Category']
+
+# --- 0/1 coded columns: stored as bool, labelled only when plotting ---
+FLAG_LABELS = {
+    'Gender': {True: 'Male', False: 'Female'},
+    'Subscription Status': {True: 'Subscribed', False: 'Non-Subscribed'},
+    'Discount Applied': {True: 'Discount Applied', False: 'No Discount'},
+}
+
+# Columns the sidebar filters slice by; each gets a bitmap index at load time
+FILTER_COLUMNS = ['Age Group', 'Gender', 'Season', 'Category', 'Subscription Status']
+
+# Process-wide copy of the dataset (and its filter index), shared by all sessions and pages
+_lock = threading.Lock()
+_snapshot = None
+
+
+class Snapshot(NamedTuple):
+    """One loaded version of the dataset, swapped as a whole so readers never mix versions."""
+    df: pd.DataFrame
+    index: BitmapIndex
+    version: str
+    source: str
+
+def resolve_source():
+    """Returns the first available source: configured path, bundled CSV, then the remote URL."""
+    for path in (config.DATA_PATH, config.BUNDLED_DATA_PATH):
+        if path and Path(path).is_file():
+            return str(path)
+    return config.DATA_URL
+
+
+def _ordered_categorical(series, order):
+    """Converts a column to an ordered Categorical, appending any values missing from `order`."""
+    extra = sorted(set(series.dropna().unique()) - set(order))
+    return pd.Categorical(series, categories=list(order) + extra, ordered=True)
+
+
+def decode(df):
+    """Converts the raw columns to the compact in-memory types and returns the same DataFrame.
+
+    Flags become bool (True = Male / Subscribed / Discount Applied) and the low-cardinality
+    text columns become Categoricals, ordered where the charts use a fixed order.
+    """
+    for column, labels in FLAG_LABELS.items():
+        if column not in df:
+            continue
+        numeric = pd.api.types.is_numeric_dtype(df[column])
+        if numeric:
+            codes = {0: False, 1: True}
+        else:
+            # Files that were saved already decoded carry the display labels instead
+            codes = {label: flag for flag, label in labels.items()}
+        # Anything else (a typo, a new label, a missing value) would silently count as True
+        unknown = df[column][~df[column].isin(list(codes))]
+        if len(unknown):
+            raise ValueError(f"Column {column!r} holds values other than {list(codes)}: "
+                             f"{sorted(map(str, unknown.unique()))}")
+        df[column] = df[column].astype(bool) if numeric else df[column].map(codes).astype(bool)
+    for column, order in CATEGORY_ORDERS.items():
+        if column in df:
+            df[column] = _ordered_categorical(df[column], order)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def label_flags(df, columns=None):
+    """Returns a copy of `df` with the bool flag columns replaced by their display labels.
+
+    Meant for small aggregated frames right before plotting, not for the row-level dataset.
+    """
+    df = df.copy()
+    for column in columns or FLAG_LABELS:
+        if column in df:
+            df[column] = df[column].map(FLAG_LABELS[column])
+    return df
+
+
+def read_raw(source=None):
+    """Reads the CSV as stored, without any decoding."""
+    with timed('fetch'):
+        return pd.read_csv(source or resolve_source())
+
+
+def read_dataset(source=None):
+    """Reads and decodes the dataset from `source` (defaults to resolve_source())."""
+    raw = read_raw(source)
+    with timed('decode'):
+        return decode(raw)
+
+
+def build_snapshot(df, source, version=None):
+    """Builds the filter index (and, unless given, the content hash) of a decoded frame."""
+    with timed('index'):
+        index = BitmapIndex(df, [column for column in FILTER_COLUMNS if column in df])
+        version = version or content_version(df)
+    return Snapshot(df, index, version, source)
+
+
+def snapshot():
+    """Returns the current dataset snapshot, reading the dataset at most once per process."""
+    global _snapshot
+    if _snapshot is None:
+        with _lock:
+            # Another thread may have finished loading while we waited for the lock
+            if _snapshot is None:
+                source = resolve_source()
+                if config.SHARED_DATASET_DIR:
+                    df, version = load_shared(source)
+                    _snapshot = build_snapshot(df, source, version)
+                else:
+                    _snapshot = build_snapshot(read_dataset(source), source)
+    return _snapshot
+
+
+def swap_dataset(new):
+    """Replaces the process-wide snapshot with `new` (e.g. after a background refresh).
+
+    The swap is a single reference assignment, so readers see either the old or the new
+    snapshot as a whole.
+    """
+    global _snapshot
+    with _lock:
+        _snapshot = new
+
+
+def get_dataset():
+    """Returns the decoded dataset of the current snapshot.
+
+    The same DataFrame is handed to every caller, so it must be treated as read-only.
+    """
+    return snapshot().df
+
+
+def get_index():
+    """Returns the bitmap index of the filter columns, built once alongside the dataset."""
+    return snapshot().index
+
+
+def content_version(df):
+    """Short content hash of a decoded frame, used to key anything derived from it."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:12]
+
+
+def dataset_version():
+    """Version (content hash) of the loaded dataset; loads it first if needed."""
+    return snapshot().version
+
+
+def dataset_source():
+    """Returns where the loaded dataset came from (None before the first load)."""
+    return _snapshot.source if _snapshot is not None else None
+
+
+# --- Shared Memory-Mapped Copy ---
+# Every Streamlit process on a node maps the same decoded file instead of parsing its own copy
+
+def _source_key(source):
+    """Identifies a source file by path, size and modification time (a URL by itself)."""
+    path = Path(str(source))
+    identity = str(source)
+    if path.is_file():
+        stat = path.stat()
+        identity = f'{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}'
+    return hashlib.sha1(identity.encode()).hexdigest()[:12]
+
+
+def shared_path(key):
+    """Path of the shared Arrow copy named `key` (a source key or a data version)."""
+    return Path(config.SHARED_DATASET_DIR) / f'dataset-{key}.arrow'
+
+
+def write_shared(df, path, version):
+    """Writes a decoded frame as an Arrow IPC file laid out for zero-copy reads.
+
+    Categoricals are stored as their integer codes and flags as uint8, with the categories
+    and column kinds in the schema metadata: Arrow's own dictionary and bool types would
+    have to be converted (copied) on the way back to pandas. Written aside and renamed, so
+    processes racing on the first load never map a partial file.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    arrays, kinds = {}, {}
+    for column in df:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[column] = pa.array(values.array.codes)
+            kinds[column] = {'kind': 'category', 'categories': values.cat.categories.tolist(),
+                             'ordered': bool(values.cat.ordered)}
+        elif values.dtype == bool:
+            arrays[column] = pa.array(values.to_numpy().view('uint8'))
+            kinds[column] = {'kind': 'bool'}
+        else:
+            arrays[column] = pa.array(values.to_numpy())
+            kinds[column] = {'kind': 'plain'}
+    table = pa.table(arrays).replace_schema_metadata(
+        {'shopping_dataset': json.dumps({'version': version, 'columns': kinds})})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}')
+    with ipc.new_file(tmp, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def read_shared(path):
+    """Memory-maps a file from write_shared(); returns (df, version).
+
+    Every column is a read-only view of the mapped file: nothing is copied, and the pages
+    stay in the OS page cache, shared by every process that maps the file.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    table = ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    metadata = json.loads(table.schema.metadata[b'shopping_dataset'])
+    columns = {}
+    for column, spec in metadata['columns'].items():
+        values = table.column(column).chunk(0).to_numpy(zero_copy_only=True)
+        if spec['kind'] == 'category':
+            dtype = pd.CategoricalDtype(spec['categories'], ordered=spec['ordered'])
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        elif spec['kind'] == 'bool':
+            values = values.view(bool)
+        columns[column] = values
+    # copy=False keeps one block per column, so pandas does not consolidate (copy) them
+    return pd.DataFrame(columns, copy=False), metadata['version']
+
+
+def load_shared(source):
+    """(df, version) of `source` from its shared copy, writing the copy on first use."""
+    path = shared_path(_source_key(source))
+    if not path.is_file():
+        df = read_dataset(source)
+        write_shared(df, path, content_version(df))
+        # The parsed frame is dropped; this process maps the file like every other one
+        del df
+    with timed('fetch'):
+        return read_shared(path)
+
+
+def share_snapshot(new):
+    """Swaps a snapshot's frame for a mapped copy keyed by its version (e.g. after a refresh)."""
+    path = shared_path(new.version)
+    if not path.is_file():
+        write_shared(new.df, path, new.version)
+    df, _ = read_shared(path)
+    return new._replace(df=df)
+
+# --- Memory Report ---
+
+def _string_representation(raw):
+    """The previous in-memory layout: flags mapped to label strings, text columns as objects."""
+    df = raw.copy()
+    for column, labels in FLAG_LABELS.items():
+        df[column] = df[column].astype(bool).map(labels).astype(object)
+    for column in list(CATEGORY_ORDERS) + CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype(object)
+    return df
+
+
+def memory_report(raw=None):
+    """Compares per-column memory of the old string layout with the compact decoded layout."""
+    raw = read_raw() if raw is None else raw
+    old = _string_representation(raw).memory_usage(deep=True, index=False)
+    new = decode(raw.copy()).memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'Old (bytes)': old, 'New (bytes)': new})
+    report.loc['Total'] = report.sum()
+    report['Reduction'] = 1 - report['New (bytes)'] / report['Old (bytes)']
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=memory_report.__doc__)
+    parser.add_argument('--rows', type=int, help='replicate the dataset to this many rows first')
+    args = parser.parse_args()
+
+    raw = read_raw()
+    if args.rows:
+        repeats = -(-args.rows // len(raw))
+        raw = pd.concat([raw] * repeats, ignore_index=True).iloc[:args.rows]
+    print(f"Rows: {len(raw):,}")
+    print(memory_report(raw).to_string(float_format=lambda v: f'{v:.1%}'))
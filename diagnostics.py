@@ -0,0 +1,86 @@
+"""Streamlit side of the instrumentation: timed chart output, metrics export and the sidebar panel."""
+import time
+
+import pandas as pd
+import streamlit as st
+
+import config
+from cache import aggregate_cache, figure_cache
+from instrumentation import PAGE, STAGES, current_rerun, finish_rerun, metrics
+
+
+def plotly_chart(chart, figure, **kwargs):
+    """`st.plotly_chart` that records the chart's aggregate, figure and serialize stages."""
+    rerun = current_rerun()
+    figure_seconds = rerun.since_mark()
+    start = time.perf_counter()
+    st.plotly_chart(figure, **kwargs)
+    rerun.chart(chart, figure_seconds, time.perf_counter() - start)
+
+
+CACHES = {'aggregate': aggregate_cache, 'figure': figure_cache}
+# Session-state key of the per-page chart rebuild counters kept by fragments.ChartGraph
+REBUILDS_KEY = 'chart_rebuilds'
+
+
+def cache_gauges():
+    """Aggregate and figure cache counters in metric form."""
+    gauges = {}
+    for name, cache in CACHES.items():
+        stats = cache.stats()
+        gauges.update({
+            f'{name}_cache_hits_total': stats['hits'],
+            f'{name}_cache_misses_total': stats['misses'],
+            f'{name}_cache_evictions_total': stats['evictions'],
+            f'{name}_cache_entries': stats['entries'],
+            f'{name}_cache_bytes': stats['bytes'],
+        })
+    return gauges
+
+
+def finish(rerun):
+    """Ends the rerun and, when configured, exports the cumulative metrics."""
+    finish_rerun(rerun)
+    if config.METRICS_PATH:
+        metrics.write(config.METRICS_PATH, cache_gauges())
+
+
+def render_diagnostics(rerun):
+    """Sidebar panel with this rerun's stage timings, cache counters and process totals."""
+    if not config.DIAGNOSTICS_PANEL:
+        return
+    with st.sidebar.expander("⏱️ Diagnostics", expanded=False):
+        st.caption(f"Rerun of {rerun.page}: {rerun.duration * 1000:.0f} ms")
+        if rerun.records:
+            timings = pd.DataFrame(rerun.records, columns=['Stage', 'Chart', 'ms'])
+            timings = timings.assign(ms=timings['ms'] * 1000)
+            # Rows in drawing order with the page-level stages first; columns in stage order
+            table = timings.pivot_table(index='Chart', columns='Stage', values='ms', aggfunc='sum', sort=False)
+            table = table.reindex(columns=[stage for stage in STAGES if stage in table.columns])
+            table = table.reindex([PAGE] + [chart for chart in table.index if chart != PAGE]).dropna(how='all')
+            st.dataframe(table.round(1), use_container_width=True)
+
+        rebuilds = st.session_state.get(REBUILDS_KEY, {}).get(rerun.page)
+        if rebuilds:
+            st.caption(f"Charts this session: {rebuilds['built']} rebuilt, {rebuilds['avoided']} rebuilds avoided")
+
+        counters = rerun.counters
+        if counters.get('store_reads'):
+            # Summed over this rerun's reads of the partitioned store (cache hits read nothing)
+            st.caption(f"Partitioned store: {counters['store_reads']} reads, "
+                       f"{counters['store_partitions_read']} of {counters['store_partitions_total']} partitions, "
+                       f"{counters['store_columns_read']} of {counters['store_columns_total']} columns, "
+                       f"{counters['store_bytes_read'] / 1024 ** 2:.2f} of "
+                       f"{counters['store_bytes_total'] / 1024 ** 2:.2f} MB read")
+
+        for name, cache in CACHES.items():
+            stats = cache.stats()
+            st.caption(f"{name.capitalize()} cache: {stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, "
+                       f"{stats['misses']} misses, {stats['evictions']} evictions), "
+                       f"{stats['entries']} entries, {stats['bytes'] / 1024 ** 2:.1f} MB")
+
+        totals = pd.DataFrame([(stage, count, seconds * 1000 / count if count else 0.0)
+                               for stage, (count, seconds) in metrics.summary().items()],
+                              columns=['Stage', 'Count', 'Mean ms']).set_index('Stage')
+        st.caption("Since the server started:")
+        st.dataframe(totals.round(1), use_container_width=True)
@@ -0,0 +1,187 @@
+"""Chart queries pushed down to DuckDB over a local Parquet copy of the dataset.
+
+Selected with SHOPPING_BACKEND=duckdb; pandas (sources.FrameSource) stays the default.
+Results match FrameSource query for query: group columns come back with the dataset's
+dtypes and sort order, and everything that depends on exact bin edges (violin densities,
+the scatter heatmap) is pushed down as per-value counts and finished with the same NumPy
+code the pandas path uses.
+"""
+import threading
+from pathlib import Path
+
+import duckdb
+import numpy as np
+
+import aggregations
+import config
+import regression
+
+_lock = threading.Lock()
+_connection = None
+
+
+def _cursor():
+    """A cursor on the process-wide in-memory DuckDB (cursors are safe to use per thread)."""
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = duckdb.connect()
+        return _connection.cursor()
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def parquet_copy(df, version, directory=None):
+    """Path of the Parquet copy of `df` for data `version`, written on first use."""
+    directory = Path(directory or config.DUCKDB_PARQUET_DIR)
+    path = directory / f'dataset-{version}.parquet'
+    with _lock:
+        if not path.exists():
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            df.to_parquet(tmp, index=False)
+            tmp.replace(path)
+    return path
+
+
+class DuckDBSource:
+    """Chart queries answered by DuckDB; same interface and results as FrameSource."""
+    kind = 'rows'
+
+    def __init__(self, path, dtypes, selection=None):
+        self.path = Path(path)
+        self.dtypes = dtypes
+        self.selection = {column: list(values) for column, values in (selection or {}).items() if values}
+        self._len = None
+
+    @classmethod
+    def for_dataset(cls, df, version):
+        return cls(parquet_copy(df, version), df.dtypes.to_dict())
+
+    # --- SQL helpers ---
+
+    def _where(self):
+        """WHERE clause and parameters of the filter selection."""
+        clauses, params = [], []
+        for column, values in self.selection.items():
+            clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+            params += [value.item() if isinstance(value, np.generic) else value for value in values]
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _query(self, select, group_by=None):
+        """Runs `SELECT {select} FROM <filtered dataset> [GROUP BY ...]` and returns a DataFrame."""
+        where, params = self._where()
+        sql = f"SELECT {select} FROM read_parquet(?){where}"
+        if group_by:
+            sql += ' GROUP BY ' + ', '.join(_quote(column) for column in group_by)
+        return _cursor().execute(sql, [str(self.path)] + params).df()
+
+    def _restore(self, frame, columns):
+        """Gives group columns the dataset's dtypes and sorts by them, like a pandas groupby."""
+        for column in columns:
+            frame[column] = frame[column].astype(self.dtypes[column])
+        return frame.sort_values(columns, kind='stable').reset_index(drop=True)
+
+    # --- Chart queries (see sources.FrameSource) ---
+
+    def __len__(self):
+        if self._len is None:
+            self._len = int(self._query('count(*) AS n')['n'].iloc[0])
+        return self._len
+
+    def subset(self, mask, selection):
+        return DuckDBSource(self.path, self.dtypes, selection)
+
+    @property
+    def df(self):
+        """The filtered rows, for charts that plot every point (small selections only)."""
+        frame = self._query('*')
+        for column, dtype in self.dtypes.items():
+            frame[column] = frame[column].astype(dtype)
+        return frame
+
+    def counts(self, dims):
+        frame = self._query(', '.join(map(_quote, dims)) + ', count(*) AS "Count"', dims)
+        return self._restore(frame, dims)
+
+    def means(self, dim, value):
+        frame = self._query(f'{_quote(dim)}, avg({_quote(value)}) AS {_quote(value)}', [dim])
+        return self._restore(frame, [dim])
+
+    def value_range(self, value):
+        row = self._query(f'min({_quote(value)}) AS lo, max({_quote(value)}) AS hi').iloc[0]
+        return row['lo'], row['hi']
+
+    def fits(self, x, y, by):
+        x, y = f'{_quote(x)}::DOUBLE', f'{_quote(y)}::DOUBLE'
+        sums = self._query(
+            f'{_quote(by)} AS label, count(*)::DOUBLE AS n, sum({x}) AS sx, sum({y}) AS sy, '
+            f'sum({x} * {y}) AS sxy, sum({x} * {x}) AS sxx, sum({y} * {y}) AS syy', [by]
+        ).sort_values('label')
+        return {row.pop('label'): regression.OLSStats(**row) for row in sums.to_dict('records')}
+
+    def box_stats(self, group, value):
+        g, v = _quote(group), _quote(value)
+        where, params = self._where()
+        cte = f"""
+            WITH rows AS (SELECT {g} AS g, {v} AS v FROM read_parquet(?){where}),
+            box AS (
+                SELECT g, quantile_cont(v, 0.25) AS q1, quantile_cont(v, 0.5) AS median,
+                       quantile_cont(v, 0.75) AS q3, avg(v) AS mean, count(*) AS count
+                FROM rows GROUP BY g
+            ),
+            fences AS (SELECT *, q1 - 1.5 * (q3 - q1) AS lo, q3 + 1.5 * (q3 - q1) AS hi FROM box)
+        """
+        stats_sql = cte + """
+            SELECT g, any_value(q1) AS q1, any_value(median) AS median, any_value(q3) AS q3,
+                   any_value(mean) AS mean, any_value(count) AS count,
+                   min(v) FILTER (WHERE v BETWEEN lo AND hi) AS lowerfence,
+                   max(v) FILTER (WHERE v BETWEEN lo AND hi) AS upperfence
+            FROM rows JOIN fences USING (g) GROUP BY g
+        """
+        outliers_sql = cte + """
+            SELECT g, v, count(*) AS count
+            FROM rows JOIN fences USING (g) WHERE v < lo OR v > hi GROUP BY g, v
+        """
+        args = [str(self.path)] + params
+        cursor = _cursor()
+        stats = self._restore(cursor.execute(stats_sql, args).df().rename(columns={'g': group}), [group])
+        stats = stats.set_index(group)
+        stats[['lowerfence', 'upperfence']] = stats[['lowerfence', 'upperfence']].astype(self.dtypes[value])
+        outliers = cursor.execute(outliers_sql, args).df().rename(columns={'g': group, 'v': value})
+        outliers = self._restore(outliers, [group, value])
+        return stats, outliers
+
+    def _value_counts(self, columns):
+        """Rows per distinct combination of `columns`, as a frame with a 'weight' column."""
+        return self._query(', '.join(map(_quote, columns)) + ', count(*) AS weight', columns)
+
+    def value_counts(self, columns):
+        return self._restore(self._value_counts(columns), columns)
+
+    def kde_curves(self, group, value, points=200, bins=512):
+        g, v = _quote(group), _quote(value)
+        stats = self._query(f'{g}, stddev_samp({v}) AS std, quantile_cont({v}, 0.25) AS q1, '
+                            f'quantile_cont({v}, 0.75) AS q3, count(*) AS n', [group])
+        # Every category gets a curve (empty ones stay flat), as with observed=False in pandas
+        stats = self._restore(stats, [group]).set_index(group).reindex(self.dtypes[group].categories)
+        bandwidth = aggregations.silverman_bandwidth(stats['std'].to_numpy(),
+                                                     (stats['q3'] - stats['q1']).to_numpy(),
+                                                     stats['n'].fillna(0).to_numpy())
+        weights = self._value_counts([group, value])
+        weights[group] = weights[group].astype(self.dtypes[group])
+        lo, hi = float(weights[value].min()), float(weights[value].max())
+        edges = np.linspace(lo, hi, bins + 1) if hi > lo else np.array([lo - 0.5, hi + 0.5])
+        _, counts, labels = aggregations.bin_counts(weights, value, edges, by=group, weights='weight')
+        centers = (edges[:-1] + edges[1:]) / 2
+        grid, densities = aggregations.smooth_counts(centers, counts, bandwidth, lo, hi, points)
+        return grid, densities, labels
+
+    def density_grid(self, x, y, bins=(50, 40)):
+        return aggregations.density_grid_from_value_counts(self._value_counts([x, y]), x, y, bins)
+
+    def sample(self, by, n):
+        # The scan keeps the file's row order, so the sample matches the pandas one
+        return aggregations.stratified_sample(self.df, by, n)
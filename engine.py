@@ -0,0 +1,288 @@
+"""Partitioned map-reduce aggregation over the row-level dataset.
+
+Selected with SHOPPING_BACKEND=parallel. The rows are split into a fixed number of
+contiguous row ranges. Every chart query maps to one partial result per partition: group
+counts, sums, regression sums (regression.OLSStats), extremes or per-value counts. The
+partials are computed by a pool of worker processes and merged in the script thread.
+Per-value counts keep box plots, violins and the density heatmap exact, so results match
+sources.FrameSource.
+
+The server runs a thread per session, so the pool is never forked from it: a child forked
+while another thread holds a lock (logging, the allocator, pyarrow, DuckDB) can deadlock on
+it. Workers start from a fork server (spawned where unavailable) and memory-map the dataset
+from the shared Arrow file of data.write_shared() instead of receiving it.
+
+The partitions depend only on the row count, never on the worker count, and partials are
+merged in partition order. Running the same partitions serially (one worker, small data or
+a broken pool) therefore gives bit-identical results.
+"""
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import aggregations
+import config
+import regression
+
+# The frame a worker process reads from, mapped from the shared file when the worker starts
+_frame = None
+
+
+def _load_frame(path):
+    """Worker initializer: maps the engine's dataset file (zero-copy, shared page cache)."""
+    global _frame
+    from data import read_shared
+    _frame, _ = read_shared(path)
+
+
+def _partition(df, start, stop, mask):
+    part = df.iloc[start:stop]
+    return part if mask is None else part[mask]
+
+
+def _run_task(task):
+    """Worker: runs one map function over one partition of the mapped frame."""
+    start, stop, packed, function, args = task
+    # Filter masks travel bit-packed (8x smaller than bools)
+    mask = None if packed is None else np.unpackbits(packed, count=stop - start).astype(bool)
+    return function(_partition(_frame, start, stop, mask), *args)
+
+
+def _pool_failed(error):
+    """Whether `error` says the pool cannot run tasks (a dead worker, a shut down pool).
+
+    BrokenProcessPool is a RuntimeError too; any other exception comes from the map
+    function itself and is the caller's to see.
+    """
+    return isinstance(error, BrokenProcessPool) or 'cannot schedule new futures' in str(error)
+
+
+def _call(task):
+    """Worker: runs one task that does not read the partitions (see Engine.starmap())."""
+    function, args = task
+    return function(*args)
+
+
+def _context():
+    """forkserver where available, else spawn; never a fork of the (multithreaded) server."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# --- Map functions (module level, so tasks pickle by reference) ---
+
+def _counts(part, dims):
+    return aggregations.category_counts(part, dims)
+
+
+def _sums(part, dim, value):
+    return part.groupby(dim, observed=True)[value].agg(['sum', 'count'])
+
+
+def _extremes(part, value):
+    return (part[value].min(), part[value].max()) if len(part) else None
+
+
+def _fits(part, x, y, by):
+    return regression.fit_by_group(part, x, y, by)
+
+
+def _value_counts(part, columns):
+    return aggregations.value_counts(part, columns)
+
+
+class Engine:
+    """Row-range partitions of one dataset version and the worker pool that maps over them.
+
+    The engine only keeps a weak reference to the frame: whoever queries it (a snapshot, a
+    ParallelSource) keeps the frame alive, so a retired version can be freed.
+    """
+
+    def __init__(self, df, version, workers=None, partitions=None):
+        self._df = weakref.ref(df)
+        self.version = version
+        self.workers = config.ENGINE_WORKERS if workers is None else workers
+        count = partitions or config.ENGINE_PARTITIONS
+        count = max(1, min(count, -(-len(df) // config.ENGINE_MIN_PARTITION_ROWS)))
+        bounds = np.linspace(0, len(df), count + 1).astype(int)
+        self.partitions = list(zip(bounds[:-1], bounds[1:]))
+        self._lock = threading.Lock()
+        self._pool = None
+        self._tmpdir = None
+        self._closed = False
+
+    @property
+    def df(self):
+        """The frame of this version (None once nothing refers to it any more)."""
+        return self._df()
+
+    @property
+    def parallel(self):
+        """Whether map() fans out to worker processes (otherwise partitions run serially)."""
+        return not self._closed and self.workers > 1 and len(self.partitions) > 1
+
+    def _shared_file(self, df):
+        """The Arrow file the workers map: the node-wide copy when configured, else a private one."""
+        if config.SHARED_DATASET_DIR:
+            from data import shared_path
+            path = shared_path(self.version)
+        else:
+            self._tmpdir = tempfile.mkdtemp(prefix='shopping-engine-')
+            path = Path(self._tmpdir) / 'dataset.arrow'
+        if not path.is_file():
+            from data import write_shared
+            write_shared(df, path, self.version)
+        return path
+
+    def _get_pool(self, df):
+        with self._lock:
+            if self._pool is None and self.parallel:
+                self._pool = ProcessPoolExecutor(min(self.workers, len(self.partitions)), mp_context=_context(),
+                                                 initializer=_load_frame, initargs=(str(self._shared_file(df)),))
+            return self._pool
+
+    def map(self, function, mask, *args):
+        """[function(partition, *args)] over every partition (of the rows in `mask`), in order."""
+        df = self.df
+        slices = [(start, stop, None if mask is None else mask[start:stop]) for start, stop in self.partitions]
+        pool = self._get_pool(df) if self.parallel else None
+        if pool is not None:
+            tasks = [(start, stop, None if part_mask is None else np.packbits(part_mask), function, args)
+                     for start, stop, part_mask in slices]
+            try:
+                return list(pool.map(_run_task, tasks))
+            except RuntimeError as error:
+                if not _pool_failed(error):
+                    raise
+                # A dead worker or a closed pool: finish serially
+                self.close()
+        return [function(_partition(df, start, stop, part_mask), *args) for start, stop, part_mask in slices]
+
+    def starmap(self, function, arguments):
+        """[function(*args) for args in arguments], on the worker pool when there is one.
+
+        For work that only needs its arguments, not the partitions (e.g. bootstrap chunks).
+        Results come back in order; like map(), it finishes serially when the pool fails.
+        """
+        pool = self._get_pool(self.df) if self.parallel else None
+        if pool is not None:
+            try:
+                return list(pool.map(_call, [(function, args) for args in arguments]))
+            except RuntimeError as error:
+                if not _pool_failed(error):
+                    raise
+                self.close()
+        return [function(*args) for args in arguments]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._tmpdir is not None:
+                # Workers that still have the file mapped keep their pages until they exit
+                shutil.rmtree(self._tmpdir, ignore_errors=True)
+                self._tmpdir = None
+
+
+# Reentrant: a retired frame can be collected (and its engine closed) while the lock is held
+_lock = threading.RLock()
+_engines = {}  # data version -> Engine
+
+
+def _retire(engine):
+    with _lock:
+        if _engines.get(engine.version) is engine:
+            del _engines[engine.version]
+    engine.close()
+
+
+def get_engine(df, version):
+    """The process-wide engine of dataset `version`, shared by every session pinned to it.
+
+    During a refresh, sessions on the old and the new version each keep their own engine
+    (and pool). An engine is closed once its frame is gone, i.e. when neither the current
+    snapshot nor any session's pinned snapshot refers to it any more.
+    """
+    with _lock:
+        engine = _engines.get(version)
+        if engine is None or engine.df is None:
+            engine = _engines[version] = Engine(df, version)
+            weakref.finalize(df, _retire, engine)
+        return engine
+
+
+class ParallelSource:
+    """Chart queries answered by the partitioned engine; same interface and results as FrameSource."""
+    kind = 'rows'
+
+    def __init__(self, engine, mask=None):
+        self.engine = engine
+        # Holds the rows alive (the engine only refers to them weakly) while the source is in use
+        self.rows = engine.df
+        self.mask = mask
+
+    def __len__(self):
+        return len(self.rows) if self.mask is None else int(np.count_nonzero(self.mask))
+
+    def subset(self, mask, selection):
+        return ParallelSource(self.engine, mask)
+
+    @property
+    def df(self):
+        """The filtered rows, for charts that plot every point (small selections only)."""
+        return self.rows if self.mask is None else self.rows[self.mask]
+
+    def _map(self, function, *args):
+        return self.engine.map(function, self.mask, *args)
+
+    # --- Chart queries (see sources.FrameSource) ---
+
+    def counts(self, dims):
+        partials = pd.concat(self._map(_counts, dims), ignore_index=True)
+        return partials.groupby(dims, observed=True)['Count'].sum().reset_index()
+
+    def means(self, dim, value):
+        sums = pd.concat(self._map(_sums, dim, value)).groupby(level=0, observed=True).sum()
+        means = (sums['sum'] / sums['count']).rename(value)
+        means.index.name = dim
+        return means.reset_index()
+
+    def value_range(self, value):
+        extremes = [partial for partial in self._map(_extremes, value) if partial is not None]
+        if not extremes:
+            # Nothing selected: NaN bounds, like the min() and max() of an empty column
+            return np.nan, np.nan
+        return min(lo for lo, _ in extremes), max(hi for _, hi in extremes)
+
+    def fits(self, x, y, by):
+        merged = {}
+        for partial in self._map(_fits, x, y, by):
+            for label, stats in partial.items():
+                merged[label] = merged[label] + stats if label in merged else stats
+        return dict(sorted(merged.items()))
+
+    def box_stats(self, group, value):
+        return aggregations.box_stats_from_value_counts(self.value_counts([group, value]), group, value)
+
+    def kde_curves(self, group, value):
+        return aggregations.kde_curves_from_value_counts(self.value_counts([group, value]), group, value)
+
+    def density_grid(self, x, y):
+        return aggregations.density_grid_from_value_counts(self.value_counts([x, y]), x, y)
+
+    def sample(self, by, n):
+        return aggregations.stratified_sample(self.df, by, n)
+
+    def value_counts(self, columns):
+        partials = pd.concat(self._map(_value_counts, columns), ignore_index=True)
+        return partials.groupby(columns, observed=True)['weight'].sum().reset_index()
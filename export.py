@@ -0,0 +1,189 @@
+"""Static report export: the analysis pages, charts and texts, as HTML (and optionally PNG).
+
+The dataset is loaded once, each page script is executed without a Streamlit server to
+collect its chart builders (fragments.collect_charts) and its headings and narratives, and
+the charts are then built and rendered by a pool of forked worker processes that share
+that single load:
+
+    python export.py [--out reports] [--format html,png] [--workers N]
+
+PNG output needs the optional `kaleido` package.
+"""
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import runpy
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import streamlit as st
+from streamlit.config import set_option
+from streamlit.logger import set_log_level
+
+import config
+from data import get_dataset
+from fragments import collect_charts
+
+PAGES = {
+    'shopping_behaviour': 'Demographic Analysis',
+    'seasonality_discount': 'Season & Discount Analysis',
+    'loyalty_preferences': 'Loyalty & Preferences',
+}
+
+# Streamlit text elements copied into the report, and the HTML tag each becomes
+TEXT_ELEMENTS = {'title': 'h1', 'header': 'h2', 'subheader': 'h3', 'markdown': 'p'}
+
+# Builders collected in the parent; forked workers inherit them (closures do not pickle)
+_charts = []
+
+
+@contextmanager
+def collect_text(page, charts, texts):
+    """Records the page's TEXT_ELEMENTS calls into `texts` as (page, position, element, body).
+
+    `position` is the number of the page's charts in `charts` drawn before the text, which
+    places the text among the charts of the report.
+    """
+    def recorder(element):
+        def record(body, *args, **kwargs):
+            texts.append((page, len(charts), element, str(body)))
+        return record
+
+    originals = {element: getattr(st, element) for element in TEXT_ELEMENTS}
+    for element in TEXT_ELEMENTS:
+        setattr(st, element, recorder(element))
+    try:
+        yield texts
+    finally:
+        for element, original in originals.items():
+            setattr(st, element, original)
+
+
+def collect(pages=PAGES):
+    """Runs each page script in bare mode; returns its [(page, chart, build)] and texts.
+
+    The texts are collect_text() entries, computed from the data like on the pages.
+    """
+    charts, texts = [], []
+    for page in pages:
+        with collect_charts() as collected, collect_text(page, collected, texts):
+            runpy.run_path(str(config.BASE_DIR / f'{page}.py'), run_name='__export__')
+        charts += collected
+    return charts, texts
+
+
+def _export(args):
+    """Worker: builds chart `index` and writes its files; returns timings and the HTML div."""
+    index, out, formats = args
+    page, name, build = _charts[index]
+    start = time.perf_counter()
+    figure = build()
+    built = time.perf_counter()
+    div = figure.to_html(full_html=False, include_plotlyjs=False) if 'html' in formats else None
+    if 'png' in formats:
+        figure.write_image(str(Path(out) / page / f'{name}.png'), scale=2)
+    return {'page': page, 'chart': name, 'title': figure.layout.title.text, 'build_s': built - start,
+            'render_s': time.perf_counter() - built, 'div': div}
+
+
+def _markdown_html(text):
+    """The Markdown the page narratives use (paragraphs, **bold**, --- rules) as HTML."""
+    blocks = []
+    for block in re.split(r'\n\s*\n', text.strip()):
+        block = ' '.join(line.strip() for line in block.splitlines())
+        if block == '---':
+            blocks.append('<hr>')
+        elif block:
+            blocks.append('<p>' + re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(block)) + '</p>')
+    return '\n'.join(blocks)
+
+
+def _text_html(element, body):
+    if element == 'markdown':
+        return _markdown_html(body)
+    tag = TEXT_ELEMENTS[element]
+    return f'<{tag}>{html.escape(body)}</{tag}>'
+
+
+def _write_page(out, page, results, texts):
+    """Writes `page`.html: the page's headings, narratives and charts in page order.
+
+    Each chart follows the header the page draws above it. A chart with no text before it
+    gets its figure title as heading.
+    """
+    parts = []
+    for position, result in enumerate(results + [None]):
+        before = [_text_html(element, body) for at, element, body in texts if at == position]
+        parts += before
+        if result is not None:
+            heading = '' if before else f'<h2>{html.escape(result["title"] or result["chart"])}</h2>'
+            parts.append(f'<section>{heading}{result["div"]}</section>')
+    title = html.escape(PAGES.get(page, page))
+    if not any(element == 'title' for _, element, _ in texts):
+        parts.insert(0, f'<h1>{title}</h1>')
+    body = '\n'.join(parts)
+    (Path(out) / f'{page}.html').write_text(
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+        f'<script src="plotly.min.js"></script></head><body>\n{body}\n</body></html>',
+        encoding='utf-8',
+    )
+
+
+def export(out, formats=('html',), workers=None, pages=PAGES):
+    """Exports every chart of `pages` to `out`; returns the per-chart results."""
+    global _charts
+    if 'png' in formats:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            raise SystemExit("PNG export needs the kaleido package (pip install kaleido)")
+    out = Path(out)
+    for page in pages:
+        (out / page if 'png' in formats else out).mkdir(parents=True, exist_ok=True)
+
+    # Bare-mode Streamlit warns about the direct execution and the missing script context
+    set_option('global.showWarningOnDirectExecution', False)
+    set_log_level('error')
+    # The single shared load, and Plotly itself, are inherited by every forked worker
+    get_dataset()
+    import plotly.express  # noqa: F401
+    _charts, texts = collect(pages)
+    tasks = [(i, str(out), formats) for i in range(len(_charts))]
+    workers = workers or os.cpu_count() or 1
+    # Workers must inherit the collected builders, which only forking provides
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            results = list(pool.map(_export, tasks))
+    else:
+        results = [_export(task) for task in tasks]
+
+    if 'html' in formats:
+        from plotly.offline import get_plotlyjs
+
+        (out / 'plotly.min.js').write_text(get_plotlyjs(), encoding='utf-8')
+        for page in pages:
+            _write_page(out, page, [r for r in results if r['page'] == page],
+                        [(at, element, body) for text_page, at, element, body in texts if text_page == page])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the analysis pages as static reports.')
+    parser.add_argument('--out', default='reports', help='output directory')
+    parser.add_argument('--format', default='html', help='comma-separated: html, png')
+    parser.add_argument('--workers', type=int, help='processes (defaults to the CPU count)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = export(args.out, tuple(args.format.split(',')), args.workers)
+    for r in results:
+        print(f"{r['page']:<22} {r['chart']:<30} build {r['build_s']:6.2f}s  render {r['render_s']:6.2f}s")
+    print(f"Exported {len(results)} charts to {args.out} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
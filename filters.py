@@ -0,0 +1,77 @@
+"""Sidebar filters shared by the analysis pages, answered from the bitmap index."""
+import streamlit as st
+
+from data import FILTER_COLUMNS, FLAG_LABELS
+from instrumentation import timed
+from sources import active_index, cube_mode, get_source
+
+# Session-state key holding the current selection, kept when switching pages
+SELECTION_KEY = 'filter_selection'
+
+
+def _label(column, value):
+    """Display label of a filter value (flags are stored as bool)."""
+    return FLAG_LABELS[column][value] if column in FLAG_LABELS else str(value)
+
+
+def current_selection():
+    """The selection of this session as {column: [values]}; empty lists mean 'all'."""
+    return st.session_state.get(SELECTION_KEY, {})
+
+
+def selection_key(selection=None):
+    """Hashable, order-independent form of a selection (columns without values are dropped)."""
+    selection = current_selection() if selection is None else selection
+    return tuple(sorted(
+        (column, tuple(sorted(values, key=str))) for column, values in selection.items() if values
+    ))
+
+
+def render_sidebar_filters():
+    """Draws one multiselect per filter column in the sidebar and stores the selection.
+
+    Meant to be called from main.py before the page runs, so the widgets are shared by every
+    analysis page. Streamlit drops a widget's state on any rerun that does not draw it (e.g.
+    on the Home page), so each widget is restored from the stored selection, minus values the
+    current data no longer has.
+    """
+    try:
+        index = active_index()
+    except Exception:
+        # The page itself reports the loading error
+        return {}
+    saved = current_selection()
+    selection = {}
+    st.sidebar.header("🔍 Filters")
+    for column in FILTER_COLUMNS:
+        if column not in index.bitmaps:
+            continue
+        options = index.values(column)
+        key = f'filter_{column}'
+        st.session_state[key] = [value for value in st.session_state.get(key, saved.get(column, []))
+                                 if value in options]
+        selection[column] = st.sidebar.multiselect(
+            column,
+            options=options,
+            format_func=lambda value, column=column: _label(column, value),
+            placeholder="All",
+            key=key,
+        )
+    st.session_state[SELECTION_KEY] = selection
+    source = get_source()
+    # Cube cells stand for many purchases each, so count through their stored row counts
+    selected = len(apply_filters(source, selection)) if cube_mode() else index.count(selection)
+    st.sidebar.caption(f"{selected:,} of {len(source):,} purchases selected")
+    return selection
+
+
+def apply_filters(source, selection=None):
+    """The part of the shared source (rows or cube cells) matching the selection.
+
+    Sources filter with the bitmap mask, or with the selection itself when they query
+    an external engine.
+    """
+    selection = current_selection() if selection is None else selection
+    with timed('index'):
+        mask = active_index().mask(selection)
+        return source if mask is None else source.subset(mask, selection)
@@ -0,0 +1,88 @@
+"""Charts drawn as isolated fragments, each rebuilt only when one of its inputs changes.
+
+Every chart depends on the filter selection and the data version, plus whatever its own
+controls return. The controls are drawn inside the chart's `st.fragment`, so changing one
+reruns that chart alone instead of the whole page. On a full rerun, a chart whose inputs
+are unchanged is served from the figure cache without being rebuilt.
+"""
+from contextlib import contextmanager
+from functools import partial
+
+import streamlit as st
+
+from cache import cached_figure
+from diagnostics import REBUILDS_KEY, finish, plotly_chart
+from instrumentation import current_rerun, is_tracking, metrics, start_rerun
+
+# When set, ChartGraph.chart() appends (page, name, build) here instead of drawing
+_collector = None
+
+
+@contextmanager
+def collect_charts():
+    """Collects the charts a page script declares, with their builders, without drawing them.
+
+    Used to build figures outside a Streamlit server (see export.py); controls return their
+    default values there, so each builder is bound to the page's default inputs.
+    """
+    global _collector
+    _collector = collected = []
+    try:
+        yield collected
+    finally:
+        _collector = None
+
+
+class ChartGraph:
+    """The charts of one page and the inputs each one depends on."""
+
+    def __init__(self, page):
+        self.page = page
+        self.charts = []
+        pages = st.session_state.setdefault(REBUILDS_KEY, {})
+        self.state = pages.setdefault(page, {'run': 0, 'drawn': {}, 'built': 0, 'avoided': 0})
+        # Counts full runs of the page script; fragment reruns do not execute it
+        self.state['run'] += 1
+
+    def _count(self, key, amount=1):
+        self.state[key] += amount
+        metrics.increment(f'chart_{key}', amount)
+
+    def chart(self, name, build, controls=None, **plotly_kwargs):
+        """Draws chart `name` as a fragment: `build(**controls())` makes the figure on a change.
+
+        `controls` (optional) draws the chart's own widgets and returns their values as a
+        dict; those values, with the filter selection and data version, are the chart's inputs.
+        """
+        self.charts.append(name)
+        if _collector is not None:
+            _collector.append((self.page, name, partial(build, **(controls() if controls else {}))))
+            return
+        plotly_kwargs.setdefault('use_container_width', True)
+
+        @st.fragment
+        def render():
+            # A fragment rerun bypasses main.py, so it is timed as its own rerun
+            rerun = None if is_tracking() else start_rerun(f'{self.page}/{name}')
+            current_rerun().begin_chart()
+            try:
+                if self.state['drawn'].get(name) == self.state['run']:
+                    # Already drawn in this run of the page: only this fragment is rerunning
+                    self._count('avoided', len(self.charts) - 1)
+                self.state['drawn'][name] = self.state['run']
+
+                inputs = controls() if controls else {}
+                built = []
+
+                def counted_build():
+                    built.append(name)
+                    return build(**inputs)
+
+                figure = cached_figure(name, counted_build, tuple(sorted(inputs.items())))
+                self._count('built' if built else 'avoided')
+                plotly_chart(name, figure, **plotly_kwargs)
+            finally:
+                if rerun is not None:
+                    finish(rerun)
+
+        render()
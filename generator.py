@@ -0,0 +1,175 @@
+"""Distribution-preserving synthetic data generator for load testing.
+
+A model is fitted from the bundled CSV:
+  * the joint distribution of the categorical columns and 0/1 flags, as smoothed cell
+    frequencies (empirical counts shrunk towards the product of the marginals, so rare
+    but plausible combinations still appear, while pairs never seen together stay absent);
+  * Age given Age Group, and (Purchase Amount, Review Rating, Previous Purchases) given
+    Category and Season, both drawn from the matching observed rows so that the numeric
+    columns keep their joint shape within each stratum.
+
+Sampling is vectorized NumPy and chunks are generated and written by a process pool:
+
+    python generator.py --rows 10000000 --out synthetic.csv [--workers 8] [--seed 0]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data import read_raw
+
+CATEGORICAL = ['Age Group', 'Gender', 'Category', 'Season',
+               'Subscription Status', 'Discount Applied', 'Frequency of Purchases']
+NUMERIC_STRATA = ['Category', 'Season']
+NUMERIC = ['Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']
+
+
+def _strata(keys, values):
+    """Sorts `values` by integer stratum id; returns (sorted values, starts, sizes) per stratum."""
+    order = np.argsort(keys, kind='stable')
+    sizes = np.bincount(keys, minlength=keys.max() + 1)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    return values[order], starts, sizes
+
+
+def fit_model(raw, smoothing=0.5):
+    """Fits the generator from a raw (undecoded) frame; the result is small and picklable."""
+    columns = list(raw.columns)
+    levels, codes = {}, {}
+    for column in CATEGORICAL:
+        column_codes, column_levels = pd.factorize(raw[column], sort=True)
+        codes[column], levels[column] = column_codes, column_levels.to_numpy()
+
+    # Joint cell frequencies over every combination of the categorical columns
+    shape = tuple(len(levels[column]) for column in CATEGORICAL)
+    flat = np.ravel_multi_index([codes[column] for column in CATEGORICAL], shape)
+    joint = np.bincount(flat, minlength=int(np.prod(shape))).astype(float)
+    joint /= joint.sum()
+    # Shrink towards independence so unseen combinations keep a small probability
+    marginals = [np.bincount(codes[column], minlength=len(levels[column])) / len(raw) for column in CATEGORICAL]
+    independent = marginals[0]
+    for marginal in marginals[1:]:
+        independent = np.multiply.outer(independent, marginal)
+    # ...but never into combinations with an unobserved pair (e.g. subscribers are all male)
+    observed_pairs = np.ones(shape, dtype=bool)
+    for i, first in enumerate(CATEGORICAL):
+        for j in range(i + 1, len(CATEGORICAL)):
+            second = CATEGORICAL[j]
+            pair = np.zeros((shape[i], shape[j]), dtype=bool)
+            pair[codes[first], codes[second]] = True
+            observed_pairs &= np.expand_dims(pair, [k for k in range(len(shape)) if k not in (i, j)])
+    prior = np.where(observed_pairs, independent, 0.0)
+    # Rake the masked prior back onto the observed marginals (iterative proportional fitting)
+    for _ in range(20):
+        for axis, marginal in enumerate(marginals):
+            current = prior.sum(axis=tuple(k for k in range(len(shape)) if k != axis))
+            scale = np.divide(marginal, current, out=np.zeros_like(marginal), where=current > 0)
+            prior *= np.expand_dims(scale, [k for k in range(len(shape)) if k != axis])
+    cell_probabilities = (joint + smoothing * prior.ravel() / prior.sum()) / (1 + smoothing)
+
+    # Age given Age Group
+    age_values, age_starts, age_sizes = _strata(codes['Age Group'], raw['Age'].to_numpy())
+
+    # Numeric triple given (Category, Season), stored row-wise to keep the columns together
+    numeric_shape = tuple(len(levels[column]) for column in NUMERIC_STRATA)
+    numeric_keys = np.ravel_multi_index([codes[column] for column in NUMERIC_STRATA], numeric_shape)
+    numeric_values, numeric_starts, numeric_sizes = _strata(numeric_keys, raw[NUMERIC].to_numpy())
+    numeric_sizes = np.pad(numeric_sizes, (0, int(np.prod(numeric_shape)) - len(numeric_sizes)))
+    numeric_starts = np.pad(numeric_starts, (0, int(np.prod(numeric_shape)) - len(numeric_starts)))
+
+    return {
+        'columns': columns,
+        'dtypes': {column: str(raw[column].dtype) for column in NUMERIC + ['Age']},
+        'levels': levels,
+        'shape': shape,
+        'cell_probabilities': cell_probabilities,
+        'age': (age_values, age_starts, age_sizes),
+        'numeric_shape': numeric_shape,
+        'numeric': (numeric_values, numeric_starts, numeric_sizes),
+        'fallback_numeric': raw[NUMERIC].to_numpy(),
+    }
+
+
+def _draw_from_strata(rng, strata, keys, fallback=None):
+    """One observed value per key, drawn uniformly from that key's stratum."""
+    values, starts, sizes = strata
+    sizes_for_keys = sizes[keys]
+    offsets = np.floor(rng.random(len(keys)) * np.maximum(sizes_for_keys, 1)).astype(np.int64)
+    drawn = values[np.minimum(starts[keys] + offsets, len(values) - 1)]
+    empty = sizes_for_keys == 0
+    if fallback is not None and empty.any():
+        # Strata never observed in the source: fall back to the unconditional distribution
+        drawn[empty] = fallback[rng.integers(0, len(fallback), empty.sum())]
+    return drawn
+
+
+def sample(model, rows, rng):
+    """Draws `rows` synthetic rows in the raw CSV layout."""
+    cells = rng.choice(len(model['cell_probabilities']), size=rows, p=model['cell_probabilities'])
+    codes = dict(zip(CATEGORICAL, np.unravel_index(cells, model['shape'])))
+    frame = {column: model['levels'][column][codes[column]] for column in CATEGORICAL}
+
+    frame['Age'] = _draw_from_strata(rng, model['age'], codes['Age Group'])
+    numeric_keys = np.ravel_multi_index([codes[column] for column in NUMERIC_STRATA], model['numeric_shape'])
+    numeric = _draw_from_strata(rng, model['numeric'], numeric_keys, fallback=model['fallback_numeric'])
+    for i, column in enumerate(NUMERIC):
+        frame[column] = numeric[:, i]
+
+    df = pd.DataFrame(frame)[model['columns']]
+    return df.astype(model['dtypes'])
+
+
+def _write_chunk(args):
+    """Worker: samples one chunk with its own seed and writes it (header-less) to `path`."""
+    model, rows, seed, path = args
+    sample(model, rows, np.random.default_rng(seed)).to_csv(path, index=False, header=False)
+    return rows
+
+
+def generate(model, rows, out, chunk_rows=1_000_000, workers=None, seed=0):
+    """Writes `rows` synthetic rows to the CSV `out`, generating chunks in parallel."""
+    sizes = [min(chunk_rows, rows - start) for start in range(0, rows, chunk_rows)]
+    # Independent, reproducible streams per chunk
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    with tempfile.TemporaryDirectory(dir=Path(out).resolve().parent) as tmp:
+        parts = [Path(tmp) / f'part-{i:05d}.csv' for i in range(len(sizes))]
+        tasks = list(zip([model] * len(sizes), sizes, seeds, parts))
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(tasks) == 1:
+            list(map(_write_chunk, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_write_chunk, tasks))
+        with open(out, 'wb') as target:
+            target.write((','.join(model['columns']) + '\n').encode('utf-8'))
+            for part in parts:
+                with open(part, 'rb') as source:
+                    shutil.copyfileobj(source, target)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic shopping dataset of any size.')
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--source', help='CSV to fit the model on (defaults to the configured dataset)')
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, help='processes (defaults to the CPU count)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = fit_model(read_raw(args.source))
+    generate(model, args.rows, args.out, args.chunk_rows, args.workers, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.out} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
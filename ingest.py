@@ -0,0 +1,57 @@
+"""Chunked streaming ingestion for CSV exports larger than memory.
+
+The CSV is read in bounded chunks; each chunk is decoded on its own and folded into a
+running cube (see cube.py), whose cells carry every aggregate the pages draw. Peak memory
+therefore depends on the chunk size and the number of cube cells, not on the file size.
+"""
+import pandas as pd
+
+import config
+from cube import (AMOUNT, DIMENSIONS, PREVIOUS, RATING, SCATTER_KEYS, SCATTER_MEASURES, build_cube, build_scatter,
+                  merge_cubes)
+from data import decode, resolve_source
+from sketches import build_sketches
+
+# Only the columns the cube needs are parsed
+CUBE_COLUMNS = DIMENSIONS + [AMOUNT, PREVIOUS, RATING]
+
+
+def read_chunks(source=None, chunksize=None, columns=CUBE_COLUMNS):
+    """Yields decoded DataFrames of at most `chunksize` rows from the CSV."""
+    reader = pd.read_csv(
+        source or resolve_source(),
+        usecols=columns,
+        chunksize=chunksize or config.INGEST_CHUNK_ROWS,
+        # Parse the text dimensions straight into categoricals to keep each chunk small
+        dtype={column: 'category' for column in ['Category', 'Season', 'Frequency of Purchases', 'Age Group']},
+    )
+    for chunk in reader:
+        yield decode(chunk)
+
+
+def stream_cube(source=None, chunksize=None, bin_width=None, merge_every=8, sketches=None, sketch_k=None):
+    """Builds the cube and scatter histogram of a CSV one chunk at a time; returns (cube, scatter, rows_read).
+
+    Partial cubes (and histograms) are folded into the running totals every `merge_every`
+    chunks, so at most that many partials (plus one chunk of rows) are held at once. When a sketch dict is
+    given (see sketches.py), every chunk is also folded into it in the same pass, with
+    `sketch_k` items per sketch level (default: from SHOPPING_SKETCH_EPSILON).
+    """
+    total, partials, rows = None, [], 0
+    scatter, scatter_partials = None, []
+    for chunk in read_chunks(source, chunksize):
+        rows += len(chunk)
+        partials.append(build_cube(chunk, bin_width))
+        scatter_partials.append(build_scatter(chunk, bin_width))
+        if sketches is not None:
+            build_sketches(chunk, sketch_k, sketches=sketches)
+        if len(partials) >= merge_every:
+            total = merge_cubes(([total] if total is not None else []) + partials)
+            scatter = merge_cubes(([scatter] if scatter is not None else []) + scatter_partials,
+                                  SCATTER_KEYS, SCATTER_MEASURES)
+            partials, scatter_partials = [], []
+    if partials or total is None:
+        total = merge_cubes(([total] if total is not None else []) + partials)
+        scatter = merge_cubes(([scatter] if scatter is not None else []) + scatter_partials,
+                              SCATTER_KEYS, SCATTER_MEASURES)
+    return total, scatter, rows
@@ -0,0 +1,137 @@
+"""The numbers the page narratives cite, computed together from one grouped pass over the data.
+
+A single value_counts() query over the narrative columns and Purchase Amount yields a small
+weighted table: one row per distinct combination, with its row count. Every share, group mean,
+group median and top category the interpretation texts quote is then read off that table
+with vectorized pandas, with no further scan of the rows. R-squared comes from the
+regression sums the loyalty chart already aggregates (r_squared()). Pages get the insights
+through cached_aggregate, so they are computed once per filter selection and data version,
+and template them into the markdown.
+"""
+import numpy as np
+import pandas as pd
+
+from aggregations import quantiles_from_value_counts
+from data import FLAG_LABELS
+from regression import OLSStats
+
+AMOUNT = 'Purchase Amount (USD)'
+COLUMNS = ['Age Group', 'Gender', 'Category', 'Season', 'Discount Applied', 'Subscription Status',
+           'Frequency of Purchases']
+# The high-frequency purchases the narratives refer to ("weekly and monthly transactions")
+FREQUENT = ['Weekly', 'Monthly']
+# The younger customers of the demographic narrative (18-35)
+YOUNG = ['18–25', '26–35']
+# Share of transactions from which the narratives call discounts a significant driver
+SIGNIFICANT_SHARE = 0.25
+
+
+def weighted_table(source):
+    """Rows per distinct combination of COLUMNS and Purchase Amount, with a 'weight' column.
+
+    On the cube, amounts are per bucket (see cube.value_counts()): group means stay exact
+    and medians fall within a bucket of the exact ones.
+    """
+    return source.value_counts(COLUMNS + [AMOUNT])
+
+
+def _weights(table, column):
+    return table.groupby(column, observed=True)['weight'].sum()
+
+
+def _means(table, column):
+    sums = (table[AMOUNT] * table['weight']).groupby(table[column], observed=True).sum()
+    return sums / _weights(table, column)
+
+
+def _medians(table, column):
+    counts = table.groupby([column, AMOUNT], observed=True)['weight'].sum().reset_index()
+    return pd.Series({label: quantiles_from_value_counts(part[AMOUNT].to_numpy(), part['weight'].to_numpy(), [0.5])[0]
+                      for label, part in counts.groupby(column, observed=True)}, dtype=float)
+
+
+def _frequent_share(table, column):
+    """Share of each group's purchases that are FREQUENT."""
+    frequent = table[table['Frequency of Purchases'].isin(FREQUENT)]
+    return (_weights(frequent, column) / _weights(table, column)).fillna(0.0)
+
+
+def compute(source):
+    """Every figure the narratives quote (except R-squared), as a dict."""
+    table = weighted_table(source)
+    total = table['weight'].sum()
+    category_shares = (_weights(table, 'Category') / total).sort_values(ascending=False)
+    age_category = table.groupby(['Age Group', 'Category'], observed=True)['weight'].sum().unstack(fill_value=0)
+    top_category_by_age = age_category.idxmax(axis=1)
+
+    # The category most over-represented among younger customers, relative to older ones
+    young = table['Age Group'].isin(YOUNG)
+    young_shares = _weights(table[young], 'Category') / table.loc[young, 'weight'].sum()
+    older_shares = (_weights(table[~young], 'Category') / table.loc[~young, 'weight'].sum()).reindex(
+        young_shares.index, fill_value=0.0)
+    young_category = (young_shares - older_shares).idxmax() if len(young_shares) and (~young).any() else None
+
+    frequent = table[table['Frequency of Purchases'].isin(FREQUENT)]
+    frequent_categories = (_weights(frequent, 'Category') / frequent['weight'].sum()).sort_values(ascending=False)
+    age_means, age_medians = _means(table, 'Age Group'), _medians(table, 'Age Group')
+    discount_means = _means(table, 'Discount Applied')
+    return {
+        'purchases': int(total),
+        'discount_share': float(_weights(table, 'Discount Applied').get(True, 0) / total),
+        'discount_mean': float(discount_means.get(True, np.nan)),
+        'full_price_mean': float(discount_means.get(False, np.nan)),
+        'season_means': _means(table, 'Season'),
+        'season_medians': _medians(table, 'Season'),
+        'age_means': age_means,
+        'age_medians': age_medians,
+        'top_age_by_mean': age_means.idxmax(),
+        'top_ages_by_median': list(age_medians.sort_values(ascending=False, kind='stable').index[:2]),
+        'category_shares': category_shares,
+        'top_categories': list(category_shares.index[:2]),
+        'top_category_by_age': top_category_by_age,
+        'young_category': young_category,
+        'young_category_share': float(young_shares.get(young_category, np.nan)),
+        'older_category_share': float(older_shares.get(young_category, np.nan)),
+        'gender_shares': _weights(table, 'Gender') / total,
+        'frequent_share_by_gender': _frequent_share(table, 'Gender'),
+        'frequent_categories': frequent_categories,
+        'subscription_shares': _weights(table, 'Subscription Status') / total,
+        'frequent_share_by_subscription': _frequent_share(table, 'Subscription Status'),
+    }
+
+
+def r_squared(fits):
+    """R-squared of the overall fit, from source.fits() output of any grouping."""
+    overall = sum(fits.values(), OLSStats())
+    return overall.r_squared if overall.n else np.nan
+
+
+# --- Formatting for the narrative templates ---
+
+def usd(value):
+    return 'n/a' if pd.isna(value) else f'{value:.2f} USD'
+
+
+def percent(value, digits=0):
+    return 'n/a' if pd.isna(value) else f'{value:.{digits}%}'
+
+
+def portion(share):
+    """Words for a share of transactions ('a majority', 'a significant portion', ...)."""
+    if pd.isna(share) or share == 0:
+        return 'none'
+    if share >= 0.5:
+        return 'a majority'
+    return 'a significant portion' if share >= SIGNIFICANT_SHARE else 'a small portion'
+
+
+def label(column, value):
+    """Display label of a group (flags are stored as bool)."""
+    return FLAG_LABELS[column].get(value, 'n/a') if column in FLAG_LABELS else str(value)
+
+
+def leader(shares, column):
+    """(label, share) of the largest group in a share series, ('n/a', nan) when it is empty."""
+    if not len(shares):
+        return 'n/a', np.nan
+    return label(column, shares.idxmax()), float(shares.max())
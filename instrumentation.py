@@ -0,0 +1,252 @@
+"""Per-stage timing of dataset loading and chart rendering, per chart and per rerun.
+
+Stages:
+  fetch      reading the CSV (or cube file)
+  decode     converting raw columns to the in-memory types (the former `map` transforms)
+  index      building the filter bitmaps and content hash, and filtering through them
+  aggregate  the groupby/aggregation behind a chart (cache lookups included, the reads it
+             triggers excluded: every stage is timed exclusive of the stages nested in it);
+             aggregates the page computes outside its charts (e.g. for its text) go to _page
+  figure     building the Plotly figure, i.e. everything after the chart's aggregates
+  serialize  `st.plotly_chart`, which serializes the figure for the browser
+
+Every timing feeds process-wide cumulative histograms, exported as Prometheus text or
+JSON, and, while a rerun is tracked on the current thread, that rerun's own record list.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+STAGES = ('fetch', 'decode', 'index', 'aggregate', 'figure', 'serialize')
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Label used for stages that belong to the page rather than to one chart
+PAGE = '_page'
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations; buckets are cumulated on export."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        slot = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[slot] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)], ending with ('+Inf', count)."""
+        total, result = 0, []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """Thread-safe registry of stage histograms keyed by (stage, chart)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._reruns = Histogram()
+        self._counters = {}
+
+    def observe(self, stage, chart, seconds):
+        with self._lock:
+            key = (stage, chart or PAGE)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(seconds)
+
+    def observe_rerun(self, seconds):
+        with self._lock:
+            self._reruns.observe(seconds)
+
+    def increment(self, name, amount=1):
+        """Adds to the process-wide counter `name` (exported as shopping_<name>_total)."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def summary(self):
+        """{stage: (count, total seconds)} over all charts, for the diagnostics panel."""
+        with self._lock:
+            totals = {}
+            for (stage, _), histogram in self._histograms.items():
+                count, seconds = totals.get(stage, (0, 0.0))
+                totals[stage] = (count + histogram.count, seconds + histogram.sum)
+            totals['rerun'] = (self._reruns.count, self._reruns.sum)
+            return totals
+
+    def to_json(self, gauges=None):
+        with self._lock:
+            histograms = [{'stage': stage, 'chart': chart, 'count': h.count, 'sum': h.sum,
+                           'buckets': [[str(bound), count] for bound, count in h.cumulative()]}
+                          for (stage, chart), h in sorted(self._histograms.items())]
+            reruns = {'count': self._reruns.count, 'sum': self._reruns.sum,
+                      'buckets': [[str(bound), count] for bound, count in self._reruns.cumulative()]}
+            counters = dict(self._counters)
+        return json.dumps({'stages': histograms, 'reruns': reruns, 'counters': counters,
+                           'gauges': gauges or {}}, indent=2)
+
+    def to_prometheus(self, gauges=None):
+        lines = []
+
+        def histogram_lines(name, histogram, labels):
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {count}')
+            suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+            lines.append(f'{name}_sum{suffix} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{suffix} {histogram.count}')
+
+        with self._lock:
+            lines += ['# HELP shopping_stage_duration_seconds Time spent per rendering stage.',
+                      '# TYPE shopping_stage_duration_seconds histogram']
+            for (stage, chart), histogram in sorted(self._histograms.items()):
+                histogram_lines('shopping_stage_duration_seconds', histogram, f'stage="{stage}",chart="{chart}",')
+            lines += ['# HELP shopping_rerun_duration_seconds Time per script rerun.',
+                      '# TYPE shopping_rerun_duration_seconds histogram']
+            histogram_lines('shopping_rerun_duration_seconds', self._reruns, '')
+            for name, value in sorted(self._counters.items()):
+                lines += [f'# TYPE shopping_{name}_total counter', f'shopping_{name}_total {value}']
+        for name, value in (gauges or {}).items():
+            kind = 'counter' if name.endswith('_total') else 'gauge'
+            lines += [f'# TYPE shopping_{name} {kind}', f'shopping_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, gauges=None):
+        """Writes the metrics to `path` atomically: JSON for *.json, Prometheus text otherwise."""
+        path = Path(path)
+        text = self.to_json(gauges) if path.suffix == '.json' else self.to_prometheus(gauges)
+        # Scrapers must never see a half-written file, so write aside and rename
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}')
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, path)
+
+
+metrics = Metrics()
+
+
+class Rerun:
+    """Stage timings of one script rerun, in the order they happened."""
+
+    def __init__(self, page=None):
+        self.page = page
+        self.started = time.perf_counter()
+        self.records = []  # (stage, chart, seconds)
+        self.duration = None
+        self._pending_aggregate = 0.0  # aggregate time not yet attributed to a chart
+        self.in_chart = False  # between begin_chart() and chart()
+        self._mark = self.started  # end of the last recorded stage
+        self.counters = {}  # e.g. partitions and bytes read, see count()
+        self.nested = []  # per open timed() stage: seconds spent in stages nested inside it
+
+    def record(self, stage, seconds, chart=None):
+        metrics.observe(stage, chart, seconds)
+        if self.page is not None:
+            self.records.append((stage, chart or PAGE, seconds))
+        self._mark = time.perf_counter()
+
+    def count(self, name, amount=1):
+        """Adds to this rerun's counter `name` and to the process-wide one."""
+        metrics.increment(name, amount)
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_aggregate(self, seconds):
+        self._pending_aggregate += seconds
+        self._mark = time.perf_counter()
+
+    def since_mark(self):
+        return time.perf_counter() - self._mark
+
+    def begin_chart(self):
+        """Opens a chart: aggregates from here until chart() closes it are attributed to it."""
+        self.in_chart = True
+        self._mark = time.perf_counter()
+
+    def chart(self, chart, figure_seconds, serialize_seconds):
+        """Closes `chart`: attributes its aggregates, figure build and serialization to it."""
+        self.record('aggregate', self._pending_aggregate, chart)
+        self.record('figure', figure_seconds, chart)
+        self.record('serialize', serialize_seconds, chart)
+        self._pending_aggregate = 0.0
+        self.in_chart = False
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (Unix only; 0 elsewhere)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+_local = threading.local()
+
+
+def current_rerun():
+    """The rerun tracked on this thread (an untracked one when none was started)."""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        rerun = _local.rerun = Rerun()
+    return rerun
+
+
+def is_tracking():
+    """Whether a rerun started with start_rerun() is being tracked on this thread."""
+    rerun = getattr(_local, 'rerun', None)
+    return rerun is not None and rerun.page is not None
+
+
+def start_rerun(page):
+    """Starts tracking a rerun of `page` on this thread (Streamlit runs each session in its own)."""
+    _local.rerun = Rerun(page)
+    return _local.rerun
+
+
+def finish_rerun(rerun):
+    """Records the rerun's total duration and stops tracking it."""
+    rerun.duration = time.perf_counter() - rerun.started
+    metrics.observe_rerun(rerun.duration)
+    if getattr(_local, 'rerun', None) is rerun:
+        _local.rerun = None
+    return rerun
+
+
+@contextmanager
+def timed(stage, chart=None):
+    """Times the block as `stage`; aggregates inside a chart are held until it is drawn.
+
+    Aggregates outside a chart (between chart() and the next begin_chart()) belong to the
+    page and are recorded under PAGE right away.
+
+    Stages nest, e.g. the fetch and decode of a store read inside a chart's aggregate. Each
+    one is recorded with its exclusive time (minus its nested stages), so the stages of a
+    rerun never add up to more than the rerun.
+    """
+    rerun = current_rerun()
+    rerun.nested.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        seconds = elapsed - rerun.nested.pop()
+        if rerun.nested:
+            rerun.nested[-1] += elapsed
+        if stage == 'aggregate' and chart is None and rerun.in_chart:
+            rerun.add_aggregate(seconds)
+        else:
+            rerun.record(stage, seconds, chart)
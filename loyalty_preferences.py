@@ -1,7 +1,15 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+
+import config
+import insights
+from cache import cached_aggregate
+from charts import density_figure, go, px
+from data import FLAG_LABELS, frequency_order, label_flags
+from filters import apply_filters
+from fragments import ChartGraph
+from regression import OLSStats
+from sources import load_source
 
 # Page configuration
 st.set_page_config(layout="wide")
@@ -10,140 +18,210 @@ st.markdown("This section examines how product preferences and customer loyalty
 
 # --- Configuration and Data Loading ---
 
-@st.cache_data
-def load_and_process_data_loyalty():
-    """Load and process the shopping behavior dataset"""
-    url = 'https://raw.githubusercontent.com/izzatimahrup/SvAssignment/refs/heads/main/shopping_behaviour_cleaned.csv'
-    try:
-        df = pd.read_csv(url)
-        
-        # Data Transformation - handle both numeric and string values
-        if df['Gender'].dtype in ['int64', 'float64']:
-            df['Gender'] = df['Gender'].map({1: 'Male', 0: 'Female'})
-        
-        if df['Subscription Status'].dtype in ['int64', 'float64']:
-            df['Subscription Status'] = df['Subscription Status'].map({1: 'Subscribed', 0: 'Non-Subscribed'})
-        
-        if df['Discount Applied'].dtype in ['int64', 'float64']:
-            df['Discount Applied'] = df['Discount Applied'].map({1: 'Discount Applied', 0: 'No Discount'})
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
-
-# Load data
-df = load_and_process_data_loyalty()
+# Load data (shared across pages: decoded rows, or the precomputed cube when configured)
+source = load_source()
 
-if df.empty:
+if source is None:
     st.warning("No data available. Please check the data source.")
     st.stop()
 
-# --- Define frequency order for consistent visualization ---
-frequency_order = ['Annually', 'Quarterly', 'Monthly', 'Fortnightly', 'Weekly', 'Daily']
+# Apply the sidebar filters (shared across pages) through the bitmap index
+source = apply_filters(source)
+if len(source) == 0:
+    st.warning("No purchases match the selected filters.")
+    st.stop()
+
+# Each chart runs as its own fragment and is only rebuilt when its inputs change
+chart_graph = ChartGraph('loyalty_preferences')
+
+# Figures quoted in the text below, computed from the data in one pass (see insights.py); R-squared
+# comes from the regression sums the scatter chart shares through the same cache key
+facts = cached_aggregate('narrative_insights', lambda: insights.compute(source))
+segment_fits = cached_aggregate('subscription_purchase_fits', lambda: source.fits('Previous Purchases', 'Purchase Amount (USD)', 'Subscription Status'))
+r_squared = insights.r_squared(segment_fits)
+volume_group, volume_share = insights.leader(facts['subscription_shares'], 'Subscription Status')
+frequent_category, frequent_category_share = insights.leader(facts['frequent_categories'], 'Category')
+frequent_shares = facts['frequent_share_by_subscription']
 
 # --- Plotly Visualizations ---
 st.header("📊 Visualizations of Objectives 3")
 st.markdown("To explores how product preferences, such as item category and color, alongside customer loyalty factors like subscriptions and previous purchases, affect consumer decision-making. It aims to understand how loyalty and product choices influence overall purchase frequency and amounts spent.")
 
 st.header("🔎 Summary")
-st.markdown("This analysis explores how customer loyalty and product preference drive purchase behavior. While Non-Subscribed customers drive the largest overall purchase volume, the data reveals that product preference is the key behavioral driver, with the Clothing category dominating high-frequency transactions. Crucially, loyalty factors are shown to be weak drivers of increased spending: the number of previous purchases has a weak direct correlation with the current purchase amount, confirming a gap in the incentive structure for highly loyal customers.")
+st.markdown(f"This analysis explores how customer loyalty and product preference drive purchase behavior. While {volume_group} customers drive the largest overall purchase volume ({insights.percent(volume_share)}), the data reveals that product preference is the key behavioral driver, with the {frequent_category} category dominating high-frequency transactions. Crucially, loyalty factors are shown to be weak drivers of increased spending: the number of previous purchases has a weak direct correlation with the current purchase amount (R-squared {r_squared:.3f}), confirming a gap in the incentive structure for highly loyal customers.")
 
 # Define the Age Group order for consistent plotting
 
 # 2. Category vs Purchase Frequency
 st.header("1. Category vs Purchase Frequency (Count)")
 try:
-    fig2 = px.bar(
-        df, 
-        x='Category', 
-        color='Frequency of Purchases',
-        title='Category vs Purchase Frequency',
-        category_orders={"Frequency of Purchases": frequency_order},
-        color_discrete_sequence=px.colors.qualitative.Pastel,
-        labels={'count': 'Count'}
-    )
-    fig2.update_layout(yaxis_title="Count", xaxis_title="Category")
-    st.plotly_chart(fig2, use_container_width=True)
+    def build_category_frequency_counts():
+        category_frequency_counts = cached_aggregate('category_frequency_counts', lambda: source.counts(['Category', 'Frequency of Purchases']))
+        fig2 = px.bar(
+            category_frequency_counts, 
+            x='Category', 
+            y='Count',
+            color='Frequency of Purchases',
+            title='Category vs Purchase Frequency',
+            category_orders={"Frequency of Purchases": frequency_order},
+            color_discrete_sequence=px.colors.qualitative.Pastel,
+            labels={'count': 'Count'}
+        )
+        fig2.update_layout(yaxis_title="Count", xaxis_title="Category")
+        return fig2
+
+    chart_graph.chart('category_frequency_counts', build_category_frequency_counts)
 except Exception as e:
     st.error(f"Error creating chart 2: {e}") 
 
 st.subheader("📝 Interpretation 1:")
-st.markdown("""
-The stacked bar chart clearly reveals that product preference is the primary driver of high frequency, with the Clothing category generating the overwhelming majority of weekly and monthly transactions. This finding confirms the need to anchor all high-frequency marketing, inventory management, and cross-selling efforts around this core category.
+st.markdown(f"""
+The stacked bar chart clearly reveals that product preference is the primary driver of high frequency, with the {frequent_category} category generating the largest share of weekly and monthly transactions ({insights.percent(frequent_category_share)}). This finding confirms the need to anchor all high-frequency marketing, inventory management, and cross-selling efforts around this core category.
 """)
 st.markdown("---")
 
 # 4. Scatter Plot: Previous Purchases vs Purchase Amount
 st.header("2. Relationship: Previous Purchases vs Purchase Amount")
 try:
-    fig4 = px.scatter(
-        df, 
-        x='Previous Purchases', 
-        y='Purchase Amount (USD)',
-        title='Relationship: Previous Purchases vs Purchase Amount (with OLS Trendline)', # Updated title
-        opacity=0.4, # Decreased opacity slightly to better handle overplotting
-        render_mode='webgl', # Recommended for large datasets in Plotly
-        trendline='ols', 
-        trendline_color_override='#FFD700', # Change to a brighter color like gold for dark mode visibility
-        labels={'Previous Purchases': 'Previous Purchases', 'Purchase Amount (USD)': 'Purchase Amount (USD)'},
-        # Add color to the points based on a third variable (e.g., 'Gender' or 'Subscription Status') for deeper insight
-        # color='Subscription Status' 
-    )
-    
-    fig4.update_traces(marker=dict(size=5, line=dict(width=0.5, color='DarkSlateGray'))) # Style the markers
-    
-    # Extract and display the R-squared value for the OLS trendline
-    results = px.get_trendline_results(fig4)
-    r_squared = results.iloc[0]["px_fit_results"].rsquared
-    
-    fig4.update_layout(
-        xaxis_title="Previous Purchases", 
-        yaxis_title="Purchase Amount (USD)",
-        plot_bgcolor='rgba(0,0,0,0)', 
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='white'),
-        # Annotate the R-squared value
-        annotations=[
-            dict(
-                xref='paper', yref='paper',
-                x=0.95, y=0.05,
-                text=f'R-squared: {r_squared:.3f}', # Display R-squared near the bottom right
-                showarrow=False,
-                font=dict(color='white', size=12)
+    # Above the threshold every row would be serialized to the browser, so the points are
+    # binned server-side into a density heatmap; the trendline and R-squared are kept
+    density_mode = len(source) > config.SCATTER_DENSITY_THRESHOLD
+
+    def purchase_scatter_controls():
+        # Drawn inside the chart's fragment, so toggling them reruns this chart only
+        per_segment = st.checkbox("Separate trendline per subscription status", value=False)
+        show_sample = False
+        if source.kind == 'cube':
+            st.caption("Answered from the cube: the heatmap comes from its Previous Purchases × Purchase Amount "
+                       "histogram, and the trendline is drawn with its 95% confidence band. Individual purchases "
+                       "are not stored, so no sample of them can be overlaid.")
+        elif density_mode:
+            show_sample = st.checkbox("Overlay a sample of individual purchases", value=False,
+                                      disabled=config.SCATTER_SAMPLE_SIZE <= 0)
+        return {'per_segment': per_segment, 'show_sample': show_sample}
+
+    def build_purchase_scatter(per_segment, show_sample):
+        # One pass gives the regression statistics of both segments; their sum is the overall fit
+        segment_fits = cached_aggregate('subscription_purchase_fits', lambda: source.fits('Previous Purchases', 'Purchase Amount (USD)', 'Subscription Status'))
+        overall_fit = sum(segment_fits.values(), OLSStats())
+
+        # The cube keeps no individual points, so it is always drawn as a heatmap
+        grid = None
+        if density_mode or source.kind == 'cube':
+            grid = cached_aggregate('purchase_density_grid', lambda: source.density_grid('Previous Purchases', 'Purchase Amount (USD)'))
+        if grid is None and source.kind == 'cube':
+            # A cube built without its scatter histogram: the fit and its confidence band only
+            fig4 = go.Figure()
+            fig4.update_layout(title='Relationship: Previous Purchases vs Purchase Amount (OLS Trendline with 95% CI)')
+        elif grid is not None:
+            x_centers, y_centers, counts = grid
+            fig4 = density_figure(
+                x_centers, y_centers, counts,
+                x='Previous Purchases',
+                y='Purchase Amount (USD)',
+                title='Relationship: Previous Purchases vs Purchase Amount (Density, with OLS Trendline)'
+            )
+            if show_sample:
+                # Sample proportionally per subscription group so both groups stay visible
+                sample = source.sample('Subscription Status', config.SCATTER_SAMPLE_SIZE)
+                fig4.add_trace(go.Scattergl(
+                    x=sample['Previous Purchases'], y=sample['Purchase Amount (USD)'],
+                    mode='markers', opacity=0.4, name='Sampled purchases',
+                    marker=dict(size=5, color='white', line=dict(width=0.5, color='DarkSlateGray'))
+                ))
+        else:
+            fig4 = px.scatter(
+                source.df, 
+                x='Previous Purchases', 
+                y='Purchase Amount (USD)',
+                title='Relationship: Previous Purchases vs Purchase Amount (with OLS Trendline)', # Updated title
+                opacity=0.4, # Decreased opacity slightly to better handle overplotting
+                render_mode='webgl', # Recommended for large datasets in Plotly
+                labels={'Previous Purchases': 'Previous Purchases', 'Purchase Amount (USD)': 'Purchase Amount (USD)'},
+                # Add color to the points based on a third variable (e.g., 'Gender' or 'Subscription Status') for deeper insight
+                # color='Subscription Status' 
             )
-        ]
-    )
-    st.plotly_chart(fig4, use_container_width=True)
+        
+            fig4.update_traces(marker=dict(size=5, line=dict(width=0.5, color='DarkSlateGray'))) # Style the markers
+
+        # Closed-form OLS trendline(s) drawn across the observed range of previous purchases
+        x_line = np.linspace(*source.value_range('Previous Purchases'), 50)
+        r_squared = overall_fit.r_squared
+        r_squared_text = f'R-squared: {r_squared:.3f}'
+        if per_segment:
+            segment_colors = {True: '#FFD700', False: '#00CED1'}
+            trendlines = []
+            for subscribed, segment_fit in segment_fits.items():
+                label = FLAG_LABELS['Subscription Status'][subscribed]
+                trendlines.append((f'OLS: {label}', segment_fit, segment_colors[subscribed]))
+                r_squared_text += f'<br>{label}: {segment_fit.r_squared:.3f}'
+        else:
+            # Gold for dark mode visibility
+            trendlines = [('OLS trendline', overall_fit, '#FFD700')]
+        for name, line_fit, color in trendlines:
+            if source.kind == 'cube':
+                lower, upper = line_fit.confidence_band(x_line)
+                fig4.add_trace(go.Scatter(x=np.concatenate([x_line, x_line[::-1]]), y=np.concatenate([upper, lower[::-1]]),
+                                          fill='toself', fillcolor=color, opacity=0.25, line=dict(width=0),
+                                          hoverinfo='skip', showlegend=False))
+            fig4.add_trace(go.Scatter(x=x_line, y=line_fit.predict(x_line), mode='lines',
+                                      line=dict(color=color, width=3), name=name))
+
+        fig4.update_layout(
+            xaxis_title="Previous Purchases", 
+            yaxis_title="Purchase Amount (USD)",
+            plot_bgcolor='rgba(0,0,0,0)', 
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white'),
+            # Annotate the R-squared value
+            annotations=[
+                dict(
+                    xref='paper', yref='paper',
+                    x=0.95, y=0.05,
+                    text=r_squared_text, # Display R-squared near the bottom right
+                    showarrow=False,
+                    font=dict(color='white', size=12)
+                )
+            ]
+        )
+        return fig4
+
+    chart_graph.chart('purchase_scatter', build_purchase_scatter, controls=purchase_scatter_controls)
 except Exception as e:
     st.error(f"Error creating chart 4: {e}")
 
 st.subheader("📝 Interpretation 2:")
-st.markdown("""
-The scatter plot shows an almost perfectly flat trendline (R-squared near zero), proving that a customer's purchase history does not influence their current spending amount. This indicates a critical failure to upsell loyal customers, meaning the incentive structure must pivot to encourage high-frequency buyers to increase their average basket size.
+st.markdown(f"""
+The scatter plot shows an almost perfectly flat trendline (R-squared of {r_squared:.3f}), proving that a customer's purchase history does not influence their current spending amount. This indicates a critical failure to upsell loyal customers, meaning the incentive structure must pivot to encourage high-frequency buyers to increase their average basket size.
 """)
 st.markdown("---") 
 
 # 1. Subscription Status vs Purchase Frequency
 st.header("3. Subscription Status vs Purchase Frequency (Count)")
 try:
-    fig1 = px.bar(
-        df, 
-        x='Subscription Status', 
-        color='Frequency of Purchases',
-        title='Subscription Status vs Purchase Frequency',
-        category_orders={"Frequency of Purchases": frequency_order},
-        color_discrete_sequence=px.colors.qualitative.Plotly,
-        labels={'count': 'Count'}
-    )
-    fig1.update_layout(yaxis_title="Count", xaxis_title="Subscription Status")
-    st.plotly_chart(fig1, use_container_width=True)
+    def build_subscription_frequency_counts():
+        subscription_frequency_counts = cached_aggregate('subscription_frequency_counts', lambda: source.counts(['Subscription Status', 'Frequency of Purchases']))
+        subscription_frequency_counts = label_flags(subscription_frequency_counts) # Labels applied after counting
+        fig1 = px.bar(
+            subscription_frequency_counts, 
+            x='Subscription Status', 
+            y='Count',
+            color='Frequency of Purchases',
+            title='Subscription Status vs Purchase Frequency',
+            category_orders={"Frequency of Purchases": frequency_order},
+            color_discrete_sequence=px.colors.qualitative.Plotly,
+            labels={'count': 'Count'}
+        )
+        fig1.update_layout(yaxis_title="Count", xaxis_title="Subscription Status")
+        return fig1
+
+    chart_graph.chart('subscription_frequency_counts', build_subscription_frequency_counts)
 except Exception as e:
     st.error(f"Error creating chart 1: {e}")
     
 st.subheader("📝 Interpretation 3:")
-st.markdown("""
-The stacked bar chart shows that the distribution of high-frequency purchases (Weekly/Monthly) is nearly identical between Subscribed and Non-Subscribed customers. This demonstrates that subscription status is failing to convert loyalty into a higher frequency of visits, requiring the business to urgently restructure subscription benefits to incentivize more frequent transactions.
+st.markdown(f"""
+The stacked bar chart shows that the distribution of high-frequency purchases (Weekly/Monthly) is nearly identical between Subscribed and Non-Subscribed customers ({insights.percent(frequent_shares.get(True), 1)} and {insights.percent(frequent_shares.get(False), 1)} of their purchases). This demonstrates that subscription status is failing to convert loyalty into a higher frequency of visits, requiring the business to urgently restructure subscription benefits to incentivize more frequent transactions.
 """)
 st.markdown("---") 
 
@@ -1,4 +1,11 @@
 import streamlit as st
+
+from diagnostics import finish, render_diagnostics
+from filters import render_sidebar_filters
+from instrumentation import start_rerun
+from refresh import start_refresher
+from sources import pin_snapshot
+
 # Set up page configuration with Shopping Cart emoji as the icon
 st.set_page_config(
     page_title="Shopping Behaviour",  # Page title
@@ -20,5 +27,23 @@ pg = st.navigation(
         "Menu": [home, visualise_demographics, visualise_seasonality, visualise_loyalty]
     }
 )
-# Run the navigation
-pg.run()
+# Time every stage of this rerun (data loading included) for the diagnostics panel and metrics
+rerun = start_rerun(pg.url_path or 'home')
+try:
+    # Poll the source URL in the background (when configured) and read this whole rerun,
+    # fragments included, from one dataset version even if a refresh swaps in a new one
+    start_refresher()
+    try:
+        pin_snapshot()
+    except Exception:
+        # The page itself reports the loading error
+        pass
+    # --- Shared Sidebar Filters ---
+    # Rendered here rather than in each page so the selection survives page switches
+    if pg.url_path != home.url_path:
+        render_sidebar_filters()
+    # Run the navigation
+    pg.run()
+finally:
+    finish(rerun)
+render_diagnostics(rerun)
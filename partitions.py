@@ -0,0 +1,202 @@
+"""Hive-style partitioned columnar store of the dataset, read with partition and column pruning.
+
+The decoded dataset is written as Parquet files under Season=<season>/ directories, and
+optionally Category=<category>/ below those. With SHOPPING_PARTITIONED_PATH pointing at the
+store, every chart query reads only the partitions its filter selection can match and only
+the columns it aggregates. The rest of the selection is pushed down to Parquet as a row
+filter. Partitions, columns and bytes read are counted per rerun for the diagnostics panel.
+
+Build it with:  python partitions.py build [--source CSV] [--out shopping_partitioned]
+                                           [--by Season,Category]
+"""
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from instrumentation import current_rerun, timed
+from sources import FrameSource
+
+PARTITION_COLUMNS = ['Season', 'Category']
+DEFAULT_STORE_PATH = config.BASE_DIR / 'shopping_partitioned'
+# Store-level metadata; pyarrow skips files starting with '_' when it lists the data files
+METADATA_FILE = '_store.json'
+
+
+def build_store(df, out, by=('Season',), version=None):
+    """Writes a decoded frame as a partitioned Parquet store under `out`, replacing it."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    unknown = set(by) - set(PARTITION_COLUMNS)
+    if unknown:
+        raise ValueError(f"Can only partition by {PARTITION_COLUMNS}, not {sorted(unknown)}")
+    out = Path(out)
+    if out.exists():
+        shutil.rmtree(out)
+    partitioning = ds.partitioning(pa.schema([(column, pa.string()) for column in by]), flavor='hive')
+    ds.write_dataset(pa.Table.from_pandas(df, preserve_index=False), out, format='parquet',
+                     partitioning=partitioning)
+    # Partition values come back as plain strings, so the category order is kept here
+    categoricals = {column: {'categories': df[column].cat.categories.tolist(), 'ordered': bool(df[column].cat.ordered)}
+                    for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)}
+    (out / METADATA_FILE).write_text(json.dumps({
+        'version': version, 'partition_by': list(by), 'columns': list(df.columns), 'categoricals': categoricals,
+    }, indent=2), encoding='utf-8')
+
+
+class Store:
+    """An opened partitioned store: its fragments, their column sizes and pruned reads."""
+
+    def __init__(self, path):
+        import pyarrow.dataset as ds
+
+        self.path = Path(path)
+        self.metadata = json.loads((self.path / METADATA_FILE).read_text(encoding='utf-8'))
+        self.version = self.metadata['version']
+        self.columns = self.metadata['columns']
+        self.dataset = ds.dataset(self.path, format='parquet', partitioning='hive')
+        # Compressed bytes of every column of every file, from the Parquet footers
+        self.sizes = {}
+        for fragment in self.dataset.get_fragments():
+            sizes = dict.fromkeys(self.columns, 0)
+            footer = fragment.metadata
+            for group in range(footer.num_row_groups):
+                row_group = footer.row_group(group)
+                for position in range(row_group.num_columns):
+                    chunk = row_group.column(position)
+                    sizes[chunk.path_in_schema] = sizes.get(chunk.path_in_schema, 0) + chunk.total_compressed_size
+            self.sizes[fragment.path] = sizes
+        self.total_bytes = sum(sum(sizes.values()) for sizes in self.sizes.values())
+
+    @staticmethod
+    def _filter(selection):
+        import pyarrow.dataset as ds
+
+        expression = None
+        for column, values in (selection or {}).items():
+            if not values:
+                continue
+            # numpy scalars (e.g. bool flags from the index) are not accepted by pyarrow
+            condition = ds.field(column).isin([value.item() if isinstance(value, np.generic) else value
+                                               for value in values])
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def count_rows(self, selection=None):
+        return self.dataset.count_rows(filter=self._filter(selection))
+
+    def read(self, columns=None, selection=None):
+        """The rows matching `selection`, with only `columns` (all when None), in the dataset's dtypes.
+
+        Partitions whose key cannot match the selection are skipped without opening their
+        files; the counts of what was read are added to the current rerun.
+        """
+        columns = list(columns or self.columns)
+        expression = self._filter(selection)
+        with timed('fetch'):
+            fragments = list(self.dataset.get_fragments(filter=expression))
+            table = self.dataset.to_table(columns=columns, filter=expression)
+        # Filtered columns are read too, to evaluate the row filter; partition keys cost nothing
+        touched = set(columns) | {column for column, values in (selection or {}).items() if values}
+        bytes_read = sum(self.sizes[fragment.path].get(column, 0) for fragment in fragments for column in touched)
+        rerun = current_rerun()
+        rerun.count('store_reads')
+        rerun.count('store_partitions_read', len(fragments))
+        rerun.count('store_partitions_total', len(self.sizes))
+        rerun.count('store_columns_read', len(touched))
+        rerun.count('store_columns_total', len(self.columns))
+        rerun.count('store_bytes_read', bytes_read)
+        rerun.count('store_bytes_total', self.total_bytes)
+        with timed('decode'):
+            return self._restore(table.to_pandas())
+
+    def _restore(self, df):
+        for column, dtype in self.metadata['categoricals'].items():
+            if column in df:
+                df[column] = pd.Categorical(df[column].astype(object), categories=dtype['categories'],
+                                            ordered=dtype['ordered'])
+        return df
+
+
+class PartitionedSource:
+    """Chart queries answered from a partitioned store, reading only what each query needs.
+
+    Same interface and results as sources.FrameSource; the filter selection is kept and
+    pushed down to every read instead of a row mask.
+    """
+    kind = 'rows'
+
+    def __init__(self, store, selection=None):
+        self.store = store
+        self.selection = selection or {}
+
+    def __len__(self):
+        return self.store.count_rows(self.selection)
+
+    def subset(self, mask, selection):
+        return PartitionedSource(self.store, selection)
+
+    @property
+    def df(self):
+        """The filtered rows with every column, for charts that plot every point."""
+        return self.store.read(selection=self.selection)
+
+    def _rows(self, *columns):
+        return FrameSource(self.store.read(columns, self.selection))
+
+    # --- Chart queries (see sources.FrameSource) ---
+
+    def counts(self, dims):
+        return self._rows(*dims).counts(dims)
+
+    def means(self, dim, value):
+        return self._rows(dim, value).means(dim, value)
+
+    def box_stats(self, group, value):
+        return self._rows(group, value).box_stats(group, value)
+
+    def kde_curves(self, group, value):
+        return self._rows(group, value).kde_curves(group, value)
+
+    def fits(self, x, y, by):
+        return self._rows(x, y, by).fits(x, y, by)
+
+    def value_range(self, value):
+        return self._rows(value).value_range(value)
+
+    def density_grid(self, x, y):
+        return self._rows(x, y).density_grid(x, y)
+
+    def sample(self, by, n):
+        return FrameSource(self.df).sample(by, n)
+
+    def value_counts(self, columns):
+        return self._rows(*columns).value_counts(columns)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from data import content_version, read_dataset
+
+    parser = argparse.ArgumentParser(description="Build the dashboard's partitioned columnar store.")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='write the dataset as a Hive-partitioned Parquet store')
+    build.add_argument('--source', help='CSV to read (defaults to the configured dataset)')
+    build.add_argument('--out', default=config.PARTITIONED_PATH or str(DEFAULT_STORE_PATH))
+    build.add_argument('--by', default='Season',
+                       help='comma-separated partition columns: Season, optionally followed by Category')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = read_dataset(args.source)
+    by = [column.strip() for column in args.by.split(',') if column.strip()]
+    build_store(df, args.out, by, version=content_version(df))
+    store = Store(args.out)
+    print(f"Store: {len(df):,} rows -> {len(store.sizes)} partitions by {', '.join(by)}, "
+          f"{store.total_bytes / 1024 ** 2:.1f} MB, written to {args.out} in {time.perf_counter() - start:.2f}s")
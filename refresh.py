@@ -0,0 +1,141 @@
+"""Background refresh of the dataset from its source URL.
+
+A daemon thread polls SHOPPING_DATA_URL every SHOPPING_REFRESH_SECONDS with a conditional
+GET (If-None-Match / If-Modified-Since from the previous response). A 304 costs one round
+trip. A changed file is parsed, decoded and indexed on the refresher thread, then swapped in
+with data.swap_dataset(), so reruns never wait on the network. Sessions pick the new version
+up on their next full rerun (sources.pin_snapshot); caches are keyed by version, so entries
+of the old one simply age out.
+
+    python refresh.py [--url URL] [--interval SECONDS]
+
+polls in the foreground and prints every outcome, e.g. against `python -m http.server`.
+"""
+import argparse
+import io
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import config
+import data
+from instrumentation import metrics
+from sources import cube_mode, partitioned_mode
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher(threading.Thread):
+    """Polls `url` every `interval` seconds and swaps in the dataset when it changed."""
+
+    def __init__(self, url, interval, timeout=None):
+        super().__init__(name='dataset-refresher', daemon=True)
+        self.url = url
+        self.interval = interval
+        self.timeout = config.REFRESH_TIMEOUT if timeout is None else timeout
+        # Validators of the last successful response, sent back on the next poll
+        self.etag = None
+        self.last_modified = None
+        self._stopped = threading.Event()
+
+    def _fetch(self):
+        """Conditional GET of the URL: (body, etag, last_modified), or None when unchanged."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        request = urllib.request.Request(self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read(), response.headers.get('ETag'), response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+
+    def poll(self):
+        """One refresh: 'unchanged', 'same content' or 'swapped'."""
+        metrics.increment('refresh_polls')
+        fetched = self._fetch()
+        if fetched is None:
+            metrics.increment('refresh_unchanged')
+            return 'unchanged'
+        body, etag, last_modified = fetched
+        new = data.build_snapshot(data.read_dataset(io.BytesIO(body)), self.url)
+        # Only remember the validators once the body parsed, so a bad file is fetched again
+        self.etag, self.last_modified = etag, last_modified
+        # Servers without validators (or a touched file) return the same rows again
+        if new.version == data.dataset_version():
+            metrics.increment('refresh_unchanged')
+            return 'same content'
+        if config.SHARED_DATASET_DIR:
+            # Other processes refreshing the same data map this copy instead of writing their own
+            new = data.share_snapshot(new)
+        if config.BACKEND == 'duckdb':
+            # Write the new version's Parquet copy here rather than in the first rerun that needs it
+            from duckdb_source import parquet_copy
+            parquet_copy(new.df, new.version)
+        data.swap_dataset(new)
+        metrics.increment('refresh_swaps')
+        logger.info("Dataset refreshed from %s: version %s, %d rows", self.url, new.version, len(new.df))
+        return 'swapped'
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                # Keep serving the current version; the next poll tries again
+                metrics.increment('refresh_errors')
+                logger.exception("Dataset refresh from %s failed", self.url)
+
+    def stop(self):
+        self._stopped.set()
+
+
+_lock = threading.Lock()
+_refresher = None
+
+
+def start_refresher():
+    """Starts the process-wide refresher once, when SHOPPING_REFRESH_SECONDS is set.
+
+    Not started in cube or partitioned mode, where the pages never read the in-memory dataset.
+    """
+    global _refresher
+    if config.REFRESH_SECONDS <= 0 or not config.DATA_URL or cube_mode() or partitioned_mode():
+        return None
+    with _lock:
+        if _refresher is None:
+            _refresher = Refresher(config.DATA_URL, config.REFRESH_SECONDS)
+            _refresher.start()
+    return _refresher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll the dataset URL with conditional GETs.")
+    parser.add_argument('--url', default=config.DATA_URL, help='CSV URL to poll')
+    parser.add_argument('--interval', type=float, default=config.REFRESH_SECONDS or 10,
+                        help='seconds between polls')
+    args = parser.parse_args()
+
+    refresher = Refresher(args.url, args.interval)
+    print(f"Loaded version {data.dataset_version()} from {data.dataset_source()}")
+    while True:
+        try:
+            outcome = refresher.poll()
+            print(f"{outcome}: version {data.dataset_version()} "
+                  f"(ETag {refresher.etag}, Last-Modified {refresher.last_modified})", flush=True)
+        except Exception as e:
+            print(f"error: {e}", flush=True)
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
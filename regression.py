@@ -0,0 +1,116 @@
+"""Closed-form simple linear regression from running sufficient statistics.
+
+Only the sums n, Σx, Σy, Σxy, Σx² and Σy² are kept, so fits can be updated chunk by chunk,
+merged across chunks or groups, and computed for every segment in one pass over the data.
+"""
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class OLSStats:
+    """Sufficient statistics for the least-squares line of y on x."""
+    n: float = 0.0
+    sx: float = 0.0
+    sy: float = 0.0
+    sxy: float = 0.0
+    sxx: float = 0.0
+    syy: float = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        """Statistics of paired arrays (float64 accumulators)."""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        return cls(len(x), x.sum(), y.sum(), (x * y).sum(), (x * x).sum(), (y * y).sum())
+
+    def update(self, x, y):
+        """Adds a chunk of observations in place and returns self."""
+        return self.merge(OLSStats.from_arrays(x, y))
+
+    def merge(self, other):
+        """Adds another set of statistics (another chunk or group) in place and returns self."""
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+        return self
+
+    def __add__(self, other):
+        return OLSStats(**{f.name: getattr(self, f.name) + getattr(other, f.name) for f in fields(self)})
+
+    # --- Centered sums ---
+    @property
+    def _cxx(self):
+        return self.sxx - self.sx * self.sx / self.n
+
+    @property
+    def _cyy(self):
+        return self.syy - self.sy * self.sy / self.n
+
+    @property
+    def _cxy(self):
+        return self.sxy - self.sx * self.sy / self.n
+
+    # --- Fit ---
+    @property
+    def slope(self):
+        return self._cxy / self._cxx if self.n > 1 and self._cxx > 0 else np.nan
+
+    @property
+    def intercept(self):
+        return (self.sy - self.slope * self.sx) / self.n if self.n else np.nan
+
+    @property
+    def r_squared(self):
+        if self.n < 2 or self._cxx <= 0:
+            return np.nan
+        if self._cyy <= 0:
+            return 0.0
+        return self._cxy ** 2 / (self._cxx * self._cyy)
+
+    @property
+    def residual_variance(self):
+        """Unbiased estimate of the error variance, SSE / (n - 2)."""
+        if self.n < 3 or self._cxx <= 0:
+            return np.nan
+        sse = max(self._cyy - self._cxy ** 2 / self._cxx, 0.0)
+        return sse / (self.n - 2)
+
+    @property
+    def slope_se(self):
+        return np.sqrt(self.residual_variance / self._cxx) if self.n >= 3 else np.nan
+
+    @property
+    def intercept_se(self):
+        if self.n < 3:
+            return np.nan
+        mean_x = self.sx / self.n
+        return np.sqrt(self.residual_variance * (1 / self.n + mean_x ** 2 / self._cxx))
+
+    def predict(self, x):
+        return self.intercept + self.slope * np.asarray(x, dtype=float)
+
+    def confidence_band(self, x, z=1.96):
+        """(lower, upper) confidence band of the fitted mean at `x` (normal approximation)."""
+        x = np.asarray(x, dtype=float)
+        if self.n < 3:
+            return np.full_like(x, np.nan), np.full_like(x, np.nan)
+        mean_x = self.sx / self.n
+        se = np.sqrt(self.residual_variance * (1 / self.n + (x - mean_x) ** 2 / self._cxx))
+        fitted = self.predict(x)
+        return fitted - z * se, fitted + z * se
+
+
+def fit(df, x, y):
+    """Statistics for the whole frame."""
+    return OLSStats.from_arrays(df[x], df[y])
+
+
+def fit_by_group(df, x, y, by):
+    """Statistics per group of `by`, from a single vectorized groupby over the frame."""
+    xs = df[x].to_numpy(dtype=float)
+    ys = df[y].to_numpy(dtype=float)
+    terms = pd.DataFrame({'n': 1.0, 'sx': xs, 'sy': ys, 'sxy': xs * ys, 'sxx': xs * xs, 'syy': ys * ys})
+    sums = terms.groupby(df[by].to_numpy()).sum()
+    return {label: OLSStats(**row) for label, row in sums.iterrows()}
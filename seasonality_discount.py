@@ -1,7 +1,14 @@
-import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go # Retained for completeness
+import streamlit as st
+
+import bootstrap
+import insights
+from cache import cached_aggregate
+from charts import px, violin_figure
+from data import label_flags, season_order
+from filters import apply_filters
+from fragments import ChartGraph
+from sources import load_source
 
 st.set_page_config(layout="wide")
 st.title("🏷️ Season & Discount Analysis")
@@ -9,85 +16,121 @@ st.markdown("This section investigates how seasonality and the use of discounts
 
 # --- Configuration and Data Loading ---
 
-@st.cache_data
-def load_and_process_data_seasonality():
-    """Loads data from URL, processes columns, and prepares DataFrame."""
-    url = 'https://raw.githubusercontent.com/izzatimahrup/SvAssignment/refs/heads/main/shopping_behaviour_cleaned.csv'
-    
-    try:
-        df = pd.read_csv(url)
-        
-        # Data Transformation
-        df['Gender'] = df['Gender'].map({1: 'Male', 0: 'Female'})
-        df['Subscription Status'] = df['Subscription Status'].map({1: 'Subscribed', 0: 'Non-Subscribed'})
-        df['Discount Applied'] = df['Discount Applied'].map({1: 'Discount Applied', 0: 'No Discount'})
-        
-        return df
-    
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
-
-df = load_and_process_data_seasonality()
-
-if df.empty:
+source = load_source()
+
+if source is None:
     st.stop()
 
+# Apply the sidebar filters (shared across pages) through the bitmap index
+source = apply_filters(source)
+if len(source) == 0:
+    st.warning("No purchases match the selected filters.")
+    st.stop()
+
+# Each chart runs as its own fragment and is only rebuilt when its inputs change
+chart_graph = ChartGraph('seasonality_discount')
+
+# Figures quoted in the text below, computed from the data in one pass (see insights.py)
+facts = cached_aggregate('narrative_insights', lambda: insights.compute(source))
+discount_share = insights.percent(facts['discount_share'])
+discount_portion = insights.portion(facts['discount_share'])
+discounts_common = facts['discount_share'] >= insights.SIGNIFICANT_SHARE
+# Bootstrap 95% intervals of the two averages (also drawn as the error bars of chart 2)
+discount_ci = cached_aggregate('avg_purchase_discount_ci', lambda: bootstrap.intervals(source, 'Discount Applied', 'Purchase Amount (USD)'))
+if pd.isna(facts['discount_mean']) or pd.isna(facts['full_price_mean']):
+    # The selection has only discounted or only full-price purchases: nothing to compare
+    discount_comparison = None
+elif len(discount_ci) == 2 and discount_ci['low'].max() <= discount_ci['high'].min():
+    # Overlapping intervals: the gap is within sampling noise, so neither side is called higher
+    discount_comparison = 'about the same'
+else:
+    discount_comparison = 'slightly lower' if facts['discount_mean'] < facts['full_price_mean'] else 'slightly higher'
+discount_effective = discount_comparison == 'slightly higher'
+if discount_comparison is None:
+    present_group, missing_group = ('full-price', 'discounted') if pd.isna(facts['discount_mean']) else ('discounted', 'full-price')
+    present_mean = facts['full_price_mean'] if present_group == 'full-price' else facts['discount_mean']
+    discount_conclusion = f"There is not enough data to compare spending with and without a discount, as the current selection has no {missing_group} purchases."
+    discount_finding = f"The bar chart only shows the average spend of {present_group} transactions ({insights.usd(present_mean)}). {discount_conclusion}"
+else:
+    discount_conclusion = f"Crucially, the average purchase amount is {discount_comparison} when a discount is applied, suggesting that the current discount strategy is {'' if discount_effective else 'not '}effectively encouraging customers to increase their overall spending (basket size) per transaction."
+    discount_finding = f"The bar chart reveals that the average customer spend per transaction is {discount_comparison} when a discount is used {insights.usd(facts['discount_mean'])} compared to a non-discounted transaction {insights.usd(facts['full_price_mean'])}, a critical finding for analyzing spending patterns. The direct impact is that the current discount strategy is {'managing' if discount_effective else 'failing'} to motivate customers to add more items to their basket (up-sell) to increase their individual transaction value."
+season_means, season_medians = facts['season_means'], facts['season_medians']
+
 # --- Plotly Visualizations ---
 
 st.header("📊 Visualizations of Objectives 2")
 st.markdown("To investigate how seasonal trends and the use of discount impact consumer purchasing behavior, particularly in terms of how often purchases are made and how much is spent. The analysis will look into how discounts and seasonal changes drive consumer decisions and spending habits.")
 
 st.header("🔎 Summary")
-st.markdown("The visualization explores the influence of Seasonality and Discount Application on purchase behavior. Discounts are applied to a significant portion of transactions (43%), establishing them as a key influence on purchase frequency. Analysis of spending patterns reveals that purchase amounts remain consistent across all four seasons, indicating that environmental changes have minimal influence on individual transaction value. Crucially, the average purchase amount is slightly lower when a discount is applied, suggesting that the current discount strategy is not effectively encouraging customers to increase their overall spending (basket size) per transaction.")
+st.markdown(f"The visualization explores the influence of Seasonality and Discount Application on purchase behavior. Discounts are applied to {discount_portion} of the transactions ({discount_share}), {'establishing them as a key influence on' if discounts_common else 'limiting their influence on'} purchase frequency. Analysis of spending patterns reveals that purchase amounts remain consistent across the seasons (averages between {insights.usd(season_means.min())} and {insights.usd(season_means.max())}), indicating that environmental changes have minimal influence on individual transaction value. {discount_conclusion}")
 
 # --- Streamlit Page Content ---
 
 discount_map = {'Discount Applied': '#1f77b4', 'No Discount': '#ff7f0e'}
-season_order = ["Winter", "Spring", "Summer", "Fall"]
 
 
 st.header("1. Discount Usage Distribution")
-discount_counts = df['Discount Applied'].value_counts().reset_index()
-discount_counts.columns = ['Discount Applied', 'Count']
-fig1 = px.pie(discount_counts, names='Discount Applied', values='Count',
-              title='Proportion of Purchases with Discount Applied', hole=0.4,
-              color='Discount Applied', color_discrete_map=discount_map)
-fig1.update_traces(textposition='inside', textinfo='percent+label')
-st.plotly_chart(fig1, use_container_width=True) # CORRECTED
+def build_discount_counts():
+    discount_counts = cached_aggregate('discount_counts', lambda: source.counts(['Discount Applied']))
+    discount_counts = label_flags(discount_counts)
+    fig1 = px.pie(discount_counts, names='Discount Applied', values='Count',
+                  title='Proportion of Purchases with Discount Applied', hole=0.4,
+                  color='Discount Applied', color_discrete_map=discount_map)
+    fig1.update_traces(textposition='inside', textinfo='percent+label')
+    return fig1
+
+chart_graph.chart('discount_counts', build_discount_counts) # CORRECTED
 
 st.subheader("📝 Interpretation 1:")
-st.markdown("""
-The pie chart shows that 43% of customer transactions involve a discount, establishing a high baseline for discount usage frequency. This directly impacts the objective by confirming that discounts are a significant driver of individual purchase decisions, making them key to influencing customer behavior and transaction count.
+st.markdown(f"""
+The pie chart shows that {discount_share} of customer transactions involve a discount, establishing a {'high' if discounts_common else 'low'} baseline for discount usage frequency. {'This directly impacts the objective by confirming that discounts are a significant driver of individual purchase decisions, making them key to influencing customer behavior and transaction count.' if discounts_common else 'This limits the objective, as discounts play only a minor part in individual purchase decisions and transaction count.'}
 """)
 st.markdown("---")
 
 st.header("2. Average Purchase Amount with/without Discount")
-avg_purchase_discount = df.groupby('Discount Applied')['Purchase Amount (USD)'].mean().reset_index().round(2)
-fig5 = px.bar(avg_purchase_discount, x='Discount Applied', y='Purchase Amount (USD)',
-              color='Discount Applied', text='Purchase Amount (USD)',
-              title='Average Purchase Amount by Discount Status', color_discrete_map=discount_map)
-fig5.update_traces(textposition='outside')
-fig5.update_layout(yaxis_title="Average Purchase Amount (USD)")
-st.plotly_chart(fig5, use_container_width=True) # CORRECTED
+def build_avg_purchase_discount():
+    avg_purchase_discount = cached_aggregate('avg_purchase_discount', lambda: source.means('Discount Applied', 'Purchase Amount (USD)').round(2))
+    # Bootstrap 95% intervals of the means (the same cached intervals as the text above)
+    discount_ci = cached_aggregate('avg_purchase_discount_ci', lambda: bootstrap.intervals(source, 'Discount Applied', 'Purchase Amount (USD)'))
+    avg_purchase_discount = avg_purchase_discount.join(discount_ci[['low', 'high']], on='Discount Applied')
+    avg_purchase_discount['error_plus'] = avg_purchase_discount['high'] - avg_purchase_discount['Purchase Amount (USD)']
+    avg_purchase_discount['error_minus'] = avg_purchase_discount['Purchase Amount (USD)'] - avg_purchase_discount['low']
+    avg_purchase_discount = label_flags(avg_purchase_discount)
+    fig5 = px.bar(avg_purchase_discount, x='Discount Applied', y='Purchase Amount (USD)',
+                  color='Discount Applied', text='Purchase Amount (USD)',
+                  title='Average Purchase Amount by Discount Status', color_discrete_map=discount_map,
+                  error_y='error_plus', error_y_minus='error_minus')
+    fig5.update_traces(textposition='outside')
+    fig5.update_layout(yaxis_title="Average Purchase Amount (USD)")
+    return fig5
+
+chart_graph.chart('avg_purchase_discount', build_avg_purchase_discount) # CORRECTED
 
 st.subheader("📝 Interpretation 2:")
-st.markdown("""
-The bar chart reveals that the average customer spend per transaction is slightly lower when a discount is used 59.28 USD compared to a non-discounted transaction 60.15 USD, a critical finding for analyzing spending patterns. The direct impact is that the current discount strategy is failing to motivate customers to add more items to their basket (up-sell) to increase their individual transaction value.
+st.markdown(f"""
+{discount_finding}
+The error bars show the 95% bootstrap confidence interval of each average; as long as they overlap, the gap between discounted and full-price baskets is within sampling noise.
 """)
 st.markdown("---")
 
 st.header("3. Purchase Amount Distribution by Season")
-fig2 = px.violin(df, x='Season', y='Purchase Amount (USD)',
-                 color='Season', box=True, points='outliers',
-                 title='Purchase Amount Distribution by Season',
-                 color_discrete_sequence=px.colors.sequential.Agsunset,
-                 category_orders={"Season": season_order})
-st.plotly_chart(fig2, use_container_width=True) # CORRECTED
+# Density curves and box summaries are computed here instead of sending every row
+def build_season_purchase_violin():
+    season_box_stats, season_outliers = cached_aggregate('season_purchase_box', lambda: source.box_stats('Season', 'Purchase Amount (USD)'))
+    season_grid, season_densities, season_labels = cached_aggregate('season_purchase_kde', lambda: source.kde_curves('Season', 'Purchase Amount (USD)'))
+    fig2 = violin_figure(season_grid, season_densities, season_labels,
+                         season_box_stats, season_outliers,
+                         group='Season', value='Purchase Amount (USD)',
+                         title='Purchase Amount Distribution by Season',
+                         color_sequence=px.colors.sequential.Agsunset,
+                         order=season_order)
+    return fig2
+
+chart_graph.chart('season_purchase_violin', build_season_purchase_violin) # CORRECTED
 
 st.subheader("📝 Interpretation 3:")
-st.markdown("""
-The violin plots show that the distribution of individual purchase amounts is stable across all four seasons (Q1-Q4). This directly supports the objective by indicating that seasonality does not influence how much a customer is willing to spend in a single transaction, suggesting that promotions should focus on what customers buy seasonally, rather than trying to change their total spending amount per visit.
+st.markdown(f"""
+The violin plots show that the distribution of individual purchase amounts is stable across all four seasons (Q1-Q4), with medians between {insights.usd(season_medians.min())} and {insights.usd(season_medians.max())}. This directly supports the objective by indicating that seasonality does not influence how much a customer is willing to spend in a single transaction, suggesting that promotions should focus on what customers buy seasonally, rather than trying to change their total spending amount per visit.
 """)
 st.markdown("---")
 
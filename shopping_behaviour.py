@@ -1,35 +1,41 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
 
+import bootstrap
+import insights
+from cache import cached_aggregate
+from charts import box_figure, px
+from data import age_order, label_flags
+from filters import apply_filters
+from fragments import ChartGraph
+from sources import load_source
+
 # --- Configuration and Data Loading ---
 st.set_page_config(layout="wide")
 st.title("👤 Demographic Analysis")
 st.markdown("This section examines how demographic factors, such as age and gender, affect consumer shopping behavior, including purchase amounts and shopping frequency")
 
-# 1. Cached Data Loading Function
-@st.cache_data
-def load_data(url):
-    """Loads the shopping behavior data from a URL into a DataFrame."""
-    try:
-        df = pd.read_csv(url)
-        # Convert Gender to string for better categorical plotting
-        df['Gender'] = df['Gender'].map({1: 'Male', 0: 'Female'})
-        
-        # Convert Subscription Status to string (1: 'Yes', 0: 'No')
-        df['Subscription Status'] = df['Subscription Status'].map({1: 'Yes', 0: 'No'})
-        
-        return df
-    except Exception as e:
-        st.error(f"An error occurred while reading the CSV from the URL: {e}")
-        return pd.DataFrame()
-
-# Define the URL
-url = 'https://raw.githubusercontent.com/izzatimahrup/SvAssignment/refs/heads/main/shopping_behaviour_cleaned.csv'
-
-# Load the data into df
-df = load_data(url)
+# Load the shared source: decoded rows, or the precomputed cube when configured
+source = load_source()
+
+if source is None:
+    st.stop()
+
+# Apply the sidebar filters (shared across pages) through the bitmap index
+source = apply_filters(source)
+if len(source) == 0:
+    st.warning("No purchases match the selected filters.")
+    st.stop()
+
+# Each chart runs as its own fragment and is only rebuilt when its inputs change
+chart_graph = ChartGraph('shopping_behaviour')
+
+# Figures quoted in the text below, computed from the data in one pass (see insights.py)
+facts = cached_aggregate('narrative_insights', lambda: insights.compute(source))
+top_age = facts['top_age_by_mean']
+top_median_ages = facts['top_ages_by_median']
+top_category = facts['top_categories'][0]
+frequent_gender, frequent_gender_share = insights.leader(facts['frequent_share_by_gender'], 'Gender')
+leading_gender, leading_gender_share = insights.leader(facts['gender_shares'], 'Gender')
 
 # --- Plotly Visualizations ---
 
@@ -37,71 +43,86 @@ st.header("📊 Visualizations of Objectives 1")
 st.markdown("To examine how key demographic factors like age, gender, and location influence consumer spending patterns and shopping frequency. By analyzing these variables, the study seeks to identify differences in purchasing behavior across various demographic groups.")
 
 st.header("🔎 Summary")
-st.markdown("This dashboard offers a focused view of customer spending and loyalty patterns driven by age and gender. The analysis reveals that customers in the **35-44 age segment** are responsible for the largest transaction values. Distinct age groups show concentrated purchasing preferences, driving contributions primarily in the **Clothing and Electronics** categories. Furthermore, the data highlights that **Female customers** exhibit a noticeably higher average purchase frequency. Overall, these findings isolate the most valuable demographics in terms of spending power and loyalty, providing a clear foundation for optimized product placement and targeted marketing efforts.")
-
-# Define the Age Group order for consistent plotting
-age_order = ['18–25', '26–35', '36–45', '46–55', '56–65', '65+']
+st.markdown(f"This dashboard offers a focused view of customer spending and loyalty patterns driven by age and gender. The analysis reveals that customers in the **{top_age} age segment** are responsible for the largest transaction values ({insights.usd(facts['age_means'].get(top_age))} on average). Distinct age groups show concentrated purchasing preferences, driving contributions primarily in the **{' and '.join(facts['top_categories'])}** categories. Furthermore, the data highlights that **{frequent_gender} customers** exhibit the higher purchase frequency, with {insights.percent(frequent_gender_share, 1)} of their purchases made weekly or monthly. Overall, these findings isolate the most valuable demographics in terms of spending power and loyalty, providing a clear foundation for optimized product placement and targeted marketing efforts.")
 
 # 1. Box Plot for Age Group vs Purchase Amount (Interactive)
 st.subheader("1. Purchase Amount Distribution by Age Group")
-fig1 = px.box(
-    df,
-    x='Age Group',
-    y='Purchase Amount (USD)',
-    category_orders={"Age Group": age_order},
-    title='Purchase Amount Distribution by Age Group',
-    color='Age Group' # Add color for distinction
-)
-fig1.update_layout(xaxis={'categoryorder':'array', 'categoryarray':age_order}) # Enforce order
-st.plotly_chart(fig1, use_container_width=True)
+def build_age_purchase_box():
+    # Quartiles, whiskers and outliers are computed here; only the summaries go to the browser
+    age_box_stats, age_box_outliers = cached_aggregate('age_purchase_box', lambda: source.box_stats('Age Group', 'Purchase Amount (USD)'))
+    # Bootstrap 95% intervals of the medians, drawn as notches (from the bucket values in cube mode)
+    age_median_ci = cached_aggregate('age_purchase_median_ci', lambda: bootstrap.intervals(source, 'Age Group', 'Purchase Amount (USD)', 'median'))
+    fig1 = box_figure(
+        age_box_stats,
+        age_box_outliers,
+        group='Age Group',
+        value='Purchase Amount (USD)',
+        order=age_order,
+        median_ci=age_median_ci,
+        title='Purchase Amount Distribution by Age Group' # Boxes are colored by Age Group for distinction
+    )
+    fig1.update_layout(xaxis={'categoryorder':'array', 'categoryarray':age_order}) # Enforce order
+    return fig1
+
+chart_graph.chart('age_purchase_box', build_age_purchase_box)
 
 st.subheader("📝 Interpretation 1:")
-st.markdown("""
+st.markdown(f"""
 The **box plot** illustrates the distribution of purchase amounts across various **customer age segments**.
-The key finding is that the **36-45 and 46-55 age groups** show the highest median spending (as indicated by the line within the box). This directly supports the objective of identifying the most valuable segments for high-revenue targeting. The spread of the data (the box size) also shows that these groups have a consistently high spending range.
+The key finding is that the **{' and '.join(top_median_ages)} age groups** show the highest median spending ({' and '.join(insights.usd(facts['age_medians'][age]) for age in top_median_ages)}, as indicated by the line within the box). This directly supports the objective of identifying the most valuable segments for high-revenue targeting. The spread of the data (the box size) also shows how consistent spending is within each group.
+The notches mark the 95% bootstrap confidence interval of each median: where the notches of two groups overlap, their difference in median spending is within sampling noise.
 """)
 st.markdown("---")
 
 # 2. Grouped Bar Chart of Age Group vs Category (Interactive)
 st.subheader("2. Category Distribution by Age Group")
 
-fig5 = px.histogram(
-    df,
-    x='Age Group',
-    color='Category',
-    category_orders={"Age Group": age_order},
-    barmode='group',
-    title='Category Distribution by Age Group '
-)
-fig5.update_layout(xaxis={'categoryorder':'array', 'categoryarray':age_order}) # Enforce order
-st.plotly_chart(fig5, use_container_width=True)
+def build_age_category_counts():
+    age_category_counts = cached_aggregate('age_category_counts', lambda: source.counts(['Age Group', 'Category']))
+    fig5 = px.bar(
+        age_category_counts,
+        x='Age Group',
+        y='Count',
+        color='Category',
+        category_orders={"Age Group": age_order},
+        barmode='group',
+        title='Category Distribution by Age Group '
+    )
+    fig5.update_layout(xaxis={'categoryorder':'array', 'categoryarray':age_order}) # Enforce order
+    return fig5
+
+chart_graph.chart('age_category_counts', build_age_category_counts)
 
 st.subheader("📝 Interpretation 2:")
-st.markdown("""
+st.markdown(f"""
 The **grouped bar chart** details the total contribution of each age segment to specific product **categories**.
-The key trend is that **Clothing** is the most popular category overall across all age groups. More specifically, younger customers (**18-35**) show a higher relative volume of purchases in **Footwear** compared to older demographics. This insight is crucial for optimizing inventory and targeted product placement based on age-specific preferences.
+The key trend is that **{top_category}** is the most popular category overall ({insights.percent(facts['category_shares'].get(top_category))} of purchases), leading in {(facts['top_category_by_age'] == top_category).sum()} of {len(facts['top_category_by_age'])} age groups. More specifically, younger customers (**18-35**) show a higher relative volume of purchases in **{facts['young_category']}** ({insights.percent(facts['young_category_share'], 1)} of their purchases, against {insights.percent(facts['older_category_share'], 1)} for older demographics). This insight is crucial for optimizing inventory and targeted product placement based on age-specific preferences.
 """)
 st.markdown("---")
 
 # 3. Stacked Bar Chart of Purchase Frequency vs Gender (Interactive)
 st.subheader("3. Purchase Frequency vs. Gender")
-gender_frequency_counts = df.groupby(['Frequency of Purchases', 'Gender'], observed=False).size().reset_index(name='Count')
-
-fig3 = px.bar(
-    gender_frequency_counts,
-    y='Frequency of Purchases', # Y-axis for horizontal plot
-    x='Count',
-    color='Gender',
-    orientation='h',
-    title='Purchase Frequency vs. Gender ',
-    color_discrete_map={'Female': 'lightpink', 'Male': 'steelblue'}
-)
-st.plotly_chart(fig3, use_container_width=True)
+def build_gender_frequency_counts():
+    gender_frequency_counts = cached_aggregate('gender_frequency_counts', lambda: source.counts(['Frequency of Purchases', 'Gender']))
+    gender_frequency_counts = label_flags(gender_frequency_counts) # Gender is stored as a flag
+
+    fig3 = px.bar(
+        gender_frequency_counts,
+        y='Frequency of Purchases', # Y-axis for horizontal plot
+        x='Count',
+        color='Gender',
+        orientation='h',
+        title='Purchase Frequency vs. Gender ',
+        color_discrete_map={'Female': 'lightpink', 'Male': 'steelblue'}
+    )
+    return fig3
+
+chart_graph.chart('gender_frequency_counts', build_gender_frequency_counts)
 
 st.subheader("📝 Interpretation 3:")
-st.markdown("""
+st.markdown(f"""
 The **stacked bar chart** examines how frequently customers make purchases based on **gender** (a measure of loyalty).
-The trend clearly highlights that **Female customers** exhibit a higher total purchase frequency across almost all timeframes (e.g., Weekly, Bi-Weekly, Monthly) compared to Male customers. This is a critical finding for understanding the primary driver of repeat business volume and for designing effective gender-specific loyalty and retention programs.
+**{leading_gender} customers** make {insights.percent(leading_gender_share)} of all purchases, but the trend highlights that **{frequent_gender} customers** buy more often: {insights.percent(frequent_gender_share, 1)} of their purchases are weekly or monthly, the highest share of the two genders. This is a critical finding for understanding the primary driver of repeat business volume and for designing effective gender-specific loyalty and retention programs.
 """)
 st.markdown("---")
 
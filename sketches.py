@@ -0,0 +1,220 @@
+"""Mergeable quantile sketches (KLL) for the box and violin summaries of large exports.
+
+A KLL sketch keeps a few hundred of the values it has seen, in levels whose items stand
+for 2**level values each. Whenever the sketch outgrows its capacity, the lowest full level
+is sorted and every other item is promoted to the next level (starting at a random offset),
+so memory stays O(k log(n / k)) however many values stream through. Sketches merge by
+concatenating their levels and compacting again, so partial sketches of chunks, partitions
+or worker processes combine into the sketch of the whole. Any rank is then within
+epsilon * n of the true rank (with high probability), where epsilon is set through k.
+
+Sketches are kept per combination of the filter columns (SKETCH_DIMENSIONS), which include
+the box plot's Age Group and the violin's Season. A filtered chart therefore reads the
+items of the matching cells, grouped by its own column, as one weighted sample.
+"""
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from aggregations import bin_counts, silverman_bandwidth, smooth_counts
+from data import FILTER_COLUMNS, decode
+
+SKETCH_DIMENSIONS = FILTER_COLUMNS
+AMOUNT = 'Purchase Amount (USD)'
+
+
+def k_for_epsilon(epsilon):
+    """Smallest k whose normalized rank error is at most `epsilon`.
+
+    Uses the empirical fit published with the Apache DataSketches KLL sketch
+    (error ~ 2.296 / k**0.9723 at 99% confidence).
+    """
+    return max(8, math.ceil((2.296 / epsilon) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    """Streaming quantile sketch over floats; see the module docstring."""
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller capacities; the top one holds k items
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        while sum(map(len, self.levels)) > sum(self._capacity(h) for h in range(len(self.levels))):
+            level = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self._capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind, so the total weight is preserved exactly
+            odd = len(items) % 2
+            promoted = items[odd + self._rng.integers(2)::2]
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values):
+        """Adds an array of values (NaNs are skipped)."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Folds `other` (built with the same k) into this sketch."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def items(self):
+        """(values, weights) of the retained items; the weights sum to n."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        return values, weights
+
+    def quantiles(self, qs):
+        values, weights = self.items()
+        return weighted_quantiles(values, weights, qs)
+
+
+def weighted_quantiles(values, weights, qs):
+    """Smallest value whose cumulative weight reaches q of the total, for every q in `qs`."""
+    order = np.argsort(values, kind='stable')
+    values, cumulative = np.asarray(values)[order], np.cumsum(np.asarray(weights)[order])
+    if not len(values):
+        return np.full(len(qs), np.nan)
+    ranks = np.asarray(qs, dtype=float) * cumulative[-1]
+    return values[np.minimum(np.searchsorted(cumulative, ranks, side='left'), len(values) - 1)]
+
+
+# --- Per-cell sketches ---
+
+def build_sketches(df, k=None, value=AMOUNT, sketches=None):
+    """Sketches of `value` per SKETCH_DIMENSIONS cell of `df`, folded into `sketches` if given.
+
+    Returns {cell key tuple: KLLSketch}; one pass over the rows, one update per cell.
+    """
+    k = k or k_for_epsilon(config.SKETCH_EPSILON)
+    sketches = {} if sketches is None else sketches
+    cells = df.groupby(SKETCH_DIMENSIONS, observed=True, sort=False).indices
+    values = df[value].to_numpy(dtype=float)
+    for key, rows in cells.items():
+        if key not in sketches:
+            sketches[key] = KLLSketch(k)
+        sketches[key].update(values[rows])
+    return sketches
+
+
+def merge_sketches(parts):
+    """Combines per-cell sketch dicts (e.g. from chunks or worker processes) into one."""
+    merged = {}
+    for part in parts:
+        for key, sketch in part.items():
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = sketch
+    return merged
+
+
+def to_frame(sketches, value=AMOUNT):
+    """Long table of the retained items: one row per item with its cell, value and weight."""
+    frames = []
+    for key, sketch in sketches.items():
+        values, weights = sketch.items()
+        frame = pd.DataFrame({value: values, 'weight': weights})
+        for dimension, label in zip(SKETCH_DIMENSIONS, key):
+            frame[dimension] = label
+        frames.append(frame)
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=SKETCH_DIMENSIONS + [value, 'weight'])
+    # Back to the dataset's dtypes (ordered categoricals, bool flags) after the scalar fill
+    return decode(table[SKETCH_DIMENSIONS + [value, 'weight']])
+
+
+def save_sketches(sketches, path, k, source_version=None):
+    """Writes the item table to Parquet, with k and the source version in the metadata."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(to_frame(sketches), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'shopping_sketches'] = json.dumps({'k': k, 'source_version': source_version}).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def load_sketches(path):
+    """Reads an item table written by save_sketches(); returns (items, metadata)."""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    return decode(table.to_pandas()), json.loads(table.schema.metadata[b'shopping_sketches'])
+
+
+def sketch_path(cube_path):
+    """Where the sketches of a cube file live: next to it, as <name>.sketches.parquet."""
+    return Path(cube_path).with_suffix('.sketches.parquet')
+
+
+# --- Queries (over the item table of the selected cells) ---
+
+def box_stats(items, group, value, means):
+    """box_stats()-compatible summaries from the weighted items.
+
+    Quartiles, whiskers and outliers come from the sketch (rank error <= epsilon); counts
+    are exact (the weights sum to the row count) and `means` ({label: mean}) come exact from
+    the cube's sums.
+    """
+    rows, outlier_rows = [], []
+    for label, part in items.groupby(group, observed=True):
+        values, weights = part[value].to_numpy(), part['weight'].to_numpy()
+        q1, median, q3 = weighted_quantiles(values, weights, [0.25, 0.5, 0.75])
+        lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = (values >= lower) & (values <= upper)
+        lowerfence = values[inside].min() if inside.any() else q1
+        upperfence = values[inside].max() if inside.any() else q3
+        rows.append((label, q1, median, q3, means[label], int(weights.sum()), lowerfence, upperfence))
+        outside = pd.Series(weights[~inside]).groupby(values[~inside]).sum()
+        outlier_rows += [(label, v, int(c)) for v, c in outside.items()]
+    stats = pd.DataFrame(rows, columns=[group, 'q1', 'median', 'q3', 'mean', 'count',
+                                        'lowerfence', 'upperfence']).set_index(group)
+    outliers = pd.DataFrame(outlier_rows, columns=[group, value, 'count'])
+    return stats, outliers
+
+
+def kde_curves(items, group, value, std, points=200, bins=512):
+    """kde_curves()-compatible curves: the weighted items binned, then smoothed per group.
+
+    `std` ({label: standard deviation}) comes exact from the cube's sums; the interquartile
+    range for each group's bandwidth comes from the sketch.
+    """
+    parts = items.groupby(group, observed=False)
+    n, iqr = [], []
+    for _, part in parts:
+        values, weights = part[value].to_numpy(), part['weight'].to_numpy()
+        q1, q3 = weighted_quantiles(values, weights, [0.25, 0.75])
+        n.append(weights.sum())
+        iqr.append(q3 - q1)
+    bandwidth = silverman_bandwidth(pd.Series(std).reindex(list(parts.groups)).to_numpy(dtype=float), iqr, n)
+    lo, hi = float(items[value].min()), float(items[value].max())
+    edges = np.linspace(lo, hi, bins + 1) if hi > lo else np.array([lo - 0.5, hi + 0.5])
+    _, counts, labels = bin_counts(items, value, edges, by=group, weights='weight')
+    centers = (edges[:-1] + edges[1:]) / 2
+    grid, densities = smooth_counts(centers, counts, bandwidth, lo, hi, points)
+    return grid, densities, labels
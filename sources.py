@@ -0,0 +1,270 @@
+"""What the pages query: the row-level dataset or, when configured, the precomputed cube.
+
+Both sources answer the same chart queries (counts, means, box/violin summaries, regression
+statistics), so a page is written once and runs unchanged on either. A partitioned store
+(partitions.PartitionedSource) stands in for the in-memory rows when configured. Row-level queries run
+on pandas by default, on DuckDB (duckdb_source.DuckDBSource) when SHOPPING_BACKEND=duckdb,
+or partitioned across worker processes (engine.ParallelSource) when SHOPPING_BACKEND=parallel.
+"""
+import threading
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+
+import aggregations
+import config
+import cube
+import regression
+import sketches
+from bitmaps import BitmapIndex
+from data import FILTER_COLUMNS, snapshot
+from instrumentation import timed
+
+
+class FrameSource:
+    """Chart queries answered from row-level data."""
+    kind = 'rows'
+
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+    def subset(self, mask, selection):
+        return FrameSource(self.df[mask])
+
+    def counts(self, dims):
+        return aggregations.category_counts(self.df, dims)
+
+    def means(self, dim, value):
+        return self.df.groupby(dim, observed=True)[value].mean().reset_index()
+
+    def box_stats(self, group, value):
+        return aggregations.box_stats(self.df, group, value)
+
+    def kde_curves(self, group, value):
+        return aggregations.kde_curves(self.df, group, value)
+
+    def fits(self, x, y, by):
+        return regression.fit_by_group(self.df, x, y, by)
+
+    def value_range(self, value):
+        return self.df[value].min(), self.df[value].max()
+
+    def density_grid(self, x, y):
+        return aggregations.density_grid(self.df, x, y)
+
+    def sample(self, by, n):
+        return aggregations.stratified_sample(self.df, by, n)
+
+    def value_counts(self, columns):
+        return aggregations.value_counts(self.df, columns)
+
+
+class CubeSource:
+    """Chart queries answered from the cube cells; row-level views are not available."""
+    kind = 'cube'
+
+    def __init__(self, cells, bin_width, sketch_items=None, scatter=None):
+        self.cells = cells
+        self.bin_width = bin_width
+        # Quantile sketch items per filter cell (sketches.py), when the cube has them
+        self.sketch_items = sketch_items
+        # Previous Purchases x amount bucket histogram per filter cell, when the cube has one
+        self.scatter = scatter
+
+    def __len__(self):
+        return int(self.cells['count'].sum())
+
+    def subset(self, mask, selection):
+        return CubeSource(self.cells[mask], self.bin_width, _select(self.sketch_items, selection),
+                          _select(self.scatter, selection))
+
+    def _items(self, group):
+        """Sketch items to summarize `group` from, or None to fall back to the buckets."""
+        if self.sketch_items is None or group not in sketches.SKETCH_DIMENSIONS:
+            return None
+        return self.sketch_items
+
+    def counts(self, dims):
+        return cube.counts(self.cells, dims)
+
+    def means(self, dim, value):
+        return cube.means(self.cells, dim, value)
+
+    def box_stats(self, group, value):
+        return cube.box_stats(self.cells, group, value, self.bin_width, items=self._items(group))
+
+    def kde_curves(self, group, value):
+        return cube.kde_curves(self.cells, group, value, self.bin_width, items=self._items(group))
+
+    def fits(self, x, y, by):
+        if (x, y) != (cube.PREVIOUS, cube.AMOUNT):
+            raise ValueError(f"The cube only stores the {cube.PREVIOUS!r} -> {cube.AMOUNT!r} regression")
+        return cube.fits(self.cells, by)
+
+    def value_range(self, value):
+        return cube.value_range(self.cells, value)
+
+    def density_grid(self, x, y):
+        if (x, y) != (cube.PREVIOUS, cube.AMOUNT):
+            raise ValueError(f"The cube only stores the {cube.PREVIOUS!r} x {cube.AMOUNT!r} histogram")
+        # None for cubes built without the scatter histogram
+        if self.scatter is None:
+            return None
+        return aggregations.density_grid_from_value_counts(cube.scatter_weights(self.scatter), x, y)
+
+    def sample(self, by, n):
+        return None
+
+    def value_counts(self, columns):
+        return cube.value_counts(self.cells, columns)
+
+
+def _select(table, selection):
+    """Rows of a table kept per filter cell (sketch items, scatter histogram) matching `selection`."""
+    if table is None:
+        return None
+    keep = np.ones(len(table), dtype=bool)
+    for column, values in selection.items():
+        if values:
+            keep &= table[column].isin(values).to_numpy()
+    return table[keep]
+
+
+# --- Process-wide cube (loaded at most once, like the dataset) ---
+_lock = threading.Lock()
+_cube = None
+
+
+def cube_mode():
+    """True when a cube file is configured and present."""
+    return bool(config.CUBE_PATH) and Path(config.CUBE_PATH).is_file()
+
+
+def _load_sketch_items(metadata):
+    """The sketch items stored next to the cube, or None when absent or from other data."""
+    path = sketches.sketch_path(config.CUBE_PATH)
+    if not path.is_file():
+        return None
+    items, sketch_metadata = sketches.load_sketches(path)
+    return items if sketch_metadata.get('source_version') == metadata.get('source_version') else None
+
+
+def _load_scatter(metadata):
+    """The scatter histogram stored next to the cube, or None when absent or from other data."""
+    path = cube.scatter_path(config.CUBE_PATH)
+    if not path.is_file():
+        return None
+    scatter, scatter_metadata = cube.load_cube(path)
+    return scatter if scatter_metadata.get('source_version') == metadata.get('source_version') else None
+
+
+def _get_cube():
+    """Returns (cells, metadata, index, sketch items, scatter) of the configured cube, reading the files once."""
+    global _cube
+    if _cube is None:
+        with _lock:
+            if _cube is None:
+                with timed('fetch'):
+                    cells, metadata = cube.load_cube(config.CUBE_PATH)
+                    items = _load_sketch_items(metadata)
+                    scatter = _load_scatter(metadata)
+                with timed('index'):
+                    index = BitmapIndex(cells, [column for column in FILTER_COLUMNS if column in cells])
+                _cube = (cells, metadata, index, items, scatter)
+    return _cube
+
+
+# --- Process-wide partitioned store (opened at most once) ---
+_store = None
+
+
+def partitioned_mode():
+    """True when a partitioned store is configured and present (and no cube is)."""
+    return bool(config.PARTITIONED_PATH) and Path(config.PARTITIONED_PATH).is_dir() and not cube_mode()
+
+
+def _get_store():
+    """Returns (store, index) of the configured partitioned store, reading its filter columns once."""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                from partitions import Store
+                with timed('fetch'):
+                    store = Store(config.PARTITIONED_PATH)
+                columns = [column for column in FILTER_COLUMNS if column in store.columns]
+                # Only the filter columns are read for the sidebar index; charts read the rest on demand
+                df = store.read(columns)
+                with timed('index'):
+                    index = BitmapIndex(df, columns)
+                _store = (store, index)
+    return _store
+
+
+# Session-state key of the dataset snapshot the session's reruns read from
+SNAPSHOT_KEY = 'dataset_snapshot'
+
+
+def pin_snapshot():
+    """Pins the current dataset snapshot for this session; call once per full rerun.
+
+    A background refresh can swap the dataset at any time. Pinning makes the filter index,
+    the rows and the cache version of one rerun (and of the fragment reruns that reuse its
+    source) come from the same snapshot, so a swap only takes effect on the next full rerun.
+    """
+    st.session_state[SNAPSHOT_KEY] = snapshot()
+
+
+def _snapshot():
+    """The snapshot pinned for this session, or the current one outside a pinned session."""
+    return st.session_state.get(SNAPSHOT_KEY) or snapshot()
+
+
+def active_index():
+    """Bitmap index of whatever the pages query (cube cells or dataset rows)."""
+    if cube_mode():
+        return _get_cube()[2]
+    if partitioned_mode():
+        return _get_store()[1]
+    return _snapshot().index
+
+
+def active_version():
+    """Version key of whatever the pages query."""
+    if cube_mode():
+        return 'cube-' + str(_get_cube()[1].get('source_version'))
+    if partitioned_mode():
+        return 'partitioned-' + str(_get_store()[0].version)
+    return _snapshot().version
+
+
+def get_source():
+    """The unfiltered source for this process: the cube or the partitioned store when configured, otherwise the rows."""
+    if cube_mode():
+        cells, metadata, _, items, scatter = _get_cube()
+        return CubeSource(cells, metadata['bin_width'], items, scatter)
+    if partitioned_mode():
+        from partitions import PartitionedSource
+        return PartitionedSource(_get_store()[0])
+    pinned = _snapshot()
+    if config.BACKEND == 'duckdb':
+        # Optional dependency, only imported when the DuckDB backend is selected
+        from duckdb_source import DuckDBSource
+        return DuckDBSource.for_dataset(pinned.df, pinned.version)
+    if config.BACKEND == 'parallel':
+        from engine import ParallelSource, get_engine
+        return ParallelSource(get_engine(pinned.df, pinned.version))
+    return FrameSource(pinned.df)
+
+
+def load_source():
+    """Page entry point: the shared source, or None after reporting the loading error."""
+    try:
+        return get_source()
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return None
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app modules live at the repository root, next to main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope='session')
+def df():
+    """The bundled dataset, decoded (3,900 rows)."""
+    import config
+    from data import read_dataset
+
+    return read_dataset(config.BUNDLED_DATA_PATH)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+import aggregations
+
+AMOUNT = 'Purchase Amount (USD)'
+
+
+def test_box_stats_match_the_rows(df):
+    stats, outliers = aggregations.box_stats(df, 'Age Group', AMOUNT)
+    grouped = df.groupby('Age Group', observed=True)[AMOUNT]
+    assert np.allclose(stats['median'], grouped.median())
+    assert np.allclose(stats['q1'], grouped.quantile(0.25))
+    assert (stats['count'] == grouped.size()).all()
+    kept = 0
+    for label, values in grouped:
+        row = stats.loc[label]
+        fence = 1.5 * (row['q3'] - row['q1'])
+        inside = values[values.between(row['q1'] - fence, row['q3'] + fence)]
+        assert (row['lowerfence'], row['upperfence']) == (inside.min(), inside.max())
+        kept += len(inside)
+    assert outliers['count'].sum() == len(df) - kept
+
+
+def test_box_stats_report_outliers_once_per_value():
+    df = pd.DataFrame({'group': ['a'] * 12, 'value': [10.0] * 5 + [11.0] * 5 + [100.0, 100.0]})
+    _, outliers = aggregations.box_stats(df, 'group', 'value')
+    assert outliers[['value', 'count']].values.tolist() == [[100.0, 2]]
+
+
+def test_kde_curves_are_densities(df):
+    grid, densities, labels = aggregations.kde_curves(df, 'Season', AMOUNT)
+    assert labels == list(df['Season'].cat.categories)
+    assert densities.shape == (len(labels), len(grid))
+    # Each curve integrates to about one over the padded grid
+    assert np.allclose(np.trapezoid(densities, grid, axis=1), 1, atol=0.02)
+
+
+def test_bin_counts_match_numpy_histogram(df):
+    edges = np.linspace(20, 100, 17)
+    _, counts, labels = aggregations.bin_counts(df, AMOUNT, edges, by='Season')
+    for row, label in zip(counts, labels):
+        expected, _ = np.histogram(df.loc[df['Season'] == label, AMOUNT], edges)
+        assert row.tolist() == expected.tolist()
+
+
+def test_value_count_summaries_match_the_row_summaries(df):
+    weights = aggregations.value_counts(df, ['Age Group', AMOUNT])
+    stats, outliers = aggregations.box_stats(df, 'Age Group', AMOUNT)
+    from_counts, counts_outliers = aggregations.box_stats_from_value_counts(weights, 'Age Group', AMOUNT)
+    pd.testing.assert_frame_equal(from_counts, stats, check_dtype=False)
+    pd.testing.assert_frame_equal(counts_outliers, outliers, check_dtype=False)
+    grid, densities, _ = aggregations.kde_curves(df, 'Age Group', AMOUNT)
+    counts_grid, counts_densities, _ = aggregations.kde_curves_from_value_counts(weights, 'Age Group', AMOUNT)
+    assert np.allclose(grid, counts_grid) and np.allclose(densities, counts_densities)
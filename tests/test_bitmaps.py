@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from bitmaps import BitmapIndex
+from data import FILTER_COLUMNS
+
+SELECTIONS = [
+    {'Season': ['Winter']},
+    {'Season': ['Winter', 'Summer'], 'Gender': [True]},
+    {'Age Group': ['18–25'], 'Category': ['Clothing', 'Footwear'], 'Subscription Status': [False]},
+]
+
+
+@pytest.fixture(scope='module')
+def index(df):
+    return BitmapIndex(df, FILTER_COLUMNS)
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_mask_ors_values_and_ands_columns(df, index, selection):
+    expected = np.ones(len(df), dtype=bool)
+    for column, values in selection.items():
+        expected &= df[column].isin(values).to_numpy()
+    assert np.array_equal(index.mask(selection), expected)
+    assert index.count(selection) == expected.sum()
+
+
+def test_empty_selection_does_not_filter(df, index):
+    assert index.mask({}) is None
+    assert index.mask({'Season': []}) is None
+    assert index.count({'Season': []}) == len(df)
+
+
+def test_unknown_values_match_no_rows(index):
+    assert index.count({'Season': ['Monsoon']}) == 0
+    assert index.count({'Season': ['Monsoon', 'Winter']}) == index.count({'Season': ['Winter']})
+
+
+def test_values_keep_the_category_order(df, index):
+    assert index.values('Season') == list(df['Season'].cat.categories)
+    assert index.values('Gender') == [False, True]
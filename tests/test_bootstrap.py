@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bootstrap
+import config
+from data import content_version
+from engine import Engine, ParallelSource
+from sources import FrameSource
+
+AMOUNT = 'Purchase Amount (USD)'
+
+
+def test_estimates_are_the_group_means_and_medians(df):
+    source = FrameSource(df)
+    means = bootstrap.intervals(source, 'Age Group', AMOUNT, 'mean', replicates=200)
+    medians = bootstrap.intervals(source, 'Age Group', AMOUNT, 'median', replicates=200)
+    grouped = df.groupby('Age Group', observed=True)[AMOUNT]
+    assert np.allclose(means['mean'], grouped.mean())
+    assert np.allclose(medians['median'], grouped.median())
+    for result, statistic in ((means, 'mean'), (medians, 'median')):
+        assert (result['low'] <= result[statistic]).all() and (result[statistic] <= result['high']).all()
+
+
+def test_mean_intervals_match_the_normal_approximation(df):
+    result = bootstrap.intervals(FrameSource(df), 'Discount Applied', AMOUNT, replicates=4000)
+    grouped = df.groupby('Discount Applied')[AMOUNT]
+    half_width = 1.96 * grouped.std() / np.sqrt(grouped.count())
+    assert np.allclose((result['high'] - result['low']) / 2, half_width, rtol=0.1)
+
+
+def test_intervals_are_reproducible_and_chunking_only_bounds_memory(df, monkeypatch):
+    weights = FrameSource(df).value_counts(['Season', AMOUNT])
+    first = bootstrap.group_intervals(weights, 'Season', AMOUNT, seed=3, replicates=2000)
+    pd.testing.assert_frame_equal(first, bootstrap.group_intervals(weights, 'Season', AMOUNT, seed=3, replicates=2000))
+    # Small chunks draw other replicates (one seed per chunk), but the same intervals up to noise
+    monkeypatch.setattr(config, 'BOOTSTRAP_CHUNK_CELLS', 4 * weights[AMOUNT].nunique() * 10)
+    assert len(bootstrap._chunks(2000, 4 * weights[AMOUNT].nunique())) > 1
+    chunked = bootstrap.group_intervals(weights, 'Season', AMOUNT, seed=3, replicates=2000)
+    pd.testing.assert_frame_equal(first, chunked, check_exact=False, atol=0.5, rtol=0)
+
+
+def test_unknown_statistic_is_rejected(df):
+    with pytest.raises(ValueError, match='mode'):
+        bootstrap.intervals(FrameSource(df), 'Season', AMOUNT, 'mode')
+
+
+def test_chunks_on_an_engine_pool_match_the_serial_ones(df, monkeypatch):
+    monkeypatch.setattr(config, 'ENGINE_MIN_PARTITION_ROWS', 500)
+    engine = Engine(df, content_version(df), workers=2, partitions=2)
+    try:
+        monkeypatch.setattr(config, 'BOOTSTRAP_CHUNK_CELLS', 20_000)
+        source = ParallelSource(engine)
+        pooled = bootstrap.intervals(source, 'Age Group', AMOUNT, 'median', replicates=500)
+        assert engine.parallel
+        serial = bootstrap.intervals(source, 'Age Group', AMOUNT, 'median', replicates=500, engine=None)
+        pd.testing.assert_frame_equal(pooled, serial)
+    finally:
+        engine.close()
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from cache import AggregateCache
+
+
+def test_a_hit_skips_the_computation():
+    cache = AggregateCache(1024 ** 2)
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute('key', lambda: calls.append(1) or 42) == 42
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entries_are_evicted_to_stay_within_budget():
+    cache = AggregateCache(2500)
+    for key in 'abc':
+        cache.get_or_compute(key, lambda: np.zeros(100))  # 800 bytes each
+    cache.get_or_compute('a', lambda: None)  # refreshes 'a'
+    cache.get_or_compute('d', lambda: np.zeros(100))
+    assert cache.stats()['evictions'] == 1
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_values_larger_than_the_budget_are_not_kept():
+    cache = AggregateCache(100)
+    cache.get_or_compute('big', lambda: np.zeros(1000))
+    assert cache.stats()['entries'] == 0
+
+
+def test_a_failing_computation_releases_its_key():
+    cache = AggregateCache(1024 ** 2)
+
+    def fail():
+        raise RuntimeError('no data')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('key', fail)
+    assert not cache._key_locks
+    assert cache.get_or_compute('key', lambda: 1) == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = AggregateCache(1024 ** 2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=('key', compute)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
@@ -0,0 +1,29 @@
+import json
+
+import plotly.graph_objects as go
+from streamlit.testing.v1 import AppTest
+
+from charts import spec_figure
+
+SCRIPT = """
+import plotly.graph_objects as go
+import streamlit as st
+
+from charts import spec_figure
+
+figure = go.Figure(go.Bar(x=['a', 'b'], y=[1, 2]), layout=dict(title='Counts'))
+st.plotly_chart(figure, theme=None, key='figure')
+st.plotly_chart(spec_figure(figure.to_json()), theme=None, key='cached')
+"""
+
+
+def test_spec_figure_is_drawn_like_the_figure_it_was_serialized_from():
+    at = AppTest.from_string(SCRIPT).run()
+    assert not at.exception
+    drawn, cached = (json.loads(chart.proto.spec) for chart in at.get('plotly_chart'))
+    assert cached == drawn
+
+
+def test_spec_figure_keeps_the_title():
+    figure = spec_figure(go.Figure(layout=dict(title='Counts')).to_json())
+    assert figure.layout.title.text == 'Counts'
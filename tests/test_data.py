@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import decode, label_flags
+
+
+def test_decode_maps_codes_and_labels_to_flags():
+    df = decode(pd.DataFrame({
+        'Gender': [1, 0, 1],
+        'Subscription Status': ['Subscribed', 'Non-Subscribed', 'Subscribed'],
+        'Discount Applied': [True, False, False],
+    }))
+    assert df['Gender'].tolist() == [True, False, True]
+    assert df['Subscription Status'].tolist() == [True, False, True]
+    assert df['Discount Applied'].tolist() == [True, False, False]
+    assert (df.dtypes == bool).all()
+
+
+def test_decode_orders_categories_and_keeps_unknown_ones_last():
+    df = decode(pd.DataFrame({'Season': ['Fall', 'Winter', 'Monsoon'], 'Category': ['Shoes', 'Clothing', 'Shoes']}))
+    assert df['Season'].cat.ordered
+    assert df['Season'].cat.categories.tolist() == ['Winter', 'Spring', 'Summer', 'Fall', 'Monsoon']
+    assert isinstance(df['Category'].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize('values, bad', [
+    ([0, 1, np.nan], 'nan'),
+    ([0, 1, 2], '2'),
+    (['Male', 'Female', 'Other'], 'Other'),
+    (['Male', None, 'Female'], 'nan'),
+])
+def test_decode_rejects_values_that_are_not_flags(values, bad):
+    with pytest.raises(ValueError, match='Gender') as error:
+        decode(pd.DataFrame({'Gender': values}))
+    assert repr(bad) in str(error.value)
+
+
+def test_label_flags_labels_a_copy():
+    df = pd.DataFrame({'Gender': [True, False], 'Count': [3, 4]})
+    labelled = label_flags(df)
+    assert labelled['Gender'].tolist() == ['Male', 'Female']
+    assert df['Gender'].tolist() == [True, False]
@@ -0,0 +1,46 @@
+import html
+import json
+import re
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import config
+import export
+
+
+@pytest.fixture(scope='module')
+def report(tmp_path_factory):
+    out = tmp_path_factory.mktemp('report')
+    results = export.export(out, workers=1)
+    return out, results
+
+
+def words(text):
+    """Text without Markdown emphasis and HTML tags, with whitespace collapsed."""
+    text = re.sub(r'</?strong>', '', text.replace('**', ''))
+    text = re.sub(r'<[^>]+>', ' ', text)
+    return ' '.join(html.unescape(text).split())
+
+
+@pytest.mark.parametrize('page', export.PAGES)
+def test_report_has_every_figure_and_text_of_the_page(report, page):
+    out, results = report
+    document = (out / f'{page}.html').read_text(encoding='utf-8')
+    at = AppTest.from_file(str(config.BASE_DIR / f'{page}.py'), default_timeout=120).run()
+    assert not at.exception
+
+    charts = [json.loads(chart.proto.spec) for chart in at.get('plotly_chart')]
+    assert document.count('class="plotly-graph-div"') == len(charts)
+    assert document.count('<hr>') == sum(element.value.strip() == '---' for element in at.markdown)
+    for spec in charts:
+        assert json.dumps(spec['layout']['title']['text'])[1:-1] in document
+
+    text = words(re.sub(r'<section>.*?</section>', ' ', document, flags=re.S))
+    elements = list(at.title) + list(at.header) + list(at.subheader) + list(at.markdown)
+    for element in elements:
+        if element.value.strip() != '---':
+            assert words(element.value) in text
+    # Headings come from the page, never from the internal chart keys
+    for result in results:
+        assert f'>{result["chart"]}<' not in document
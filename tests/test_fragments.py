@@ -0,0 +1,48 @@
+import functools
+import json
+
+from streamlit.runtime.scriptrunner import RerunData
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+from diagnostics import REBUILDS_KEY
+
+SCRIPT = """
+import plotly.graph_objects as go
+import streamlit as st
+
+from fragments import ChartGraph
+
+st.session_state['page_runs'] = st.session_state.get('page_runs', 0) + 1
+graph = ChartGraph('page')
+graph.chart('other', lambda: go.Figure(layout=dict(title='Other')))
+
+
+def controls():
+    return {'big': st.checkbox('Big', key='big')}
+
+
+graph.chart('sized', lambda big: go.Figure(layout=dict(title='Big' if big else 'Small')), controls)
+"""
+
+
+def titles(at):
+    return [json.loads(chart.proto.spec)['layout']['title']['text'] for chart in at.get('plotly_chart')]
+
+
+def test_a_widget_in_a_fragment_reruns_only_that_fragment(monkeypatch):
+    at = AppTest.from_string(SCRIPT).run()
+    assert titles(at) == ['Other', 'Small']
+
+    # On a widget change AppTest requests a full rerun, while the browser names the fragment
+    # holding the widget; give AppTest's rerun request that fragment id, as the browser would
+    sized = list(at._fragment_storage._fragments)[-1]
+    monkeypatch.setattr(local_script_runner, 'RerunData', functools.partial(RerunData, fragment_id=sized))
+    at.checkbox(key='big').check().run()
+
+    assert not at.exception
+    assert titles(at) == ['Big']
+    assert at.session_state['page_runs'] == 1
+    state = at.session_state[REBUILDS_KEY]['page']
+    assert state['run'] == 1
+    # Both charts built once, then only the resized one again; the other one was not rerun
+    assert state['built'] == 3 and state['avoided'] == 1
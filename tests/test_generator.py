@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import config
+from data import decode, read_raw
+from generator import CATEGORICAL, NUMERIC, fit_model, generate, sample
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return read_raw(config.BUNDLED_DATA_PATH)
+
+
+@pytest.fixture(scope='module')
+def model(raw):
+    return fit_model(raw)
+
+
+def test_samples_have_the_raw_layout_and_only_observed_values(raw, model):
+    synthetic = sample(model, 20_000, np.random.default_rng(0))
+    assert list(synthetic.columns) == list(raw.columns)
+    assert (synthetic.dtypes == raw.dtypes).all()
+    for column in CATEGORICAL:
+        assert set(synthetic[column]) <= set(raw[column])
+    for column in NUMERIC:
+        assert synthetic[column].between(raw[column].min(), raw[column].max()).all()
+    # Decodes like the real file (flags are still 0/1)
+    decode(synthetic.copy())
+
+
+def test_samples_keep_the_marginals(raw, model):
+    synthetic = sample(model, 50_000, np.random.default_rng(1))
+    for column in ['Season', 'Category', 'Discount Applied']:
+        expected = raw[column].value_counts(normalize=True)
+        assert np.allclose(synthetic[column].value_counts(normalize=True).reindex(expected.index), expected, atol=0.02)
+    assert synthetic['Purchase Amount (USD)'].mean() == pytest.approx(raw['Purchase Amount (USD)'].mean(), rel=0.02)
+
+
+def test_generate_is_reproducible(model, tmp_path):
+    first = generate(model, 2500, tmp_path / 'a.csv', chunk_rows=1000, workers=1, seed=7)
+    second = generate(model, 2500, tmp_path / 'b.csv', chunk_rows=1000, workers=1, seed=7)
+    assert first.read_bytes() == second.read_bytes()
+    assert len(read_raw(first)) == 2500
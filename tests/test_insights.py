@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import insights
+from sources import FrameSource
+
+AMOUNT = 'Purchase Amount (USD)'
+
+
+@pytest.fixture(scope='module')
+def facts(df):
+    return insights.compute(FrameSource(df))
+
+
+def test_figures_match_the_rows(df, facts):
+    assert facts['purchases'] == len(df)
+    assert facts['discount_share'] == pytest.approx(df['Discount Applied'].mean())
+    assert facts['discount_mean'] == pytest.approx(df.loc[df['Discount Applied'], AMOUNT].mean())
+    assert facts['full_price_mean'] == pytest.approx(df.loc[~df['Discount Applied'], AMOUNT].mean())
+    seasons = df.groupby('Season', observed=True)[AMOUNT]
+    assert np.allclose(facts['season_means'].reindex(seasons.mean().index), seasons.mean())
+    assert np.allclose(facts['season_medians'].reindex(seasons.median().index), seasons.median())
+    shares = df['Category'].value_counts(normalize=True)
+    assert facts['top_categories'] == list(shares.index[:2])
+
+
+def test_a_filtered_source_only_counts_its_rows(df):
+    summer = df['Season'] == 'Summer'
+    facts = insights.compute(FrameSource(df[summer]))
+    assert facts['purchases'] == summer.sum()
+    assert list(facts['season_means'].dropna().index) == ['Summer']
+
+
+def test_formatting():
+    assert insights.usd(59.284) == '59.28 USD'
+    assert insights.percent(0.4269) == '43%'
+    assert insights.usd(np.nan) == insights.percent(np.nan) == 'n/a'
+    assert insights.label('Gender', True) == 'Male'
+    assert [insights.portion(share) for share in (0.0, 0.1, 0.4, 0.6)] == [
+        'none', 'a small portion', 'a significant portion', 'a majority']
+    label, share = insights.leader(pd.Series(dtype=float), 'Season')
+    assert label == 'n/a' and np.isnan(share)
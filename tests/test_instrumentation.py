@@ -0,0 +1,44 @@
+import time
+
+from instrumentation import PAGE, finish_rerun, start_rerun, timed
+
+
+def stages(rerun):
+    return {(stage, chart): seconds for stage, chart, seconds in rerun.records}
+
+
+def test_aggregates_are_charged_to_their_chart_or_to_the_page():
+    rerun = start_rerun('page')
+    try:
+        # Computed for the page's text, before any chart
+        with timed('aggregate'):
+            time.sleep(0.02)
+        rerun.begin_chart()
+        with timed('aggregate'):
+            time.sleep(0.01)
+        rerun.chart('first', 0.0, 0.0)
+        # Between two charts, still the page's
+        with timed('aggregate'):
+            time.sleep(0.02)
+        rerun.begin_chart()
+        rerun.chart('second', 0.0, 0.0)
+    finally:
+        finish_rerun(rerun)
+    recorded = stages(rerun)
+    assert recorded[('aggregate', 'first')] >= 0.01
+    assert recorded[('aggregate', 'second')] == 0.0
+    page = [seconds for stage, chart, seconds in rerun.records if (stage, chart) == ('aggregate', PAGE)]
+    assert len(page) == 2 and sum(page) >= 0.04
+
+
+def test_nested_stages_are_timed_exclusively():
+    rerun = start_rerun('page')
+    try:
+        with timed('index'):
+            with timed('fetch'):
+                time.sleep(0.02)
+    finally:
+        finish_rerun(rerun)
+    recorded = stages(rerun)
+    assert recorded[('fetch', PAGE)] >= 0.02
+    assert recorded[('index', PAGE)] < 0.01
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from data import content_version
+from partitions import Store, build_store
+
+SELECTION = {'Season': ['Winter'], 'Gender': [True]}
+
+
+@pytest.fixture(scope='module')
+def store(df, tmp_path_factory):
+    path = tmp_path_factory.mktemp('partitions') / 'store'
+    build_store(df, path, version=content_version(df))
+    return Store(path)
+
+
+def test_reads_restore_the_dataset_dtypes(df, store):
+    rows = store.read()
+    assert len(rows) == len(df) == store.count_rows()
+    assert rows[df.columns].dtypes.equals(df.dtypes)
+
+
+def test_selection_reads_only_matching_partitions_and_rows(df, store):
+    matching = df['Season'].isin(SELECTION['Season']) & df['Gender'].isin(SELECTION['Gender'])
+    fragments = list(store.dataset.get_fragments(filter=Store._filter(SELECTION)))
+    assert len(fragments) == 1 < len(store.sizes)
+    rows = store.read(['Age Group', 'Purchase Amount (USD)'], SELECTION)
+    assert list(rows.columns) == ['Age Group', 'Purchase Amount (USD)']
+    assert store.count_rows(SELECTION) == len(rows) == matching.sum()
+    expected = df.loc[matching, ['Age Group', 'Purchase Amount (USD)']]
+    pd.testing.assert_frame_equal(rows.sort_values(list(rows.columns)).reset_index(drop=True),
+                                  expected.sort_values(list(expected.columns)).reset_index(drop=True))
+
+
+def test_only_known_columns_can_partition(df, tmp_path):
+    with pytest.raises(ValueError, match='partition'):
+        build_store(df, tmp_path / 'store', by=('Purchase Amount (USD)',))
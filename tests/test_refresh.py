@@ -0,0 +1,133 @@
+import functools
+import http.server
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import config
+import data
+from instrumentation import metrics
+from refresh import Refresher
+from sources import SNAPSHOT_KEY
+
+SCRIPT = """
+import streamlit as st
+
+from sources import active_version, get_source, pin_snapshot
+
+if st.session_state.get('pin'):
+    pin_snapshot()
+st.text(f'{active_version()} {len(get_source())}')
+"""
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    """Serves the directory with Last-Modified / 304 support, plus a slow and a failing URL."""
+
+    def do_GET(self):
+        if self.path == '/slow.csv':
+            time.sleep(1)
+        if self.path == '/broken.csv':
+            self.send_error(500)
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def served(tmp_path):
+    """(directory, base URL) of a local HTTP server; the directory starts with the bundled CSV."""
+    shutil.copy(config.BUNDLED_DATA_PATH, tmp_path / 'data.csv')
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield tmp_path, f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def loaded(df, monkeypatch):
+    """The process-wide dataset set to the bundled rows; restored after the test."""
+    monkeypatch.setattr(config, 'SHARED_DATASET_DIR', None)
+    monkeypatch.setattr(config, 'BACKEND', 'pandas')
+    monkeypatch.setattr(data, '_snapshot', data.build_snapshot(df, 'bundled'))
+    return data.snapshot()
+
+
+def touch(path, seconds_later):
+    """Moves the file's modification time forward (Last-Modified has one-second resolution)."""
+    mtime = path.stat().st_mtime + seconds_later
+    os.utime(path, (mtime, mtime))
+
+
+def test_unchanged_file_costs_a_304(served, loaded):
+    _, url = served
+    refresher = Refresher(f'{url}/data.csv', interval=60)
+    assert refresher.poll() == 'same content'
+    assert refresher.last_modified
+    assert refresher.poll() == 'unchanged'
+    assert data.snapshot() is loaded
+
+
+def test_new_timestamp_with_the_same_rows_keeps_the_dataset(served, loaded):
+    directory, url = served
+    refresher = Refresher(f'{url}/data.csv', interval=60)
+    refresher.poll()
+    first_modified = refresher.last_modified
+    touch(directory / 'data.csv', 10)
+    assert refresher.poll() == 'same content'
+    assert refresher.last_modified != first_modified
+    assert data.snapshot() is loaded
+
+
+def test_changed_file_is_swapped_in_and_pinned_sessions_keep_their_snapshot(served, loaded):
+    directory, url = served
+    pinned = AppTest.from_string(SCRIPT)
+    pinned.session_state['pin'] = True
+    pinned.run()
+    assert pinned.text[0].value == f'{loaded.version} {len(loaded.df)}'
+
+    rows = pd.read_csv(directory / 'data.csv')
+    rows.iloc[:100].to_csv(directory / 'data.csv', index=False)
+    touch(directory / 'data.csv', 10)
+    assert Refresher(f'{url}/data.csv', interval=60).poll() == 'swapped'
+    assert data.dataset_version() != loaded.version
+    assert len(data.get_dataset()) == 100
+
+    # A fragment rerun reads the snapshot its session pinned; the next full rerun pins the new one
+    pinned.session_state['pin'] = False
+    pinned.run()
+    assert pinned.text[0].value == f'{loaded.version} {len(loaded.df)}'
+    assert pinned.session_state[SNAPSHOT_KEY] is loaded
+    pinned.session_state['pin'] = True
+    pinned.run()
+    assert pinned.text[0].value == f'{data.dataset_version()} 100'
+
+
+@pytest.mark.parametrize('name', ['slow.csv', 'broken.csv', 'missing.csv'])
+def test_failed_poll_keeps_the_dataset_and_is_retried(served, loaded, name):
+    directory, url = served
+    if name != 'missing.csv':
+        shutil.copy(directory / 'data.csv', directory / name)
+    refresher = Refresher(f'{url}/{name}', interval=0.05, timeout=0.2)
+    with pytest.raises(OSError):
+        refresher.poll()
+    assert refresher.etag is None and refresher.last_modified is None
+    assert data.snapshot() is loaded
+
+    # The polling thread logs the error and keeps going
+    before = metrics._counters.get('refresh_errors', 0)
+    refresher.start()
+    time.sleep(0.5)
+    refresher.stop()
+    refresher.join(5)
+    assert metrics._counters.get('refresh_errors', 0) > before
+    assert data.snapshot() is loaded
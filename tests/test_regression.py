@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from regression import OLSStats, fit, fit_by_group
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 50, 1000)
+    return pd.DataFrame({'x': x, 'y': 20 + 0.8 * x + rng.normal(0, 5, 1000), 'group': rng.integers(0, 3, 1000)})
+
+
+def test_fit_matches_least_squares(frame):
+    stats = fit(frame, 'x', 'y')
+    slope, intercept = np.polyfit(frame['x'], frame['y'], 1)
+    assert stats.slope == pytest.approx(slope)
+    assert stats.intercept == pytest.approx(intercept)
+    assert stats.r_squared == pytest.approx(np.corrcoef(frame['x'], frame['y'])[0, 1] ** 2)
+
+
+def test_chunks_merge_to_the_whole(frame):
+    merged = OLSStats()
+    for rows in np.array_split(np.arange(len(frame)), 7):
+        merged.update(frame['x'].iloc[rows], frame['y'].iloc[rows])
+    whole = fit(frame, 'x', 'y')
+    assert merged.slope == pytest.approx(whole.slope)
+    assert merged.slope_se == pytest.approx(whole.slope_se)
+
+
+def test_fit_by_group_matches_one_fit_per_group(frame):
+    fits = fit_by_group(frame, 'x', 'y', 'group')
+    assert sorted(fits) == [0, 1, 2]
+    for label, group in frame.groupby('group'):
+        assert fits[label].intercept == pytest.approx(fit(group, 'x', 'y').intercept)
+    assert sum(fits.values(), OLSStats()).n == len(frame)
+
+
+def test_confidence_band_contains_the_line(frame):
+    stats = fit(frame, 'x', 'y')
+    x = np.linspace(0, 50, 5)
+    low, high = stats.confidence_band(x)
+    assert (low < stats.predict(x)).all() and (stats.predict(x) < high).all()
+
+
+def test_degenerate_fits_are_nan():
+    assert np.isnan(OLSStats.from_arrays([1.0], [2.0]).slope)
+    assert np.isnan(OLSStats.from_arrays([1.0, 1.0], [2.0, 3.0]).slope)
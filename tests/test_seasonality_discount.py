@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from filters import SELECTION_KEY
+
+PAGE = str(Path(__file__).parents[1] / 'seasonality_discount.py')
+
+
+def run(selection):
+    at = AppTest.from_file(PAGE, default_timeout=120)
+    at.session_state[SELECTION_KEY] = selection
+    at.run()
+    assert not at.exception
+    return ' '.join(markdown.value for markdown in at.markdown)
+
+
+def test_all_purchases_compare_discounted_and_full_price_spend():
+    text = run({})
+    assert 'when a discount is applied' in text
+    assert 'not enough data' not in text
+
+
+def test_a_selection_without_discounts_does_not_compare_spend():
+    # None of the bundled female customers' purchases are discounted
+    text = run({'Gender': [False]})
+    assert 'not enough data to compare' in text
+    assert 'no discounted purchases' in text
+    assert 'n/a' not in text
+    assert 'slightly' not in text and 'effectively encouraging' not in text and 'managing to' not in text
+    assert 'Discounts are applied to none of the transactions (0%)' in text
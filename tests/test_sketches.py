@@ -0,0 +1,45 @@
+import numpy as np
+
+from sketches import KLLSketch, k_for_epsilon, weighted_quantiles
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_error(sorted_values, estimates):
+    """Largest distance between the requested and the actual rank of each estimate."""
+    ranks = np.searchsorted(sorted_values, estimates, side='left') / len(sorted_values)
+    return np.abs(ranks - QS).max()
+
+
+def test_quantiles_are_within_the_rank_error_of_k():
+    values = np.random.default_rng(1).lognormal(4, 0.5, 200_000)
+    sketch = KLLSketch(k=200).update(values)
+    assert sketch.n == len(values)
+    assert sum(map(len, sketch.levels)) < len(values) // 100
+    assert _rank_error(np.sort(values), sketch.quantiles(QS)) < 2.296 / 200 ** 0.9723
+
+
+def test_merged_sketches_summarize_the_union():
+    rng = np.random.default_rng(2)
+    parts = [rng.normal(loc, 1, 50_000) for loc in (0, 3, 6)]
+    merged = KLLSketch(k=200)
+    for part in parts:
+        merged.merge(KLLSketch(k=200).update(part))
+    _, weights = merged.items()
+    assert weights.sum() == merged.n == 150_000
+    assert _rank_error(np.sort(np.concatenate(parts)), merged.quantiles(QS)) < 2.296 / 200 ** 0.9723
+
+
+def test_nans_are_skipped():
+    sketch = KLLSketch().update([1.0, np.nan, 3.0])
+    assert sketch.n == 2
+
+
+def test_weighted_quantiles():
+    assert weighted_quantiles([3, 1, 2], [1, 1, 2], [0.25, 0.5, 1.0]).tolist() == [1, 2, 3]
+    assert np.isnan(weighted_quantiles([], [], [0.5])).all()
+
+
+def test_k_for_epsilon_meets_the_bound():
+    k = k_for_epsilon(0.01)
+    assert 2.296 / k ** 0.9723 <= 0.01 < 2.296 / (k - 1) ** 0.9723
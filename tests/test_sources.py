@@ -0,0 +1,123 @@
+"""Every source answers the chart queries like FrameSource, unfiltered and filtered."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import cube
+import sketches
+from benchmarks.backends import QUERIES, SELECTIONS, same
+from bitmaps import BitmapIndex
+from data import FILTER_COLUMNS, content_version
+from engine import Engine, ParallelSource
+from partitions import PartitionedSource, Store, build_store
+from sources import CubeSource, FrameSource
+
+QUERIES = dict(
+    QUERIES,
+    category_counts=lambda s: s.counts(['Season', 'Category']),
+    rating_means=lambda s: s.means('Season', 'Review Rating'),
+    previous_range=lambda s: s.value_range(cube.PREVIOUS),
+    value_counts=lambda s: s.value_counts(['Age Group', cube.AMOUNT]),
+)
+
+
+@pytest.fixture(scope='module')
+def engine(df):
+    # Small partitions, so the 3,900 bundled rows are mapped over a real worker pool
+    min_rows, config.ENGINE_MIN_PARTITION_ROWS = config.ENGINE_MIN_PARTITION_ROWS, 500
+    engine = Engine(df, content_version(df), workers=2, partitions=4)
+    config.ENGINE_MIN_PARTITION_ROWS = min_rows
+    yield engine
+    engine.close()
+
+
+@pytest.fixture(scope='module')
+def sources(df, engine, tmp_path_factory):
+    """{name: function(selection) -> source filtered to `selection`} for every backend."""
+    directory = tmp_path_factory.mktemp('sources')
+    version = content_version(df)
+    index = BitmapIndex(df, FILTER_COLUMNS)
+    cells = cube.build_cube(df)
+    cells_index = BitmapIndex(cells, FILTER_COLUMNS)
+    items = sketches.to_frame(sketches.build_sketches(df))
+    scatter = cube.build_scatter(df)
+    build_store(df, directory / 'store', version=version)
+    store = Store(directory / 'store')
+
+    def filtered(source, index, selection):
+        mask = index.mask(selection)
+        return source if mask is None else source.subset(mask, selection)
+
+    result = {
+        'frame': lambda selection: filtered(FrameSource(df), index, selection),
+        'parallel': lambda selection: filtered(ParallelSource(engine), index, selection),
+        'partitioned': lambda selection: PartitionedSource(store, selection),
+        'cube': lambda selection: filtered(CubeSource(cells, config.CUBE_BIN_WIDTH, items, scatter),
+                                           cells_index, selection),
+    }
+    try:
+        from duckdb_source import DuckDBSource, parquet_copy
+    except ImportError:
+        pass
+    else:
+        path = parquet_copy(df, version, directory)
+        result['duckdb'] = lambda selection: DuckDBSource(path, df.dtypes.to_dict(), selection)
+    return result
+
+
+def _fail(part):
+    raise RuntimeError('bad partition')
+
+
+def test_parallel_engine_uses_its_worker_pool(engine):
+    assert engine.parallel and len(engine.partitions) == 4
+
+
+def test_parallel_engine_raises_map_errors_and_keeps_its_pool(engine):
+    with pytest.raises(RuntimeError, match='bad partition'):
+        engine.map(_fail, None)
+    assert engine.parallel
+
+
+def test_empty_selection_has_a_nan_range(df, engine):
+    nothing = np.zeros(len(df), dtype=bool)
+    expected = FrameSource(df[nothing]).value_range(cube.PREVIOUS)
+    actual = ParallelSource(engine, nothing).value_range(cube.PREVIOUS)
+    assert np.isnan(expected).all() and np.isnan(actual).all()
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+@pytest.mark.parametrize('query', QUERIES)
+@pytest.mark.parametrize('backend', ['duckdb', 'parallel', 'partitioned'])
+def test_row_sources_match_frame_source(sources, backend, query, selection):
+    if backend not in sources:
+        pytest.skip(f'{backend} is not installed')
+    expected = QUERIES[query](sources['frame'](SELECTIONS[selection]))
+    assert same(expected, QUERIES[query](sources[backend](SELECTIONS[selection])))
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+@pytest.mark.parametrize('query', sorted(set(QUERIES) - {'age_box_stats', 'value_counts'}))
+def test_cube_matches_frame_source(sources, query, selection):
+    expected = QUERIES[query](sources['frame'](SELECTIONS[selection]))
+    assert same(expected, QUERIES[query](sources['cube'](SELECTIONS[selection])))
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_cube_value_counts_use_bucket_means(sources, selection):
+    expected = QUERIES['value_counts'](sources['frame'](SELECTIONS[selection]))
+    actual = QUERIES['value_counts'](sources['cube'](SELECTIONS[selection]))
+    # Whole-dollar amounts in 1 USD buckets: each bucket mean is the amount itself, as float
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_cube_box_stats_are_within_a_bucket(sources, selection):
+    expected, _ = QUERIES['age_box_stats'](sources['frame'](SELECTIONS[selection]))
+    actual, _ = QUERIES['age_box_stats'](sources['cube'](SELECTIONS[selection]))
+    assert actual.index.tolist() == expected.index.tolist()
+    assert actual.columns.equals(expected.columns)
+    assert actual['count'].tolist() == expected['count'].tolist()
+    # Quantiles come from the sketches (or the buckets), so they are only exact to a bucket
+    np.testing.assert_allclose(actual.to_numpy(float), expected.to_numpy(float), atol=config.CUBE_BIN_WIDTH, rtol=0)